@@ -0,0 +1,43 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:16:43
+@Description: 以 NumPy 数组的形式获得所有信号灯的观测 (is_tls_tensor=True)
+- movement_features 的形状为 (num_tls, 12, F), 可以直接作为 RL 策略的输入, 不需要每一步拼接 list
+- 数组会被原地更新, 需要保存历史观测时 (例如多帧 state) 需要 copy
+LastEditTime: 2026-10-18 20:16:43
+'''
+import numpy as np
+from loguru import logger
+from collections import deque
+
+from tshub.tshub_env.tshub_env import TshubEnvironment
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.utils.init_log import set_logger
+
+path_convert = get_abs_path(__file__)
+set_logger(path_convert('./'), terminal_log_level='INFO')
+
+sumo_cfg = path_convert("../sumo_env/three_junctions/env/3junctions.sumocfg")
+tshub_env = TshubEnvironment(
+    sumo_cfg=sumo_cfg,
+    is_aircraft_builder_initialized=False,
+    is_vehicle_builder_initialized=False,
+    is_person_builder_initialized=False,
+    tls_ids=['J1', 'J2', 'J3'], tls_action_type='choose_next_phase',
+    tls_features=['last_step_occupancy', 'jam_length_vehicle', 'this_phase', 'this_phase_index', 'can_perform_action'],
+    is_tls_tensor=True,
+    use_gui=False, is_libsumo=True, num_seconds=500,
+)
+
+obs = tshub_env.reset()
+logger.info(f"SIM: TLS {obs['tls']['tls_ids']}, Features {obs['tls']['features']}.")
+states = deque([obs['tls']['movement_features'].copy()] * 5, maxlen=5) # 最近 5 个时刻的观测
+done = False
+while not done:
+    actions = {'tls': {_tls_id: 1 for _tls_id in obs['tls']['tls_ids']}}
+    obs, reward, info, done = tshub_env.step(actions=actions)
+    states.append(obs['tls']['movement_features'].copy())
+    if obs['tls']['can_perform_action'].any():
+        policy_input = np.stack(states, axis=1) # (num_tls, 5, 12, F)
+        logger.info(f"SIM: {info['step_time']}, Policy Input {policy_input.shape}, Phase {obs['tls']['this_phase_index']}.")
+tshub_env._close_simulation()
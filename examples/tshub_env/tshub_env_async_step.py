@@ -0,0 +1,45 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 23:58:12
+@Description: 异步 step (step_async/step_wait), SUMO 仿真的同时在主线程处理上一步的 obs
+- step_async 执行动作之后在后台线程中仿真 (obs 在 step_wait 中计算), TraCI 等待 SUMO 的时候会释放 GIL
+- 这里使用 time.sleep 模拟策略推理和训练 (policy_time), 比较同步和异步每一步的时间
+- 需要使用 TraCI (is_libsumo=False), 并且 SUMO 和 Python 可以使用不同的 CPU 核
+LastEditTime: 2026-10-18 23:58:12
+'''
+import time
+from loguru import logger
+
+from tshub.tshub_env.tshub_env import TshubEnvironment
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.utils.init_log import set_logger
+
+path_convert = get_abs_path(__file__)
+set_logger(path_convert('./'), terminal_log_level='WARNING')
+
+sumo_cfg = path_convert("../sumo_env/osm_berlin/env/berlin.sumocfg")
+policy_time = 0.002 # 处理 obs 的时间 (s)
+tshub_env = TshubEnvironment(
+    sumo_cfg=sumo_cfg,
+    is_aircraft_builder_initialized=False,
+    is_traffic_light_builder_initialized=False,
+    is_person_builder_initialized=False,
+    is_libsumo=False, sumo_seed=1, num_seconds=500,
+)
+
+for is_async in (False, True):
+    obs = tshub_env.reset()
+    done = False
+    num_steps, start_time = 0, time.perf_counter()
+    while not done:
+        if is_async:
+            tshub_env.step_async(actions={}) # 动作已经确定, 后台线程开始仿真
+            time.sleep(policy_time) # 处理上一步的 obs (例如保存到 replay buffer, 训练)
+            obs, reward, info, done = tshub_env.step_wait()
+        else:
+            obs, reward, info, done = tshub_env.step(actions={})
+            time.sleep(policy_time)
+        num_steps += 1
+    step_time = (time.perf_counter() - start_time) / num_steps
+    logger.warning(f'SIM: Async {is_async}, Step Time (ms): {step_time*1000:.2f}.')
+tshub_env._close_simulation()
@@ -0,0 +1,75 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 14:20:05
+@Description: 比较 "订阅所有特征" 和 "只订阅需要的特征" 时, 每一步通过 TraCI 传输的字节数
+- 使用 socket 连接 (is_libsumo=False), 统计每一步 recv/send 的字节数
+- vehicle_features 只选择 analyze_traffic 等 wrapper 中常用的特征
+LastEditTime: 2026-10-18 14:20:05
+'''
+from loguru import logger
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.tshub_env.tshub_env import TshubEnvironment
+
+path_convert = get_abs_path(__file__)
+logger.remove()
+
+
+class ByteCounterSocket:
+    """包装 TraCI 的 socket, 统计收发的字节数
+    """
+    def __init__(self, sock) -> None:
+        self._sock = sock
+        self.recv_bytes = 0
+        self.send_bytes = 0
+
+    def recv(self, bufsize:int) -> bytes:
+        data = self._sock.recv(bufsize)
+        self.recv_bytes += len(data)
+        return data
+
+    def send(self, data:bytes) -> int:
+        self.send_bytes += len(data)
+        return self._sock.send(data)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def run_env(sumo_cfg:str, num_seconds:int, **features):
+    tshub_env = TshubEnvironment(
+        sumo_cfg=sumo_cfg,
+        is_map_builder_initialized=False,
+        is_aircraft_builder_initialized=False,
+        is_vehicle_builder_initialized=True,
+        is_traffic_light_builder_initialized=True,
+        is_person_builder_initialized=False,
+        tls_ids=['htddj_gsndj'],
+        vehicle_action_type='lane', tls_action_type='next_or_not',
+        use_gui=False, is_libsumo=False,
+        sumo_seed=1, num_seconds=num_seconds,
+        **features
+    )
+    tshub_env.reset()
+    counter = ByteCounterSocket(tshub_env.sumo._socket)
+    tshub_env.sumo._socket = counter # reset 之后再统计, 只包含 step 的通信
+
+    done, num_steps = False, 0
+    while not done:
+        _, _, _, done = tshub_env.step({'vehicle': dict(), 'tls': {'htddj_gsndj': 0}})
+        num_steps += 1
+    tshub_env._close_simulation()
+    return counter.recv_bytes/num_steps, counter.send_bytes/num_steps
+
+
+if __name__ == '__main__':
+    sumo_cfg = path_convert("../sumo_env/single_junction/env/single_junction.sumocfg")
+    schemas = {
+        'all features': dict(),
+        'selected features': dict(
+            vehicle_features=['id', 'position', 'speed', 'road_id', 'lane_id', 'waiting_time'],
+            tls_features=['this_phase', 'jam_length_meters', 'last_step_occupancy', 'can_perform_action'],
+        ),
+    }
+    for _name, _features in schemas.items():
+        recv_bytes, send_bytes = run_env(sumo_cfg, num_seconds=500, **_features)
+        print(f'{_name:<20} recv {recv_bytes:10.1f} bytes/step, send {send_bytes:8.1f} bytes/step.')
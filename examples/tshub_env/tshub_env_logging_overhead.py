@@ -0,0 +1,79 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 18:20:37
+@Description: 比较 DEBUG 日志关闭和打开时, 每一步 step 的时间, 以及日志参数中 TraCI 查询和 dict_to_str 的调用次数
+- 信号灯和车辆控制中的 DEBUG 日志使用 logger.opt(lazy=True), 只有输出 DEBUG 日志的时候才会查询信号灯状态或调用 dict_to_str
+- "DEBUG on" 使用一个 DEBUG 级别但是不输出任何内容的 sink, 所有的参数都会被计算 (之前 DEBUG 关闭时也会计算这些参数)
+LastEditTime: 2026-10-18 18:20:37
+'''
+import time
+import libsumo
+from loguru import logger
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.tshub_env.tshub_env import TshubEnvironment
+from tshub.vehicle import vehicle_builder
+
+path_convert = get_abs_path(__file__)
+
+
+class CallCounter:
+    """统计函数被调用的次数
+    """
+    def __init__(self, func) -> None:
+        self.func = func
+        self.num_calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.num_calls += 1
+        return self.func(*args, **kwargs)
+
+
+def run_env(sumo_cfg:str, num_seconds:int):
+    tshub_env = TshubEnvironment(
+        sumo_cfg=sumo_cfg,
+        is_map_builder_initialized=False,
+        is_aircraft_builder_initialized=False,
+        is_vehicle_builder_initialized=True,
+        is_traffic_light_builder_initialized=True,
+        is_person_builder_initialized=False,
+        tls_ids=['J1', 'J2', 'J3'],
+        vehicle_action_type='lane_continuous_speed', tls_action_type='choose_next_phase',
+        use_gui=False, is_libsumo=True,
+        sumo_seed=1, num_seconds=num_seconds,
+    )
+    obs = tshub_env.reset()
+    state_counter = CallCounter(libsumo.trafficlight.getRedYellowGreenState)
+    dict_counter = CallCounter(vehicle_builder.dict_to_str)
+    libsumo.trafficlight.getRedYellowGreenState = state_counter # 只统计日志中的调用
+    vehicle_builder.dict_to_str = dict_counter
+
+    done, num_steps, step_time = False, 0, 0
+    while not done:
+        actions = {
+            'vehicle': {_vehicle_id: {'lane_change': 0, 'target_speed': -1} for _vehicle_id in obs['vehicle']},
+            'tls': {'J1': num_steps%2, 'J2': 0, 'J3': num_steps%2},
+        }
+        start_time = time.perf_counter()
+        obs, _, _, done = tshub_env.step(actions)
+        step_time += time.perf_counter() - start_time
+        num_steps += 1
+    libsumo.trafficlight.getRedYellowGreenState = state_counter.func
+    vehicle_builder.dict_to_str = dict_counter.func
+    tshub_env._close_simulation()
+    return 1000*step_time/num_steps, state_counter.num_calls/num_steps, dict_counter.num_calls/num_steps
+
+
+if __name__ == '__main__':
+    sumo_cfg = path_convert("../sumo_env/three_junctions/env/3junctions.sumocfg")
+    sinks = {
+        'DEBUG off': dict(level='INFO'), # DEBUG 日志的参数不会被计算
+        'DEBUG on': dict(level='DEBUG'), # 参数都会被计算, 但是不输出
+    }
+    for _name, _sink in sinks.items():
+        logger.remove()
+        logger.add(lambda _: None, filter=lambda _: False, **_sink)
+        step_ms, state_calls, dict_calls = run_env(sumo_cfg, num_seconds=1000)
+        print(
+            f'{_name:<10} {step_ms:6.3f} ms/step, '
+            f'getRedYellowGreenState {state_calls:5.2f} calls/step, dict_to_str {dict_calls:6.2f} calls/step.'
+        )
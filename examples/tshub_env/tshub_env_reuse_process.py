@@ -0,0 +1,41 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 23:41:05
+@Description: reset 的时候不重启 SUMO (reuse_process=True)
+- 第一次 reset 启动 SUMO, 之后的 reset 在同一个 SUMO 中使用 load 重新加载仿真, 不需要重新建立 TraCI 连接
+- 每个 episode 可以使用不同的 sumo_seed, 上一个 episode 的 trip_info 重命名为 trip_info_{reset_num}.xml
+- 比较两种方式 reset 的时间 (使用 TraCI 的时候差别更明显)
+LastEditTime: 2026-10-18 23:41:05
+'''
+import time
+from loguru import logger
+
+from tshub.tshub_env.tshub_env import TshubEnvironment
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.utils.init_log import set_logger
+
+path_convert = get_abs_path(__file__)
+set_logger(path_convert('./'), terminal_log_level='WARNING')
+
+sumo_cfg = path_convert("../sumo_env/three_junctions/env/3junctions.sumocfg")
+for reuse_process in (False, True):
+    tshub_env = TshubEnvironment(
+        sumo_cfg=sumo_cfg,
+        is_aircraft_builder_initialized=False,
+        is_person_builder_initialized=False,
+        tls_ids=['J1', 'J2', 'J3'], tls_action_type='choose_next_phase',
+        is_libsumo=False, sumo_seed=1, num_seconds=200,
+        trip_info=path_convert(f'./tripinfo_{reuse_process}.out.xml'),
+        reuse_process=reuse_process,
+    )
+    reset_times = []
+    for episode in range(5): # 5 个 episode
+        tshub_env.sumo_seed = episode # 每个 episode 使用不同的随机数种子
+        start_time = time.perf_counter()
+        obs = tshub_env.reset()
+        reset_times.append(time.perf_counter() - start_time)
+        done = False
+        while not done:
+            obs, reward, info, done = tshub_env.step(actions={'tls': {'J1': 0, 'J2': 0, 'J3': 0}})
+    tshub_env._close_simulation()
+    logger.warning(f'SIM: Reuse Process {reuse_process}, Reset Time (ms): {[round(_t*1000, 1) for _t in reset_times]}.')
@@ -0,0 +1,39 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 22:57:31
+@Description: 使用快照 (saveState/loadState) 重置环境 (is_snapshot_reset=True)
+- 第一次 reset 启动 SUMO, 仿真 snapshot_warmup_steps 步之后保存快照
+- 之后的 reset 在同一个 SUMO 中加载快照, builder 重新同步, 不需要重启仿真
+- 比较两种方式 reset 的时间 (使用 TraCI 的时候差别更明显)
+LastEditTime: 2026-10-18 22:57:31
+'''
+import time
+from loguru import logger
+
+from tshub.tshub_env.tshub_env import TshubEnvironment
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.utils.init_log import set_logger
+
+path_convert = get_abs_path(__file__)
+set_logger(path_convert('./'), terminal_log_level='WARNING')
+
+sumo_cfg = path_convert("../sumo_env/three_junctions/env/3junctions.sumocfg")
+for is_snapshot_reset in (False, True):
+    tshub_env = TshubEnvironment(
+        sumo_cfg=sumo_cfg,
+        is_aircraft_builder_initialized=False,
+        is_person_builder_initialized=False,
+        tls_ids=['J1', 'J2', 'J3'], tls_action_type='choose_next_phase',
+        is_libsumo=False, sumo_seed=1, num_seconds=200,
+        is_snapshot_reset=is_snapshot_reset, snapshot_warmup_steps=60,
+    )
+    reset_times = []
+    for _ in range(5): # 5 个 episode
+        start_time = time.perf_counter()
+        obs = tshub_env.reset()
+        reset_times.append(time.perf_counter() - start_time)
+        done = False
+        while not done:
+            obs, reward, info, done = tshub_env.step(actions={'tls': {'J1': 0, 'J2': 0, 'J3': 0}})
+    tshub_env._close_simulation()
+    logger.warning(f'SIM: Snapshot Reset {is_snapshot_reset}, Reset Time (ms): {[round(_t*1000, 1) for _t in reset_times]}.')
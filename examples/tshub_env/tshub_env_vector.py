@@ -0,0 +1,40 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 22:26:17
+@Description: 多进程同时运行多个环境 (VectorTshubEnv), 比较不同进程数量的吞吐量 (每秒仿真的环境步数)
+- 观测和动作通过共享内存传递, 观测的形状为 (num_envs, num_tls, 12, F)
+- 吞吐量随进程数量增长, 最多到 CPU 核的数量
+LastEditTime: 2026-10-18 22:26:17
+'''
+import time
+import numpy as np
+from loguru import logger
+
+from tshub.tshub_env.vector_tshub_env import VectorTshubEnv
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.utils.init_log import set_logger
+
+path_convert = get_abs_path(__file__)
+
+env_kwargs = dict(
+    sumo_cfg=path_convert("../sumo_env/three_junctions/env/3junctions.sumocfg"),
+    is_aircraft_builder_initialized=False,
+    is_vehicle_builder_initialized=False,
+    is_person_builder_initialized=False,
+    tls_ids=['J1', 'J2', 'J3'], tls_action_type='choose_next_phase',
+    tls_features=['jam_length_vehicle', 'last_step_occupancy', 'this_phase', 'this_phase_index', 'can_perform_action'],
+    num_seconds=500, sumo_seed=1,
+)
+
+if __name__ == '__main__': # 子进程使用 spawn 启动, 会重新 import 这个文件
+    set_logger(path_convert('./'), terminal_log_level='INFO')
+    num_steps = 500
+    for num_envs in (1, 2, 4):
+        with VectorTshubEnv(num_envs=num_envs, env_kwargs=env_kwargs) as vector_env:
+            obs = vector_env.reset()
+            start_time = time.perf_counter()
+            for _ in range(num_steps):
+                actions = np.random.randint(2, size=(num_envs, len(obs['tls_ids'])))
+                obs, rewards, infos, dones = vector_env.step(actions)
+            throughput = num_envs * num_steps / (time.perf_counter() - start_time)
+        logger.info(f"SIM: {num_envs} envs, observation {obs['movement_features'].shape}, {throughput:.0f} env steps/s.")
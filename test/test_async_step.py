@@ -0,0 +1,64 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:55:08
+@Description: 检测 step_async/step_wait 与 step 的结果相同, 上一步的 obs 在 step_wait 之前不会被修改,
+    以及 step 没有完成的时候调用 step, reset 和 render 会抛出 RuntimeError
+LastEditTime: 2026-10-18 20:55:08
+'''
+import os
+import copy
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestAsyncStep(unittest.TestCase):
+    def setUp(self) -> None:
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        self.env = TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            is_libsumo=False, sumo_seed=1, num_seconds=200,
+        )
+
+    def tearDown(self) -> None:
+        self.env._close_simulation()
+
+    def run_episode(self, is_async:bool, num_steps:int=100):
+        obs = self.env.reset()
+        results = []
+        for _ in range(num_steps):
+            actions = {_tls_id: 1 if obs['tls'][_tls_id]['can_perform_action'] else 0 for _tls_id in TLS_IDS}
+            if is_async:
+                last_obs = copy.deepcopy(obs)
+                self.env.step_async({'tls': actions})
+                self.assertEqual(obs, last_obs) # 仿真的时候上一步的 obs 不变
+                obs, reward, info, done = self.env.step_wait()
+            else:
+                obs, reward, info, done = self.env.step({'tls': actions})
+            results.append(copy.deepcopy((obs, reward, info, done)))
+        return results
+
+    def test_async_equals_sync(self) -> None:
+        self.assertEqual(self.run_episode(is_async=False), self.run_episode(is_async=True))
+
+    def test_pending_step_guard(self) -> None:
+        self.env.reset()
+        with self.assertRaises(RuntimeError):
+            self.env.step_wait()
+        self.env.step_async({})
+        for _method in (self.env.reset, self.env.render, lambda: self.env.step({}), lambda: self.env.step_async({})):
+            with self.assertRaises(RuntimeError):
+                _method()
+        self.env.step_wait()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 22:27:05
+@Description: 检测 TLSDecisionScheduler 的顺序, 过期记录的删除, 以及错过动作时间的信号灯被重新调度到当前时间
+LastEditTime: 2026-10-18 22:27:05
+'''
+import os
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.traffic_light.decision_scheduler import TLSDecisionScheduler
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+class TestTLSDecisionScheduler(unittest.TestCase):
+    def test_order(self) -> None:
+        scheduler = TLSDecisionScheduler()
+        scheduler.push('J1', 10)
+        scheduler.push('J2', 5)
+        scheduler.push('J3', 7)
+        self.assertEqual(len(scheduler), 3)
+        self.assertEqual(scheduler.peek(0), 5)
+        self.assertTrue(scheduler.is_due(5))
+        self.assertFalse(scheduler.is_due(4))
+        scheduler.push('J2', 12) # J2 做了动作, 之前的记录过期
+        self.assertEqual(scheduler.peek(5), 7)
+        scheduler.push('J3', 15)
+        self.assertEqual(scheduler.peek(7), 10)
+        scheduler.push('J1', 20)
+        self.assertEqual(scheduler.peek(10), 12)
+        self.assertEqual(len(scheduler), 3)
+
+    def test_missed(self) -> None:
+        missed = []
+        scheduler = TLSDecisionScheduler(on_missed=lambda tls_id, sim_step: missed.append((tls_id, sim_step)))
+        scheduler.push('J1', 5.5)
+        scheduler.push('J2', 8)
+        self.assertEqual(scheduler.peek(5), 5.5)
+        self.assertEqual(scheduler.peek(6), 6) # 5.5 不在仿真步上, 在 6 做动作
+        self.assertEqual(missed, [('J1', 6)])
+        self.assertTrue(scheduler.is_due(6))
+        self.assertEqual(scheduler.next_action_times, {'J1': 6, 'J2': 8})
+        self.assertEqual(scheduler.peek(9), 9) # 两个信号灯都错过了动作时间
+        self.assertEqual(missed, [('J1', 6), ('J1', 9), ('J2', 9)])
+        self.assertEqual(len(scheduler), 2)
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestMissedActionTime(unittest.TestCase):
+    def setUp(self) -> None:
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        self.env = TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            tls_features=['jam_length_vehicle', 'can_perform_action'],
+            is_libsumo=True, sumo_seed=1, num_seconds=300,
+        )
+
+    def tearDown(self) -> None:
+        self.env._close_simulation()
+
+    def delay_action_time(self, tls_id:str) -> float:
+        """将信号灯的下一次动作时间改为不在仿真步上的时间, 返回这个时间
+        """
+        tls_builder = self.env.scene_objects['tls']
+        tls_action = tls_builder.traffic_lights[tls_id].tls_action
+        tls_action.next_action_time += 0.5
+        tls_builder.decision_scheduler.push(tls_id, tls_action.next_action_time)
+        return tls_action.next_action_time
+
+    def test_step(self) -> None:
+        self.env.reset()
+        obs, _, info, _ = self.env.step({'tls': {_tls_id: 1 for _tls_id in TLS_IDS}})
+        missed_time = self.delay_action_time('J1')
+        for _ in range(60):
+            obs, _, info, _ = self.env.step({'tls': {_tls_id: 0 for _tls_id in TLS_IDS}})
+            if obs['tls']['J1']['can_perform_action']:
+                break
+        self.assertEqual(info['step_time'], missed_time + 0.5) # 下一个仿真步做动作
+        self.assertEqual(info['next_decision_time'], info['step_time'])
+
+        # 做动作之后正常调度
+        obs, _, info, _ = self.env.step({'tls': {_tls_id: 1 for _tls_id in TLS_IDS}})
+        self.assertGreater(self.env.scene_objects['tls'].traffic_lights['J1'].tls_action.next_action_time, info['step_time'])
+
+    def test_until_decision(self) -> None:
+        self.env.reset()
+        obs, _, info, _ = self.env.step({'tls': {_tls_id: 1 for _tls_id in TLS_IDS}})
+        missed_time = self.delay_action_time('J1')
+        action_times = []
+        for _ in range(10):
+            obs, _, info, _ = self.env.step({'tls': {_tls_id: 1 for _tls_id in TLS_IDS}}, until_decision=True)
+            if obs['tls']['J1']['can_perform_action']:
+                action_times.append(info['step_time'])
+        self.assertIn(missed_time + 0.5, action_times)
+        self.assertGreater(len(action_times), 1) # J1 没有被冻结
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:36:12
+@Description: 检测 DetectorAggregationPlan (稀疏矩阵聚合) 的结果与 process_detector_data 相同
+- three_junctions 中包含多功能车道 (例如 rs, sl), 同一个探测器会被统计到多个 movement
+LastEditTime: 2026-10-18 21:36:12
+'''
+import os
+import unittest
+import numpy as np
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestDetectorAggregationPlan(unittest.TestCase):
+    def make_env(self, vehicle_id_format:str='list'):
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        return TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            tls_vehicle_id_format=vehicle_id_format,
+            is_libsumo=True, sumo_seed=1, num_seconds=300,
+        )
+
+    def run_and_compare(self, vehicle_id_format:str) -> int:
+        """每一步比较 plan 与 process_detector_data 的结果, 返回比较过的有车辆的 movement 数量
+        """
+        env = self.make_env(vehicle_id_format)
+        try:
+            env.reset()
+            tls_builder = env.scene_objects['tls']
+            plan = tls_builder.detector_plan
+            num_vehicle_movements = 0
+            for _ in range(120):
+                env.step({'tls': {_tls_id: 0 for _tls_id in TLS_IDS}})
+                detector_result = env.sumo.lanearea.getAllSubscriptionResults()
+                self.assertTrue(plan.is_complete(detector_result))
+                processed_data = tls_builder.process_detector_data(detector_result)
+                slot_values = plan.aggregate(detector_result)
+                for _tls_id, _movement_slots in plan.tls_slots.items():
+                    for _movement_id, _slot in _movement_slots.items():
+                        if plan.counts[_slot] == 0:
+                            self.assertNotIn(_movement_id, processed_data[_tls_id])
+                            continue
+                        expected = processed_data[_tls_id][_movement_id]
+                        for _feature in plan.numeric_features:
+                            self.assertAlmostEqual(slot_values[_feature][_slot], expected[_feature], places=9)
+                        vehicle_ids = slot_values['last_step_vehicle_id_list'][_slot]
+                        expected_ids = expected['last_step_vehicle_id_list']
+                        if vehicle_id_format == 'count':
+                            self.assertEqual(vehicle_ids, len(expected_ids))
+                        elif vehicle_id_format == 'handle':
+                            self.assertEqual(tls_builder.vehicle_id_table.get_ids(vehicle_ids), expected_ids)
+                        else:
+                            self.assertEqual(vehicle_ids, expected_ids)
+                        num_vehicle_movements += len(expected_ids) > 0
+            return num_vehicle_movements
+        finally:
+            env._close_simulation()
+
+    def test_plan_equals_process_detector_data(self) -> None:
+        self.assertGreater(self.run_and_compare('list'), 0)
+
+    def test_plan_vehicle_id_formats(self) -> None:
+        for _vehicle_id_format in ('handle', 'count'):
+            self.assertGreater(self.run_and_compare(_vehicle_id_format), 0)
+
+    def test_multi_direction_lanes(self) -> None:
+        """多功能车道的探测器被统计到每一个方向
+        """
+        env = self.make_env()
+        try:
+            env.reset()
+            plan = env.scene_objects['tls'].detector_plan
+            multi_direction = [_id for _id in plan.detector_ids if len(_id.split('--')[4]) > 1]
+            self.assertGreater(len(multi_direction), 0)
+            detector_index = plan.detector_ids.index(multi_direction[0])
+            self.assertEqual(int(np.sum(plan.sum_matrix[:, detector_index])), len(multi_direction[0].split('--')[4]))
+        finally:
+            env._close_simulation()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-19 00:06:52
+@Description: 检测开启 vehicle builder 时, step(n_steps=k) 与 k 次 step 的仿真结果相同
+- 中间的仿真步也需要初始化新进入路网的车辆 (ego 车辆的控制模式在初始化时设置)
+- pedestrian_cross 中包含 ego 车辆, 同时运行两个环境, 使用 TraCI
+LastEditTime: 2026-10-19 00:06:52
+'''
+import os
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/pedestrian_cross/env/pedestrian_cross.sumocfg")
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestFrameSkipVehicles(unittest.TestCase):
+    def make_env(self, subscription_mode:str, is_columnar:bool=False):
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        return TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_person_builder_initialized=False,
+            is_traffic_light_builder_initialized=False,
+            vehicle_action_type='lane', vehicle_subscription_mode=subscription_mode,
+            is_vehicle_columnar=is_columnar,
+            is_libsumo=False, sumo_seed=1, num_seconds=300,
+        )
+
+    def get_vehicle_states(self, env):
+        return {
+            _vehicle_id: (env.sumo.vehicle.getPosition(_vehicle_id), env.sumo.vehicle.getSpeed(_vehicle_id))
+            for _vehicle_id in env.sumo.vehicle.getIDList()
+        }
+
+    def run_envs(self, subscription_mode:str, is_columnar:bool=False, n_steps:int=5) -> None:
+        skip_env, single_env = self.make_env(subscription_mode, is_columnar), self.make_env(subscription_mode, is_columnar)
+        try:
+            skip_env.reset()
+            single_env.reset()
+            num_ego = 0
+            for _ in range(250 // n_steps):
+                skip_obs, *_ = skip_env.step({'vehicle': {}}, n_steps=n_steps)
+                for _ in range(n_steps):
+                    single_obs, *_ = single_env.step({'vehicle': {}})
+                self.assertEqual(skip_env.sim_step, single_env.sim_step)
+                self.assertEqual(self.get_vehicle_states(skip_env), self.get_vehicle_states(single_env))
+                if is_columnar:
+                    skip_vehicles, single_vehicles = skip_obs['vehicle']['id2row'], single_obs['vehicle']['id2row']
+                    for _vehicle_id in single_vehicles:
+                        self.assertEqual(
+                            skip_obs['vehicle']['speed'][skip_vehicles[_vehicle_id]],
+                            single_obs['vehicle']['speed'][single_vehicles[_vehicle_id]]
+                        )
+                else:
+                    skip_vehicles, single_vehicles = skip_obs['vehicle'], single_obs['vehicle']
+                self.assertEqual(skip_vehicles.keys(), single_vehicles.keys())
+                num_ego = max(num_ego, sum('ego' in _vehicle_id for _vehicle_id in skip_vehicles))
+            self.assertGreater(num_ego, 0) # 有 ego 车辆进入路网
+        finally:
+            skip_env._close_simulation()
+            single_env._close_simulation()
+
+    def test_vehicle_subscription(self) -> None:
+        self.run_envs('vehicle')
+
+    def test_context_subscription(self) -> None:
+        self.run_envs('context')
+
+    def test_columnar(self) -> None:
+        """列式存储时中间步新增和删除的车辆在计算 obs 时写入 state store
+        """
+        self.run_envs('vehicle', is_columnar=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:16:05
+@Description: 检测 LazyObservation 只在第一次访问的时候调用 builder, 以及过期之后的访问
+LastEditTime: 2026-10-18 21:16:05
+'''
+import unittest
+
+from tshub.tshub_env.lazy_observation import LazyObservation
+
+
+class CountingBuilder:
+    """记录 get_objects_infos 被调用的次数
+    """
+    def __init__(self, infos) -> None:
+        self.infos = infos
+        self.num_calls = 0
+
+    def get_objects_infos(self):
+        self.num_calls += 1
+        return self.infos
+
+
+class TestLazyObservation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.vehicle_builder = CountingBuilder({'veh_0': {'speed': 1.0}})
+        self.tls_builder = CountingBuilder({'J1': {'phase': 0}})
+        self.obs = LazyObservation(
+            {'vehicle': self.vehicle_builder, 'tls': self.tls_builder, 'person': None},
+            static_infos={'map': 'net'},
+        )
+
+    def test_mapping(self) -> None:
+        self.assertEqual(list(self.obs), ['vehicle', 'tls', 'map']) # builder 为 None 的 object 被忽略
+        self.assertEqual(len(self.obs), 3)
+        self.assertIn('tls', self.obs)
+        self.assertNotIn('person', self.obs)
+        self.assertEqual((self.vehicle_builder.num_calls, self.tls_builder.num_calls), (0, 0)) # 不会触发计算
+        self.assertEqual(self.obs['map'], 'net')
+        with self.assertRaises(KeyError):
+            self.obs['person']
+
+    def test_compute_on_access(self) -> None:
+        self.assertFalse(self.obs.is_materialized('tls'))
+        self.assertEqual(self.obs['tls'], {'J1': {'phase': 0}})
+        self.assertEqual(self.obs['tls'], {'J1': {'phase': 0}})
+        self.assertTrue(self.obs.is_materialized('tls'))
+        self.assertEqual((self.vehicle_builder.num_calls, self.tls_builder.num_calls), (0, 1))
+        self.assertEqual(self.obs.materialize(), {'vehicle': {'veh_0': {'speed': 1.0}}, 'tls': {'J1': {'phase': 0}}, 'map': 'net'})
+        self.assertEqual((self.vehicle_builder.num_calls, self.tls_builder.num_calls), (1, 1))
+
+    def test_expire(self) -> None:
+        self.obs['tls']
+        self.obs.expire()
+        self.assertEqual(self.obs['tls'], {'J1': {'phase': 0}}) # 已经访问过的 object 仍然可以使用
+        self.assertEqual(self.obs['map'], 'net')
+        with self.assertRaises(RuntimeError):
+            self.obs['vehicle']
+        self.assertEqual(self.vehicle_builder.num_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:28:31
+@Description: 检测 LinkStateTable 的 row 分配, evict 之后 row 的回收, 以及 get_snr_link_table 保存的状态
+LastEditTime: 2026-10-18 21:28:31
+'''
+import unittest
+import numpy as np
+
+from tshub.v2x import V2VChannel, LinkStateTable
+
+
+class TestLinkStateTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.table = LinkStateTable(capacity=2)
+
+    def test_get_rows(self) -> None:
+        rows, is_new = self.table.get_rows([('veh_0', 'veh_1'), ('veh_0', 'veh_2'), ('veh_1', 'veh_2')])
+        self.assertEqual(rows.tolist(), [0, 1, 2])
+        self.assertEqual(is_new.tolist(), [True, True, True])
+        self.assertEqual(self.table.capacity, 4)
+        rows, is_new = self.table.get_rows([('veh_1', 'veh_2'), ('veh_1', 'veh_0'), ('veh_0', 'veh_1')])
+        self.assertEqual(rows.tolist(), [2, 3, 0]) # (tx, rx) 有方向
+        self.assertEqual(is_new.tolist(), [False, True, False])
+        self.assertEqual(len(self.table), 4)
+
+    def test_evict(self) -> None:
+        links = [('veh_0', 'veh_1'), ('veh_0', 'veh_2'), ('veh_1', 'veh_2'), ('veh_2', 'rsu_0')]
+        rows, _ = self.table.get_rows(links)
+        self.table.shadowing[rows] = [1, 2, 3, 4]
+        self.assertEqual(self.table.evict(['veh_1', 'veh_2', 'rsu_0']), 2) # veh_0 离开仿真
+        self.assertEqual(len(self.table), 2)
+        self.assertNotIn(('veh_0', 'veh_1'), self.table)
+        self.assertEqual(self.table.valid[:4].tolist(), [False, False, True, True])
+        self.assertEqual(self.table.shadowing[:4].tolist(), [0, 0, 3, 4])
+        self.assertEqual(self.table.evict(['veh_1', 'veh_2', 'rsu_0']), 0)
+
+        # 回收的 row 被优先使用 (较小的 row)
+        rows, is_new = self.table.get_rows([('veh_3', 'veh_1'), ('veh_1', 'veh_2'), ('veh_3', 'rsu_0')])
+        self.assertEqual(rows.tolist(), [0, 2, 1])
+        self.assertEqual(is_new.tolist(), [True, False, True])
+
+        # 一条 link 的两端同时离开
+        self.assertEqual(self.table.evict(['rsu_0']), 4)
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(sorted(self.table.free_rows), [0, 1, 2, 3])
+
+    def test_snr_link_table(self) -> None:
+        """get_snr_link_table 保存每一条 link 的距离和 shadowing, link 被删除之后重新初始化
+        """
+        channel = V2VChannel()
+        links = [('veh_0', 'veh_1'), ('veh_1', 'veh_0')]
+        positions_tx = np.array([[0.0, 0.0], [30.0, 40.0]])
+        positions_rx = np.array([[30.0, 40.0], [0.0, 0.0]])
+        snr = channel.get_snr_link_table(self.table, links, positions_tx, positions_rx)
+        self.assertEqual(snr.shape, (2,))
+        rows, is_new = self.table.get_rows(links)
+        self.assertFalse(is_new.any())
+        np.testing.assert_allclose(self.table.distance[rows], [50, 50])
+        shadowing = self.table.shadowing[rows].copy()
+
+        # 距离没有变化时 rho = 1, shadowing 保持不变
+        channel.get_snr_link_table(self.table, links, positions_tx, positions_rx)
+        np.testing.assert_allclose(self.table.shadowing[rows], shadowing)
+
+        self.table.evict(['veh_1'])
+        self.assertEqual(len(self.table), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
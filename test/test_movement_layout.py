@@ -0,0 +1,69 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 22:08:17
+@Description: 检测 MovementLayout 在 movement 数量不同的路口 (T 型路口, 十字路口, 五岔路口) 上的 padding 和 mask
+LastEditTime: 2026-10-18 22:08:17
+'''
+import unittest
+import numpy as np
+
+from tshub.traffic_light.movement_layout import MovementLayout
+
+TLS_MOVEMENT_IDS = {
+    'T': ['E1--s', 'E1--l', 'E2--r'], # T 型路口
+    'cross': [f'E{_i}--{_d}' for _i in range(4) for _d in 'lsr'], # 十字路口, 12 个 movement
+    'five': [f'E{_i}--{_d}' for _i in range(5) for _d in 'lsr'], # 五岔路口, 15 个 movement
+}
+
+
+class TestMovementLayout(unittest.TestCase):
+    def setUp(self) -> None:
+        self.layout = MovementLayout(TLS_MOVEMENT_IDS)
+        self.values = np.arange(30, dtype=np.float32).reshape(30, 1) * [1, 10] # (num_movements, 2)
+
+    def test_indptr(self) -> None:
+        self.assertEqual(self.layout.indptr.tolist(), [0, 3, 15, 30])
+        self.assertEqual(self.layout.max_movements, 15)
+        self.assertEqual(self.layout.get_slice('cross'), slice(3, 15))
+        self.assertEqual(self.layout.movement_ids[3:15], TLS_MOVEMENT_IDS['cross'])
+        np.testing.assert_array_equal(self.layout.split(self.values)['T'], self.values[:3])
+
+    def test_mask(self) -> None:
+        mask = self.layout.get_mask(width=16)
+        self.assertEqual(mask.shape, (3, 16))
+        self.assertEqual(mask.sum(axis=1).tolist(), [3, 12, 15])
+        self.assertTrue(mask[1, :12].all() and not mask[1, 12:].any())
+        self.assertEqual(self.layout.get_mask().shape, (3, 15))
+
+    def test_to_padded(self) -> None:
+        padded = self.layout.to_padded(self.values, fill_value=-1)
+        self.assertEqual(padded.shape, (3, 15, 2))
+        mask = self.layout.get_mask()
+        np.testing.assert_array_equal(padded[mask], self.values) # 按照 row-major 的顺序就是紧凑的数组
+        self.assertTrue((padded[~mask] == -1).all())
+        np.testing.assert_array_equal(padded[2, :15], self.values[15:30])
+        np.testing.assert_array_equal(self.layout.from_padded(padded), self.values)
+
+    def test_to_padded_out(self) -> None:
+        """原地更新时只写入有 movement 的位置
+        """
+        out = np.full((3, 16, 2), 7, dtype=np.float32)
+        result = self.layout.to_padded(self.values, width=16, out=out)
+        self.assertIs(result, out)
+        mask = self.layout.get_mask(width=16)
+        np.testing.assert_array_equal(out[mask], self.values)
+        self.assertTrue((out[~mask] == 7).all())
+
+    def test_width_too_small(self) -> None:
+        with self.assertRaises(ValueError):
+            self.layout.get_mask(width=12) # 五岔路口有 15 个 movement
+
+    def test_reduce_sum(self) -> None:
+        np.testing.assert_allclose(
+            self.layout.reduce_sum(self.values[:, 0]),
+            [self.values[:3, 0].sum(), self.values[3:15, 0].sum(), self.values[15:, 0].sum()]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:02:44
+@Description: 检测 NeighborIndex 的查询结果与暴力计算相同, 以及没有物体时的索引
+LastEditTime: 2026-10-18 21:02:44
+'''
+import unittest
+import numpy as np
+
+from tshub.v2x.v2x_utils.neighbor_index import NeighborIndex
+
+
+class TestNeighborIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.positions = rng.uniform(0, 200, size=(50, 3))
+        self.ids = [f'veh_{_i}' for _i in range(50)]
+        self.index = NeighborIndex(self.ids, self.positions)
+
+    def test_query_radius(self) -> None:
+        center = np.array([100.0, 100.0])
+        distance = np.linalg.norm(self.positions[:, :2] - center, axis=1)
+        self.assertEqual(self.index.query_radius_indices(center, 50).tolist(), np.flatnonzero(distance <= 50).tolist())
+        self.assertEqual(self.index.query_radius(center, 50), [self.ids[_i] for _i in np.flatnonzero(distance <= 50)])
+
+    def test_query_pairs(self) -> None:
+        distance = np.linalg.norm(self.positions[:, None, :2] - self.positions[None, :, :2], axis=-1)
+        expected = [[_i, _j] for _i in range(50) for _j in range(_i+1, 50) if distance[_i, _j] <= 40]
+        self.assertEqual(self.index.query_pairs(40).tolist(), expected)
+
+    def test_query_links(self) -> None:
+        rsu_positions = np.array([[0.0, 0.0], [100.0, 100.0]])
+        rsu_index = NeighborIndex(['rsu_0', 'rsu_1'], rsu_positions)
+        distance = np.linalg.norm(self.positions[:, None, :2] - rsu_positions[None, :, :], axis=-1)
+        expected = [[_i, _j] for _i in range(50) for _j in range(2) if distance[_i, _j] <= 60]
+        self.assertEqual(self.index.query_links(rsu_index, 60).tolist(), expected)
+
+    def test_empty(self) -> None:
+        for empty_index in (NeighborIndex(), NeighborIndex(ids=[]), NeighborIndex(ids=[], positions=np.zeros((0, 3)))):
+            self.assertEqual(len(empty_index), 0)
+            self.assertEqual(empty_index.positions.shape, (0, 2))
+            self.assertEqual(empty_index.query_radius([0, 0], 100), [])
+            self.assertEqual(empty_index.query_pairs(100).shape, (0, 2))
+            self.assertEqual(empty_index.query_links(self.index, 100).shape, (0, 2))
+            self.assertEqual(self.index.query_links(empty_index, 100).shape, (0, 2))
+
+    def test_update_to_empty(self) -> None:
+        self.index.update([], np.zeros((0, 2)))
+        self.assertEqual(len(self.index), 0)
+        self.assertNotIn('veh_0', self.index)
+        self.index.update_from_vehicle_infos({})
+        self.assertEqual(self.index.query_pairs(100).shape, (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
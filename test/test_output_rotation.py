@@ -0,0 +1,90 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 23:12:40
+@Description: 检测 reuse_process 时 output 文件的重命名
+- 正常情况下在 load 之前重命名打开的文件
+- 不能重命名打开的文件时 (例如 Windows) 关闭 SUMO 之后重命名, 重新启动 SUMO
+LastEditTime: 2026-10-18 23:12:40
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestOutputRotation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = tempfile.mkdtemp()
+        self.summary = os.path.join(self.output_dir, 'summary.xml')
+        self.statistic = os.path.join(self.output_dir, 'statistic.xml')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_env(self):
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        return TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            is_traffic_light_builder_initialized=False,
+            summary=self.summary, statistic_output=self.statistic,
+            reuse_process=True, is_libsumo=True, sumo_seed=1, num_seconds=100,
+        )
+
+    def run_episodes(self, env, num_episodes:int) -> None:
+        for _ in range(num_episodes):
+            env.reset()
+            for _ in range(20):
+                env.step({})
+
+    def check_rotated_files(self, num_rotated:int) -> None:
+        """每一个重命名的文件都是完整的 XML (SUMO 关闭文件之后才写入 statistic)
+        """
+        for _reset_num in range(1, num_rotated+1):
+            summary_root = ET.parse(os.path.join(self.output_dir, f'summary_{_reset_num}.xml')).getroot()
+            self.assertEqual(summary_root.tag, 'summary')
+            self.assertGreater(len(summary_root), 0)
+            statistic_root = ET.parse(os.path.join(self.output_dir, f'statistic_{_reset_num}.xml')).getroot()
+            self.assertIsNotNone(statistic_root.find('vehicles'))
+
+    def test_rotate_before_load(self) -> None:
+        env = self.make_env()
+        try:
+            self.run_episodes(env, num_episodes=3)
+            sumo = env.sumo
+            self.run_episodes(env, num_episodes=1)
+            self.assertIs(env.sumo, sumo) # 使用 load, 没有重启 SUMO
+        finally:
+            env._close_simulation()
+        self.check_rotated_files(num_rotated=3)
+
+    def test_fallback_restart(self) -> None:
+        """SUMO 运行的时候不能重命名 output 文件, 关闭 SUMO 之后再重命名
+        """
+        env = self.make_env()
+        replace = os.replace
+        def windows_replace(src, dst):
+            if env.sumo is not None:
+                raise PermissionError(f'{src} is used by another process.')
+            return replace(src, dst)
+        try:
+            with mock.patch('tshub.tshub_env.base_sumo_env.os.replace', side_effect=windows_replace):
+                self.run_episodes(env, num_episodes=3)
+        finally:
+            env._close_simulation()
+        self.check_rotated_files(num_rotated=2)
+        self.assertEqual(env.reset_num, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
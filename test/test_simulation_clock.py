@@ -0,0 +1,71 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:43:19
+@Description: 检测 SimulationClock 只在 update 的时候调用 simulation.getTime
+LastEditTime: 2026-10-18 21:43:19
+'''
+import unittest
+from types import SimpleNamespace
+
+from tshub.tshub_env.simulation_clock import SimulationClock
+
+
+class FakeSumo:
+    """记录 simulation.getTime 的调用次数, 每次 simulationStep 时间增加 1s
+    """
+    def __init__(self) -> None:
+        self.current_time = 0.0
+        self.num_calls = 0
+        self.simulation = SimpleNamespace(getTime=self.get_time)
+
+    def get_time(self) -> float:
+        self.num_calls += 1
+        return self.current_time
+
+    def simulationStep(self) -> None:
+        self.current_time += 1
+
+
+class TestSimulationClock(unittest.TestCase):
+    def test_without_update(self) -> None:
+        """没有调用 update 的 clock 每次都从 SUMO 获取时间
+        """
+        sumo = FakeSumo()
+        clock = SimulationClock(sumo)
+        sumo.simulationStep()
+        self.assertEqual((clock.time, clock.time), (1, 1))
+        self.assertEqual(sumo.num_calls, 2)
+
+    def test_cached_time(self) -> None:
+        sumo = FakeSumo()
+        clock = SimulationClock()
+        self.assertEqual(clock.bind(sumo), 0)
+        for _step in range(1, 4):
+            sumo.simulationStep()
+            self.assertEqual(clock.update(), _step)
+            self.assertEqual([clock.time for _ in range(5)], [_step] * 5)
+        self.assertEqual(sumo.num_calls, 4) # bind 一次, update 三次
+
+    def test_invalidate(self) -> None:
+        sumo = FakeSumo()
+        clock = SimulationClock()
+        clock.bind(sumo)
+        sumo.simulationStep()
+        self.assertEqual(clock.time, 0) # 没有 update, 仍然是缓存的时间
+        clock.invalidate()
+        self.assertEqual(clock.time, 1)
+
+    def test_rebind(self) -> None:
+        """reset 之后绑定新的连接
+        """
+        clock = SimulationClock()
+        old_sumo, new_sumo = FakeSumo(), FakeSumo()
+        clock.bind(old_sumo)
+        old_sumo.simulationStep()
+        clock.update()
+        self.assertEqual(clock.bind(new_sumo), 0)
+        self.assertEqual(clock.time, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
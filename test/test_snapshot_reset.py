@@ -0,0 +1,87 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:52:36
+@Description: 检测快照 reset (is_snapshot_reset=True) 之后, 信号灯的方案, phase 和车辆与第一次 reset 相同
+- loadState 不会恢复随机数的状态, 这里使用没有随机性的车辆 (sigma=0, speedDev=0, departLane=best), 加载快照之后的 settle 步是确定的
+LastEditTime: 2026-10-18 20:52:36
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+ROUTE_FILE = path_convert("../examples/sumo_env/three_junctions/env/3junctions.rou.xml")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestSnapshotReset(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        """去掉 route 文件中的随机性
+        """
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.route_file = os.path.join(cls.temp_dir, 'deterministic.rou.xml')
+        with open(ROUTE_FILE) as f:
+            routes = f.read()
+        routes = routes.replace('<vType ', '<vType sigma="0" speedDev="0" ').replace('departLane="random"', 'departLane="best"')
+        with open(cls.route_file, 'w') as f:
+            f.write(routes)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self) -> None:
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        self.env = TshubEnvironment(
+            sumo_cfg=SUMO_CFG, route_file=self.route_file,
+            is_aircraft_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            is_libsumo=True, sumo_seed=1, num_seconds=300,
+            is_snapshot_reset=True, snapshot_warmup_steps=60,
+        )
+
+    def tearDown(self) -> None:
+        self.env._close_simulation()
+
+    def get_state(self, obs):
+        """当前的仿真时间, 每个信号灯的方案和 phase, 以及路网中的车辆
+        """
+        sumo = self.env.sumo
+        tls_states = {
+            _tls_id: (
+                sumo.trafficlight.getProgram(_tls_id), sumo.trafficlight.getPhase(_tls_id),
+                sumo.trafficlight.getNextSwitch(_tls_id), str(sumo.trafficlight.getAllProgramLogics(_tls_id)),
+            )
+            for _tls_id in TLS_IDS
+        }
+        vehicle_ids = sorted(sumo.vehicle.getIDList())
+        self.assertEqual(sorted(obs['vehicle']), vehicle_ids)
+        return self.env.sim_step, tls_states, vehicle_ids
+
+    def run_episode(self, num_steps:int=100) -> None:
+        """每次可以做动作的时候切换到下一个 phase, 修改信号灯的状态
+        """
+        obs = self.env.reset()
+        state = self.get_state(obs)
+        for _ in range(num_steps):
+            actions = {_tls_id: 1 if obs['tls'][_tls_id]['can_perform_action'] else 0 for _tls_id in TLS_IDS}
+            obs, reward, info, done = self.env.step({'tls': actions})
+        return state, self.get_state(obs)
+
+    def test_reset_restores_tls_and_vehicles(self) -> None:
+        first_state, first_end_state = self.run_episode()
+        self.assertNotEqual(first_state, first_end_state) # episode 中信号灯和车辆都发生了变化
+        for _ in range(2):
+            state, _ = self.run_episode()
+            self.assertEqual(state, first_state)
+
+
+if __name__ == '__main__':
+    unittest.main()
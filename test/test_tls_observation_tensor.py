@@ -0,0 +1,82 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:58:44
+@Description: 检测 is_tls_tensor=True 时的数组与 dict 格式的信号灯观测相同 (相同的种子和动作)
+LastEditTime: 2026-10-18 21:58:44
+'''
+import os
+import unittest
+import numpy as np
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestTLSObservationTensor(unittest.TestCase):
+    def make_env(self, is_tls_tensor:bool, movement_width:int=12):
+        """同时运行两个环境, 使用 TraCI (libsumo 在一个进程中只能有一个仿真)
+        """
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        return TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            is_tls_tensor=is_tls_tensor, tls_movement_width=movement_width,
+            is_libsumo=False, sumo_seed=1, num_seconds=300,
+        )
+
+    def compare(self, tensor_obs, dict_obs) -> None:
+        features = tensor_obs['features']
+        self.assertEqual(tensor_obs['tls_ids'], TLS_IDS)
+        for _tls_id, _row in tensor_obs['tls_id2row'].items():
+            _tls_obs = dict_obs[_tls_id]
+            _num_movements = len(tensor_obs['movement_ids'][_tls_id])
+            _start, _end = tensor_obs['movement_indptr'][_row], tensor_obs['movement_indptr'][_row+1]
+            self.assertEqual(tensor_obs['movement_ids'][_tls_id], _tls_obs['movement_ids'][:_num_movements])
+            self.assertEqual(_end - _start, _num_movements)
+            self.assertEqual(tensor_obs['movement_mask'][_row].tolist(), [True]*_num_movements + [False]*(tensor_obs['movement_mask'].shape[1]-_num_movements))
+            self.assertEqual(tensor_obs['this_phase_index'][_row], _tls_obs['this_phase_index'])
+            self.assertEqual(tensor_obs['can_perform_action'][_row], _tls_obs['can_perform_action'])
+            for _feature_index, _feature in enumerate(features):
+                expected = np.asarray(_tls_obs[_feature][:_num_movements], dtype=np.float32)
+                np.testing.assert_array_equal(tensor_obs['movement_values'][_start:_end, _feature_index], expected)
+                np.testing.assert_array_equal(tensor_obs['movement_features'][_row, :_num_movements, _feature_index], expected)
+            self.assertFalse(tensor_obs['movement_features'][_row, _num_movements:].any()) # padding 的位置为 0
+
+    def run_envs(self, movement_width:int) -> None:
+        dict_env, tensor_env = self.make_env(is_tls_tensor=False), self.make_env(is_tls_tensor=True, movement_width=movement_width)
+        try:
+            dict_obs, tensor_obs = dict_env.reset(), tensor_env.reset()
+            for _step in range(150):
+                self.compare(tensor_obs['tls'], dict_obs['tls'])
+                actions = {_tls_id: _step % 2 for _tls_id in TLS_IDS}
+                dict_obs, *_ = dict_env.step({'tls': actions})
+                tensor_obs, *_ = tensor_env.step({'tls': actions})
+            self.assertGreater(tensor_obs['tls']['movement_values'].sum(), 0) # 有车辆经过探测器
+        finally:
+            dict_env._close_simulation()
+            tensor_env._close_simulation()
+
+    def test_tensor_equals_dict(self) -> None:
+        self.run_envs(movement_width=12)
+
+    def test_movement_width_none(self) -> None:
+        """movement_width=None 时使用场景中最大的 movement 数量
+        """
+        env = self.make_env(is_tls_tensor=True, movement_width=None)
+        try:
+            tls_obs = env.reset()['tls']
+            max_movements = max(len(_movement_ids) for _movement_ids in tls_obs['movement_ids'].values())
+            self.assertEqual(tls_obs['movement_features'].shape, (len(TLS_IDS), max_movements, len(tls_obs['features'])))
+        finally:
+            env._close_simulation()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 23:31:05
+@Description: 检测 BaseTLS.set_phase 使用缓存的 all_phases 检查 phase index, requested_phase_state 与 SUMO 中的状态相同
+LastEditTime: 2026-10-18 23:31:05
+'''
+import os
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestTLSSetPhase(unittest.TestCase):
+    def test_set_phase(self) -> None:
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        env = TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            is_libsumo=True, sumo_seed=1, num_seconds=300,
+        )
+        try:
+            env.reset()
+            for _step in range(20):
+                env.step({'tls': {_tls_id: _step % 2 for _tls_id in TLS_IDS}})
+                for _tls_id in TLS_IDS:
+                    tls_action = env.scene_objects['tls'].traffic_lights[_tls_id].tls_action
+                    self.assertEqual(tls_action.requested_phase_state, env.sumo.trafficlight.getRedYellowGreenState(_tls_id))
+            tls_action = env.scene_objects['tls'].traffic_lights['J1'].tls_action
+            for _phase_index in (-1, len(tls_action.all_phases)):
+                with self.assertRaises(ValueError):
+                    tls_action.set_phase(_phase_index)
+        finally:
+            env._close_simulation()
+
+
+if __name__ == '__main__':
+    unittest.main()
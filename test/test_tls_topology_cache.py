@@ -0,0 +1,98 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:51:37
+@Description: 检测 TLSTopologyCache 的 key (路网文件的 realpath 和内容), 内存缓存的上限以及硬盘缓存
+LastEditTime: 2026-10-18 21:51:37
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from tshub.traffic_light.tls_topology_cache import TLSTopologyCache
+
+
+def make_sumo(net_file:str):
+    """只需要 simulation.getOption('net-file')
+    """
+    return SimpleNamespace(simulation=SimpleNamespace(getOption=lambda option: net_file))
+
+
+class TestTLSTopologyCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.realpath(tempfile.mkdtemp())
+        self.net_dir = os.path.join(self.temp_dir, 'env')
+        os.makedirs(self.net_dir)
+        self.net_file = os.path.join(self.net_dir, 'test.net.xml')
+        with open(self.net_file, 'w') as f:
+            f.write('<net version="1.20"/>')
+        self.topology = {'movement_ids': ['E1--s', 'E1--l'], 'lanes': ['E1_0', 'E1_1']}
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_key(self, cache:TLSTopologyCache, net_file:str, tls_id:str='J1') -> str:
+        return cache.get_key(make_sumo(net_file), tls_id, '0', ('GGrr', 'rrGG'))
+
+    def test_same_file_same_key(self) -> None:
+        """相对路径, 绝对路径, .. 和符号链接指向同一个文件时 key 相同
+        """
+        cache = TLSTopologyCache()
+        key = self.get_key(cache, self.net_file)
+        link_dir = os.path.join(self.temp_dir, 'link')
+        os.symlink(self.net_dir, link_dir)
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            for _net_file in ('env/test.net.xml', './link/../env/test.net.xml', os.path.join(link_dir, 'test.net.xml')):
+                self.assertEqual(self.get_key(cache, _net_file), key)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(len(cache._net_hashes), 1)
+        self.assertNotEqual(self.get_key(cache, self.net_file, tls_id='J2'), key)
+
+    def test_net_file_changed(self) -> None:
+        cache = TLSTopologyCache()
+        key = self.get_key(cache, self.net_file)
+        with open(self.net_file, 'w') as f:
+            f.write('<net version="1.20"><edge id="E1"/></net>')
+        self.assertNotEqual(self.get_key(cache, self.net_file), key)
+        self.assertEqual(len(cache._net_hashes), 1) # 只保留最新的 hash
+
+    def test_memory_cache(self) -> None:
+        cache = TLSTopologyCache()
+        self.assertIsNone(cache.load('missing'))
+        cache.save('J1', self.topology)
+        topology = cache.load('J1')
+        self.assertEqual(topology, self.topology)
+        topology['lanes'].append('E1_2') # 每次读取都是新的对象
+        self.assertEqual(cache.load('J1'), self.topology)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.load('J1'))
+
+    def test_memory_limit(self) -> None:
+        cache = TLSTopologyCache(max_memory_entries=2)
+        cache.save('J1', self.topology)
+        cache.save('J2', self.topology)
+        cache.load('J1') # J2 是最久没有使用的
+        cache.save('J3', self.topology)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.load('J2'))
+        self.assertIsNotNone(cache.load('J1'))
+        self.assertIsNotNone(cache.load('J3'))
+
+    def test_disk_cache(self) -> None:
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        TLSTopologyCache(cache_dir=cache_dir).save('J1', self.topology)
+        cache = TLSTopologyCache(cache_dir=cache_dir, max_memory_entries=1) # 另一个进程
+        self.assertEqual(cache.load('J1'), self.topology)
+        cache.save('J2', self.topology)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.load('J1'), self.topology) # 从内存中删除之后仍然可以从硬盘读取
+        self.assertEqual([_file for _file in os.listdir(cache_dir) if _file.endswith('.tmp')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:22:47
+@Description: 检测 V2V 和 V2I 批量计算的 SNR 与逐个调用 get_snr 的结果相同 (固定随机种子)
+LastEditTime: 2026-10-18 21:22:47
+'''
+import unittest
+import numpy as np
+
+from tshub.v2x import V2VChannel, V2IChannel
+
+
+class TestV2XChannel(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        # 距离同时包含 LOS (< 100m) 和 NLOS
+        self.previous_positions_A = rng.uniform(0, 300, size=(6, 2))
+        self.current_positions_A = self.previous_positions_A + rng.uniform(-5, 5, size=(6, 2))
+        self.previous_positions_B = rng.uniform(0, 300, size=(4, 2))
+        self.current_positions_B = self.previous_positions_B + rng.uniform(-5, 5, size=(4, 2))
+
+    def test_v2v_matrix_equals_scalar(self) -> None:
+        np.random.seed(1)
+        channel = V2VChannel()
+        np.random.seed(2)
+        scalar_snr = [
+            [
+                channel.get_snr(
+                    self.previous_positions_A[_i], self.current_positions_A[_i],
+                    self.previous_positions_B[_j], self.current_positions_B[_j],
+                )
+                for _j in range(4)
+            ]
+            for _i in range(6)
+        ]
+        np.random.seed(2)
+        snr_matrix = channel.get_snr_matrix(
+            self.previous_positions_A, self.current_positions_A,
+            self.previous_positions_B, self.current_positions_B,
+        )
+        self.assertEqual(snr_matrix.shape, (6, 4))
+        np.testing.assert_allclose(snr_matrix, scalar_snr, rtol=0, atol=1e-9)
+
+    def test_v2v_links_equals_matrix(self) -> None:
+        """所有 link 按照 row-major 的顺序时, get_snr_links 与 get_snr_matrix 相同
+        """
+        channel = V2VChannel()
+        links = np.array([(_i, _j) for _i in range(6) for _j in range(4)])
+        np.random.seed(3)
+        snr_matrix = channel.get_snr_matrix(
+            self.previous_positions_A, self.current_positions_A,
+            self.previous_positions_B, self.current_positions_B,
+        )
+        np.random.seed(3)
+        snr_links = channel.get_snr_links(
+            self.previous_positions_A, self.current_positions_A,
+            self.previous_positions_B, self.current_positions_B,
+            links=links,
+        )
+        np.testing.assert_allclose(snr_links, snr_matrix.reshape(-1), rtol=0, atol=1e-9)
+
+    def test_v2i_matrix_equals_scalar(self) -> None:
+        np.random.seed(1)
+        channel = V2IChannel(BS_position=[150, 150])
+        for is_ms_transmit, is_ms_received in ((True, False), (False, True)):
+            np.random.seed(2)
+            scalar_snr = [
+                channel.get_snr(
+                    self.previous_positions_A[_i], self.current_positions_A[_i],
+                    is_ms_transmit=is_ms_transmit, is_ms_received=is_ms_received,
+                )
+                for _i in range(6)
+            ]
+            np.random.seed(2)
+            snr_matrix = channel.get_snr_matrix(
+                self.previous_positions_A, self.current_positions_A,
+                is_ms_transmit=is_ms_transmit, is_ms_received=is_ms_received,
+            )
+            self.assertEqual(snr_matrix.shape, (6,))
+            np.testing.assert_allclose(snr_matrix, scalar_snr, rtol=0, atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
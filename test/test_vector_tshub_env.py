@@ -0,0 +1,65 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:40:12
+@Description: 检测 VectorTshubEnv 的观测形状, 以及不同的 sumo_seed 会产生不同的仿真
+LastEditTime: 2026-10-18 20:40:12
+'''
+import os
+import unittest
+import numpy as np
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestVectorTshubEnv(unittest.TestCase):
+    def make_env(self, seeds):
+        from tshub.tshub_env.vector_tshub_env import VectorTshubEnv
+        env_kwargs = dict(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            tls_features=['jam_length_vehicle', 'last_step_occupancy'],
+            num_seconds=200,
+        )
+        return VectorTshubEnv(num_envs=len(seeds), env_kwargs=env_kwargs, seeds=seeds)
+
+    def run_envs(self, seeds, num_steps:int=150) -> bool:
+        """返回两个环境的观测是否在某一步不同
+        """
+        with self.make_env(seeds) as vector_env:
+            obs = vector_env.reset()
+            self.assertEqual(obs['movement_features'].shape, (2, len(TLS_IDS), 12, 2))
+            is_diverged = False
+            for _ in range(num_steps):
+                obs, rewards, infos, dones = vector_env.step(np.zeros((2, len(TLS_IDS)), dtype=np.int64))
+                is_diverged |= not np.array_equal(obs['movement_features'][0], obs['movement_features'][1])
+        return is_diverged
+
+    def test_different_seeds_diverge(self) -> None:
+        self.assertTrue(self.run_envs(seeds=[1, 2]))
+
+    def test_same_seed_identical(self) -> None:
+        self.assertFalse(self.run_envs(seeds=[1, 1]))
+
+    def test_worker_died(self) -> None:
+        """子进程没有返回就退出时, 关闭其他的子进程并抛出异常 (不会一直等待)
+        """
+        vector_env = self.make_env(seeds=[1, 2])
+        vector_env.reset()
+        vector_env.processes[0].kill() # 模拟 libsumo abort
+        vector_env.processes[0].join(timeout=10)
+        with self.assertRaisesRegex(RuntimeError, 'Worker 0'):
+            vector_env.step(np.zeros((2, len(TLS_IDS)), dtype=np.int64))
+        self.assertTrue(vector_env.closed)
+        self.assertFalse(any(_process.is_alive() for _process in vector_env.processes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 22:16:40
+@Description: 检测 VehicleIDTable 的 handle 分配, 以及 handle 格式的信号灯观测通过 env 转换之后与 list 格式相同
+LastEditTime: 2026-10-18 22:16:40
+'''
+import os
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+from tshub.traffic_light.vehicle_id_table import VehicleIDTable
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/three_junctions/env/3junctions.sumocfg")
+TLS_IDS = ['J1', 'J2', 'J3']
+
+
+class TestVehicleIDTable(unittest.TestCase):
+    def test_intern(self) -> None:
+        table = VehicleIDTable()
+        self.assertEqual(table.intern_many(['veh_b', 'veh_a', 'veh_b']), [0, 1, 0])
+        self.assertEqual(table.intern('veh_c'), 2)
+        self.assertEqual(table.intern('veh_a'), 1) # handle 不会改变
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.get_ids([2, 0]), ['veh_c', 'veh_b'])
+        self.assertEqual(VehicleIDTable.unique([[0, 1], [1, 2], []]), {0, 1, 2})
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.intern('veh_c'), 0)
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestEnvVehicleIDTable(unittest.TestCase):
+    def make_env(self, vehicle_id_format:str):
+        """同时运行两个环境, 使用 TraCI (libsumo 在一个进程中只能有一个仿真)
+        """
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        return TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_vehicle_builder_initialized=False,
+            is_person_builder_initialized=False,
+            tls_ids=TLS_IDS, tls_action_type='choose_next_phase',
+            tls_features=['last_step_vehicle_id_list'], tls_vehicle_id_format=vehicle_id_format,
+            is_libsumo=False, sumo_seed=1, num_seconds=300,
+        )
+
+    def test_handle_to_ids(self) -> None:
+        list_env, handle_env = self.make_env('list'), self.make_env('handle')
+        try:
+            with self.assertRaises(ValueError):
+                handle_env.get_tls_vehicle_id_table() # reset 之前没有 builder
+            for _ in range(2): # 每次 reset 之后重新获取
+                list_obs, handle_obs = list_env.reset(), handle_env.reset()
+                table = handle_env.get_tls_vehicle_id_table()
+                num_vehicles = 0
+                for _ in range(100):
+                    actions = {'tls': {_tls_id: 0 for _tls_id in TLS_IDS}}
+                    list_obs, *_ = list_env.step(actions)
+                    handle_obs, *_ = handle_env.step(actions)
+                    for _tls_id in TLS_IDS:
+                        _handles = handle_obs['tls'][_tls_id]['last_step_vehicle_id_list']
+                        _vehicle_ids = list_obs['tls'][_tls_id]['last_step_vehicle_id_list']
+                        self.assertEqual([table.get_ids(_movement) for _movement in _handles], _vehicle_ids)
+                        num_vehicles += sum(map(len, _vehicle_ids))
+                self.assertGreater(num_vehicles, 0)
+        finally:
+            list_env._close_simulation()
+            handle_env._close_simulation()
+
+
+if __name__ == '__main__':
+    unittest.main()
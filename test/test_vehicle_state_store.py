@@ -0,0 +1,73 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:10:26
+@Description: 检测 VehicleStateStore 的扩容, 空闲 row 的复用以及订阅结果的批量更新
+LastEditTime: 2026-10-18 21:10:26
+'''
+import unittest
+import numpy as np
+
+from tshub.vehicle.vehicle import VehicleInfo
+from tshub.vehicle.vehicle_state_store import VehicleStateStore
+
+FEATURES = ('position', 'speed', 'lane_index', 'road_id', 'length')
+
+
+def make_features(index:int):
+    return {
+        'position': (index, -index), 'speed': float(index), 'lane_index': index % 3,
+        'road_id': f'edge_{index}', 'length': 5.0,
+    }
+
+
+class TestVehicleStateStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = VehicleStateStore(capacity=2, features=FEATURES)
+
+    def test_grow(self) -> None:
+        rows = [self.store.add(f'veh_{_i}', make_features(_i)) for _i in range(5)]
+        self.assertEqual(rows, [0, 1, 2, 3, 4])
+        self.assertEqual(self.store.capacity, 8)
+        self.assertEqual(len(self.store), 5)
+        views = self.store.get_views() # 扩容之后, 之前写入的数据不变
+        self.assertEqual(views['ids'], [f'veh_{_i}' for _i in range(5)])
+        np.testing.assert_array_equal(views['position'], [[_i, -_i] for _i in range(5)])
+        np.testing.assert_array_equal(views['lane_index'], [_i % 3 for _i in range(5)])
+        self.assertEqual(views['road_id'], [f'edge_{_i}' for _i in range(5)])
+        self.assertEqual(self.store.get_row('veh_3'), {'id': 'veh_3', **make_features(3)})
+
+    def test_free_row_reuse(self) -> None:
+        for _i in range(4):
+            self.store.add(f'veh_{_i}', make_features(_i))
+        self.store.remove('veh_2')
+        self.store.remove('veh_0')
+        self.assertNotIn('veh_0', self.store)
+        views = self.store.get_views()
+        self.assertEqual(views['valid'].tolist(), [False, True, False, True])
+        self.assertEqual(views['ids'], [None, 'veh_1', None, 'veh_3'])
+        self.assertEqual(views['road_id'], [None, 'edge_1', None, 'edge_3'])
+        self.assertEqual(views['speed'].tolist(), [0, 1, 0, 3])
+        # 优先复用较小的 row, 不会扩容
+        self.assertEqual(self.store.add('veh_4', make_features(4)), 0)
+        self.assertEqual(self.store.add('veh_5', make_features(5)), 2)
+        self.assertEqual(self.store.add('veh_6', make_features(6)), 4)
+        self.assertEqual(self.store.get_views()['ids'], ['veh_4', 'veh_1', 'veh_5', 'veh_3', 'veh_6'])
+
+    def test_update(self) -> None:
+        for _i in range(3):
+            self.store.add(f'veh_{_i}', make_features(_i))
+        key = VehicleInfo.get_feature_index
+        self.store.update({
+            'veh_2': {key('position'): (20, 21), key('speed'): 12.0, key('lane_index'): 1, key('road_id'): 'edge_x'},
+            'veh_0': {key('position'): (0, 1), key('speed'): 10.0, key('lane_index'): 2, key('road_id'): 'edge_y'},
+        })
+        views = self.store.get_views()
+        np.testing.assert_array_equal(views['position'], [[0, 1], [1, -1], [20, 21]])
+        self.assertEqual(views['speed'].tolist(), [10, 1, 12])
+        self.assertEqual(views['lane_index'].tolist(), [2, 1, 1])
+        self.assertEqual(views['road_id'], ['edge_y', 'edge_1', 'edge_x'])
+        self.assertEqual(views['length'].tolist(), [5, 5, 5]) # 静态特征不会被更新
+
+
+if __name__ == '__main__':
+    unittest.main()
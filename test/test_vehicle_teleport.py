@@ -0,0 +1,65 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 23:48:26
+@Description: 检测 teleport 时 VehicleBuilder 中的车辆与 getIDList 相同
+- teleport 中的车辆不在 getIDList 中, 但是订阅结果仍然存在
+- pedestrian_cross 中 E1__3__background.3 在 249s 开始 teleport, 250s 结束
+LastEditTime: 2026-10-18 23:48:26
+'''
+import os
+import unittest
+
+from tshub.utils.get_abs_path import get_abs_path
+
+path_convert = get_abs_path(__file__)
+SUMO_CFG = path_convert("../examples/sumo_env/pedestrian_cross/env/pedestrian_cross.sumocfg")
+
+
+@unittest.skipUnless('SUMO_HOME' in os.environ, 'SUMO_HOME is not set.')
+class TestVehicleTeleport(unittest.TestCase):
+    def run_env(self, subscription_mode:str, is_columnar:bool=False, n_steps:int=1) -> int:
+        """每一次更新之后比较 obs 中的车辆与 getIDList, 返回跨越多步的 teleport 的数量
+        """
+        from tshub.tshub_env.tshub_env import TshubEnvironment
+        env = TshubEnvironment(
+            sumo_cfg=SUMO_CFG,
+            is_aircraft_builder_initialized=False,
+            is_person_builder_initialized=False,
+            is_traffic_light_builder_initialized=False,
+            vehicle_action_type='lane',
+            is_vehicle_columnar=is_columnar, vehicle_subscription_mode=subscription_mode,
+            is_libsumo=True, sumo_seed=1, num_seconds=400, time_to_teleport=20,
+        )
+        try:
+            env.reset()
+            teleporting, num_long_teleports = set(), 0
+            for _ in range(400 // n_steps):
+                obs, *_ = env.step({'vehicle': {}}, n_steps=n_steps)
+                starting = set(env.sumo.simulation.getStartingTeleportIDList())
+                ending = set(env.sumo.simulation.getEndingTeleportIDList())
+                num_long_teleports += len(teleporting & ending)
+                teleporting = (teleporting | starting) - ending
+                if is_columnar:
+                    vehicle_ids = set(obs['vehicle']['id2row'])
+                else:
+                    vehicle_ids = set(obs['vehicle'])
+                self.assertEqual(vehicle_ids, set(env.sumo.vehicle.getIDList()))
+            return num_long_teleports
+        finally:
+            env._close_simulation()
+
+    def test_vehicle_subscription(self) -> None:
+        self.assertGreater(self.run_env('vehicle'), 0) # teleport 结束之后重新添加
+        self.assertGreater(self.run_env('vehicle', is_columnar=True), 0)
+
+    def test_context_subscription(self) -> None:
+        self.assertGreater(self.run_env('context'), 0)
+
+    def test_skip_steps(self) -> None:
+        """跳过若干步更新时与 getIDList 进行比较
+        """
+        self.run_env('vehicle', n_steps=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,7 @@
 import traci
 import math
 from dataclasses import dataclass, fields
-from typing import Tuple, Dict, Any, Callable
+from typing import Tuple, Dict, Any, Callable, List
 from loguru import logger
 
 from .aircraft_action_type import aircraft_action_type
@@ -191,6 +191,14 @@ class AircraftInfo:
                 output_dict[field_name] = field_value
         return output_dict
 
+    def get_covered_objects(self, neighbor_index) -> List[str]:
+        """返回地面覆盖范围 (cover_radius) 内物体的 id
+
+        Args:
+            neighbor_index (NeighborIndex): 车辆 (或其他物体) 的空间索引, 见 tshub.v2x.NeighborIndex
+        """
+        return neighbor_index.query_radius(self.position, self.cover_radius)
+
     def control_aircraft(self, action) -> None:
         speed, heading_index = action
         new_position, heading = self.aircraft_action.execute(
@@ -36,10 +36,24 @@ class AircraftBuilder(BaseBuilder):
                     }
                 }
         """
+        self.sumo = sumo
+        self.aircraft_inits = aircraft_inits # 加载快照之后使用初始参数重新创建
         self.aircraft_dict = {} # 存储每一个 aircraft 的类
         for _aircraft_id, _aircraft_parameter in aircraft_inits.items():
             self.create_objects(id=_aircraft_id, sumo=sumo, **_aircraft_parameter)
 
+    def resync(self) -> None:
+        """加载快照之后, 将 aircraft 恢复为初始的参数.
+        SUMO 中的 POI 和 polygon 不会被 loadState 删除, 需要先删除再重新添加
+        """
+        for _aircraft_id, _aircraft in self.aircraft_dict.items():
+            if _aircraft.if_sumo_visualization:
+                self.sumo.poi.remove(_aircraft_id)
+                self.sumo.polygon.remove(_aircraft_id)
+        self.aircraft_dict = {}
+        for _aircraft_id, _aircraft_parameter in self.aircraft_inits.items():
+            self.create_objects(id=_aircraft_id, sumo=self.sumo, **_aircraft_parameter)
+
     def create_objects(
             self, id:str, aircraft_type:str,
             action_type:str, 
@@ -124,4 +124,9 @@ class MapBuilder(BaseBuilder):
         return NotImplementedError
     
     def control_objects(self) -> None:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def resync(self) -> None:
+        """地图的信息来自 net 文件, 与仿真的状态无关, 加载快照之后不需要同步
+        """
+        pass
\ No newline at end of file
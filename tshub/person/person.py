@@ -12,6 +12,15 @@ from loguru import logger
 from dataclasses import dataclass, fields
 from typing import List, Tuple
 
+# 每一个特征对应的订阅变量
+PERSON_FEATURE_VARIABLES = {
+    'angle': traci.constants.VAR_ANGLE, 'position': traci.constants.VAR_POSITION, 
+    'speed': traci.constants.VAR_SPEED, 'road_id': traci.constants.VAR_ROAD_ID, 
+    'waiting_time': traci.constants.VAR_WAITING_TIME, 'next_edge': traci.constants.VAR_NEXT_EDGE,
+    'lane_position': traci.constants.VAR_LANEPOSITION
+}
+# 订阅结果用于判断行人是否还在路网中, 因此至少需要订阅一个变量
+PERSON_REQUIRED_FEATURES = ('road_id',)
 
 @dataclass
 class PersonInfo:
@@ -27,17 +36,13 @@ class PersonInfo:
     waiting_time: float  # The waiting time of the person
     next_edge: str # Returns the next edge on the persons route while it is walking. If there is no further edge or the person is in another stage, returns the empty string.
     sumo: traci.connection.Connection
+    features: Tuple[str] = None # 需要输出的特征, None 表示输出所有的特征
 
     def __post_init__(self) -> None:
         # 订阅行人
         self.sumo.person.subscribe(
                 self.id,
-                [
-                    traci.constants.VAR_ANGLE, traci.constants.VAR_POSITION, 
-                    traci.constants.VAR_SPEED, traci.constants.VAR_ROAD_ID, 
-                    traci.constants.VAR_WAITING_TIME, traci.constants.VAR_NEXT_EDGE,
-                    traci.constants.VAR_LANEPOSITION
-                ]
+                PersonInfo.get_subscription_variables(self.features)
             )
 
     @classmethod
@@ -47,7 +52,8 @@ class PersonInfo:
                        lane_position: float,
                        speed: float, road_id: str, 
                        waiting_time: float, 
-                       next_edge: List[str]
+                       next_edge: List[str],
+                       features: Tuple[str] = None
                     ):
         logger.info(f'SIM: Init Person: {id}')
         return cls(id=id, angle=angle,
@@ -55,7 +61,8 @@ class PersonInfo:
                    lane_position=lane_position,
                    speed=speed, road_id=road_id, 
                    waiting_time=waiting_time,
-                   next_edge=next_edge
+                   next_edge=next_edge,
+                   features=features
         )
 
     @staticmethod
@@ -78,25 +85,55 @@ class PersonInfo:
         }
         return feature_mapping.get(feature, -1)
     
+    @staticmethod
+    def get_subscription_variables(features:Tuple[str]=None) -> List[int]:
+        """根据选择的特征, 得到需要订阅的变量
+        """
+        return [
+            _variable for _feature, _variable in PERSON_FEATURE_VARIABLES.items()
+            if (features is None) or (_feature in features) or (_feature in PERSON_REQUIRED_FEATURES)
+        ]
+
+    @staticmethod
+    def check_features(features:List[str]=None) -> Tuple[str]:
+        """检查选择的特征是否都是 PersonInfo 的特征
+        """
+        if features is None:
+            return None
+        unknown_features = [_feature for _feature in features if _feature not in PERSON_FEATURES]
+        if unknown_features:
+            raise ValueError(f'Unknown person features {unknown_features}, should be in {PERSON_FEATURES}.')
+        return tuple(features)
+
     def update_features(self, person_info:Dict[int, Any]) -> None:
-        """更新在路网中的行人的信息
+        """更新在路网中的行人的信息 (只更新订阅结果中包含的特征)
         """
-        self.angle=person_info.get(PersonInfo.get_feature_index('angle'), None)
-        self.position=person_info.get(PersonInfo.get_feature_index('position'), None)
-        self.speed=person_info.get(PersonInfo.get_feature_index('speed'), None)
-        self.road_id=person_info.get(PersonInfo.get_feature_index('road_id'), None)
-        self.waiting_time=person_info.get(PersonInfo.get_feature_index('waiting_time'), None)
-        self.next_edge=person_info.get(PersonInfo.get_feature_index('next_edge'), None)
-        self.lane_position=person_info.get(PersonInfo.get_feature_index('lane_position'), None)
+        for _index, _value in person_info.items():
+            setattr(self, PERSON_INDEX_FEATURE[_index], _value)
 
     def get_features(self):
+        if self.features is not None:
+            return {_feature: getattr(self, _feature) for _feature in self.features}
+
         output_dict = {}
         for field in fields(self):
             field_name = field.name
             field_value = getattr(self, field_name)
-            if field_name != 'sumo':
+            if field_name not in ('sumo', 'features'):
                 output_dict[field_name] = field_value
         return output_dict
 
     def control_person(self) -> None:
-        pass
\ No newline at end of file
+        pass
+
+
+# PersonInfo 可以输出的所有特征
+PERSON_FEATURES = tuple(
+    _field.name for _field in fields(PersonInfo)
+    if _field.name not in ('sumo', 'features')
+)
+# 订阅结果的 index -> 特征的名称
+PERSON_INDEX_FEATURE = {
+    PersonInfo.get_feature_index(_feature): _feature
+    for _feature in PERSON_FEATURE_VARIABLES
+}
@@ -5,33 +5,50 @@
 @LastEditTime: 2023-11-24 17:52:07
 '''
 from loguru import logger
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from .person import PersonInfo
 from ..tshub_env.base_builder import BaseBuilder
+from ..tshub_env.simulation_clock import SimulationClock
 
 class PersonBuilder(BaseBuilder):
     """
     Provides methods to retrieve information and control all persons in the scene.
     """
 
-    def __init__(self, sumo) -> None:
+    def __init__(self, sumo, features:List[str]=None, clock:SimulationClock=None) -> None:
         self.sumo = sumo  # sumo connection]
         self.people: Dict[str, PersonInfo] = {}
+        self.clock = clock if clock is not None else SimulationClock(sumo) # 与 env 共享的仿真时间
+        self.features = PersonInfo.check_features(features) # 只订阅和输出选择的特征, None 表示所有的特征
+
+        # 记录上一次更新行人的时间, 用于判断是否可以直接使用 getDepartedPersonIDList
+        self._delta_t = self.sumo.simulation.getDeltaT()
+        self._last_sync_time = None
+
+    def resync(self) -> None:
+        """加载快照之后清空所有行人, 在下一次更新时通过 getIDList 重新添加 (同时重新订阅)
+        """
+        self.people = {}
+        self._last_sync_time = None
 
     def create_objects(self, person_id: str) -> None:
         """初始化行人
         """
+        _get_feature = lambda feature, getter: (
+            getter(person_id) if (self.features is None) or (feature in self.features) else None
+        ) # 没有选择的特征不需要从 SUMO 获取
         person_info = PersonInfo.create_person(
             id=person_id,
-            angle=self.sumo.person.getAngle(person_id),
-            position=self.sumo.person.getPosition(person_id),
-            lane_position=self.sumo.person.getLanePosition(person_id),
-            speed=self.sumo.person.getSpeed(person_id),
-            road_id=self.sumo.person.getRoadID(person_id),
-            next_edge=self.sumo.person.getNextEdge(person_id),
+            angle=_get_feature('angle', self.sumo.person.getAngle),
+            position=_get_feature('position', self.sumo.person.getPosition),
+            lane_position=_get_feature('lane_position', self.sumo.person.getLanePosition),
+            speed=_get_feature('speed', self.sumo.person.getSpeed),
+            road_id=_get_feature('road_id', self.sumo.person.getRoadID),
+            next_edge=_get_feature('next_edge', self.sumo.person.getNextEdge),
             waiting_time=0,
-            sumo=self.sumo
+            sumo=self.sumo,
+            features=self.features
         )
         self.people[person_id] = person_info
 
@@ -56,26 +73,41 @@ class PersonBuilder(BaseBuilder):
         """
         self.people[person_id].update_features(person_info)
 
+    def __get_departed_persons(self) -> List[str]:
+        """获得上一次更新之后进入路网的行人.
+        如果上一步刚刚更新过, 直接使用 getDepartedPersonIDList; 否则需要和 getIDList 进行比较.
+        """
+        current_time = self.clock.time
+        if (self._last_sync_time is not None) and (current_time - self._last_sync_time <= self._delta_t + 1e-6):
+            departed_person_ids = self.sumo.simulation.getDepartedPersonIDList()
+        else:
+            departed_person_ids = [
+                _person_id for _person_id in self.sumo.person.getIDList() 
+                if _person_id not in self.people
+            ]
+        self._last_sync_time = current_time
+        return departed_person_ids
+
     def update_objects_state(self) -> None:
         """更新场景中所有行人信息, 包含三个部分:
-        1. 对于离开环境的行人，将其从 self.people 中删除；
+        1. 对于离开环境的行人 (不在订阅结果中)，将其从 self.people 中删除；
         2. 对于之前就在环境中的行人，更新这些行人的信息；
         3. 对于新进入环境的行人，将其添加在 self.people；
         """
         subscription_results = self.sumo.person.getAllSubscriptionResults()
-        person_ids = self.sumo.person.getIDList() # 目前环境里面所有行人的 id
+        departed_person_ids = self.__get_departed_persons()
 
-        # 删除离开环境的行人
+        # 删除离开环境的行人, 更新已存在的行人信息
         for person_id in list(self.people.keys()):
-            if person_id not in person_ids:
+            person_info = subscription_results.get(person_id, None)
+            if person_info is None:
                 self.__delete_person(person_id)
-
-        # 更新已存在的行人信息
-        for person_id in person_ids:
-            if person_id in self.people:
-                person_info = subscription_results[person_id]
-                self.__update_existing_person(person_id, person_info)
             else:
+                self.__update_existing_person(person_id, person_info)
+
+        # 添加新进入环境的行人
+        for person_id in departed_person_ids:
+            if person_id not in self.people:
                 self.create_objects(person_id)
 
     def get_objects_infos(self):
@@ -0,0 +1,60 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:34:52
+@Description: 所有信号灯的动作时间 (next_action_time) 保存在一个优先队列 (heapq) 中
+- 信号灯做完动作之后 push 新的 next_action_time, 旧的记录不会删除 (lazy deletion), 在 peek 的时候跳过
+- 不需要每一步遍历所有信号灯, 就可以知道最早需要做动作的时间, env 可以直接仿真到这个时间
+- 错过动作时间的信号灯 (例如动作时间不在仿真步上) 会被重新调度到当前时间
+LastEditTime: 2026-10-18 21:34:52
+'''
+import heapq
+from loguru import logger
+from typing import Callable, Dict, List, Tuple
+
+
+class TLSDecisionScheduler:
+    def __init__(self, on_missed:Callable[[str, float], None]=None) -> None:
+        """
+        Args:
+            on_missed (Callable[[str, float], None], optional): 信号灯被重新调度到当前时间之后调用 on_missed(tls_id, sim_step), 
+                用于同步修改信号灯的 next_action_time. Defaults to None.
+        """
+        self.on_missed = on_missed
+        self.next_action_times: Dict[str, float] = {} # tls id -> 下一次做动作的时间
+        self.heap: List[Tuple[float, str]] = [] # (next_action_time, tls id), 可能包含过期的记录
+
+    def __len__(self) -> int:
+        return len(self.next_action_times)
+
+    def push(self, tls_id:str, next_action_time:float) -> None:
+        """记录信号灯下一次做动作的时间, 会覆盖之前的时间
+        """
+        self.next_action_times[tls_id] = next_action_time
+        heapq.heappush(self.heap, (next_action_time, tls_id))
+
+    def peek(self, sim_step:float) -> float:
+        """返回最早需要做动作的时间, 没有信号灯需要做动作时返回 None
+
+        Args:
+            sim_step (float): 当前的仿真时间. 早于当前时间且没有做动作的信号灯 (错过了动作时间) 会被重新调度到 sim_step, 
+                否则 sim_step == next_action_time 永远不成立, 信号灯不会再做动作.
+        """
+        while self.heap:
+            _time, _tls_id = self.heap[0]
+            if self.next_action_times.get(_tls_id, None) != _time: # 过期的记录
+                heapq.heappop(self.heap)
+            elif _time < sim_step: # 错过了动作时间, 在当前时间做动作
+                heapq.heappop(self.heap)
+                logger.warning(f'SIM: {_tls_id} missed its action time {_time}, rescheduled at {sim_step}.')
+                self.push(_tls_id, sim_step)
+                if self.on_missed is not None:
+                    self.on_missed(_tls_id, sim_step)
+            else:
+                return _time
+        return None
+
+    def is_due(self, sim_step:float) -> bool:
+        """是否有信号灯在 sim_step 需要做动作
+        """
+        return self.peek(sim_step) == sim_step
+
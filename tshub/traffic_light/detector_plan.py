@@ -0,0 +1,158 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 17:21:50
+@Description: 预先编译探测器 (e2) 到 movement 的聚合方式
+- 探测器的 id 为 e2det--junctionID--fromEdge--fromLane--directions, 只在初始化的时候解析一次
+- 每一个 (信号灯, movement) 对应一个 slot, 使用稀疏矩阵将探测器的结果加和, 再除以探测器的数量 (与 process_detector_data 相同)
+- 每一步只需要将订阅结果转换为数组, 进行一次矩阵乘法, 然后写入每一个信号灯
+LastEditTime: 2026-10-18 17:21:50
+'''
+import traci
+import numpy as np
+from loguru import logger
+from scipy.sparse import csr_matrix
+from typing import Dict, List, Any
+
+from .traffic_light import TrafficLightInfo
+from .traffic_light_feature_convert import TSCKeyMeaningsConverter
+from .vehicle_id_table import VehicleIDTable
+
+
+class DetectorAggregationPlan:
+    def __init__(self,
+                 detector_ids:List[str],
+                 traffic_lights:Dict[str, TrafficLightInfo],
+                 detector_variables:List[int],
+                 vehicle_id_format:str='list',
+                 vehicle_id_table:VehicleIDTable=None,
+        ) -> None:
+        """
+        Args:
+            detector_ids (List[str]): 所有订阅的探测器 id
+            traffic_lights (Dict[str, TrafficLightInfo]): 场景中的信号灯, 需要使用每个信号灯的 movement_ids
+            detector_variables (List[int]): 探测器订阅的变量
+            vehicle_id_format (str, optional): 车辆 id 列表的输出格式, list, handle 或是 count. Defaults to 'list'.
+            vehicle_id_table (VehicleIDTable, optional): handle 格式时车辆 id 和 handle 的对应关系. Defaults to None.
+        """
+        self.vehicle_id_format = vehicle_id_format
+        self.vehicle_id_table = vehicle_id_table
+        tsc_convert = TSCKeyMeaningsConverter()
+        self.list_variables = [
+            _variable for _variable in detector_variables
+            if _variable == traci.constants.LAST_STEP_VEHICLE_ID_LIST
+        ] # 需要拼接的特征 (车辆 id 列表)
+        self.numeric_variables = [
+            _variable for _variable in detector_variables
+            if _variable != traci.constants.LAST_STEP_VEHICLE_ID_LIST
+        ] # 需要取平均的特征
+        self.list_features = [tsc_convert.get_meaning(_variable) for _variable in self.list_variables]
+        self.numeric_features = [tsc_convert.get_meaning(_variable) for _variable in self.numeric_variables]
+
+        # 每一个 (信号灯, movement) 对应一个 slot
+        self.tls_slots: Dict[str, Dict[str, int]] = {} # tls id -> {movement id: slot}
+        self.slot_movements: List[tuple] = [] # slot -> (tls id, movement index)
+        for _tls_id, _traffic_light in traffic_lights.items():
+            self.tls_slots[_tls_id] = {}
+            for _movement_index, _movement_id in enumerate(_traffic_light.movement_ids):
+                self.tls_slots[_tls_id][_movement_id] = len(self.slot_movements)
+                self.slot_movements.append((_tls_id, _movement_index))
+
+        # 解析探测器的 id, 得到 (slot, detector) 的对应关系
+        self.detector_ids: List[str] = []
+        entry_slots, entry_detectors = [], []
+        for _detector_id in detector_ids:
+            parts = _detector_id.split('--')
+            if len(parts) < 5:
+                logger.warning(f'SIM: Detector {_detector_id} does not match e2det--junction--edge--lane--directions.')
+                continue
+            junction_id, edge_id, directions = parts[1], parts[2], parts[4]
+            if junction_id not in self.tls_slots:
+                continue
+            _detector_index = len(self.detector_ids)
+            self.detector_ids.append(_detector_id)
+            for direction in directions: # 多功能车道, 就两侧都进行统计
+                _slot = self.tls_slots[junction_id].get(f'{edge_id}--{direction}', None)
+                if _slot is not None:
+                    entry_slots.append(_slot)
+                    entry_detectors.append(_detector_index)
+
+        self.num_slots = len(self.slot_movements)
+        self.num_detectors = len(self.detector_ids)
+        self.sum_matrix = csr_matrix(
+            (np.ones(len(entry_slots)), (entry_slots, entry_detectors)),
+            shape=(self.num_slots, self.num_detectors)
+        ) # slot x detector, 同一个 movement 的探测器加和
+        self.sum_matrix.sum_duplicates() # 按照探测器的顺序排列, 与逐个相加的顺序相同
+        self.counts = np.asarray(self.sum_matrix.sum(axis=1)).ravel() # 每一个 slot 的探测器数量
+        self.slot_detectors = [
+            self.sum_matrix.indices[self.sum_matrix.indptr[_slot]:self.sum_matrix.indptr[_slot+1]].tolist()
+            for _slot in range(self.num_slots)
+        ] # 每一个 slot 的探测器, 用于拼接车辆 id
+        self.slot_repeats = [
+            self.sum_matrix.data[self.sum_matrix.indptr[_slot]:self.sum_matrix.indptr[_slot+1]].astype(int).tolist()
+            for _slot in range(self.num_slots)
+        ] # 同一个探测器在同一个 slot 中出现的次数
+
+        # 每一个信号灯中有探测器的 movement
+        self.tls_updates: Dict[str, tuple] = {}
+        for _tls_id, _movement_slots in self.tls_slots.items():
+            _slots = [_slot for _slot in _movement_slots.values() if self.counts[_slot] > 0]
+            self.tls_updates[_tls_id] = (
+                np.asarray(_slots, dtype=np.int64),
+                [self.slot_movements[_slot][1] for _slot in _slots]
+            ) # (slot, movement index)
+        logger.info(f'SIM: Detector Plan, {self.num_detectors} detectors -> {int((self.counts > 0).sum())} movements.')
+
+    def is_complete(self, detector_result:Dict[str, Dict[int, Any]]) -> bool:
+        """订阅结果中是否包含所有的探测器 (例如刚订阅还没有结果的时候, 需要使用 process_detector_data)
+        """
+        return all(_detector_id in detector_result for _detector_id in self.detector_ids)
+
+    def aggregate(self, detector_result:Dict[str, Dict[int, Any]]) -> Dict[str, Any]:
+        """将订阅结果聚合到每一个 slot
+
+        Returns:
+            Dict[str, Any]: 每一个特征在每一个 slot 的值, 数值特征为 (num_slots,) 的数组, 车辆 id 为 list (格式由 vehicle_id_format 决定)
+        """
+        slot_values = {}
+        if self.numeric_variables:
+            detector_values = np.array([
+                [detector_result[_detector_id][_variable] for _variable in self.numeric_variables]
+                for _detector_id in self.detector_ids
+            ], dtype=np.float64).reshape(self.num_detectors, len(self.numeric_variables)) # detector x feature
+            with np.errstate(invalid='ignore', divide='ignore'): # 没有探测器的 slot 不会被使用
+                means = (self.sum_matrix @ detector_values) / self.counts[:, None]
+            for _feature_index, _feature in enumerate(self.numeric_features):
+                slot_values[_feature] = means[:, _feature_index]
+
+        for _variable, _feature in zip(self.list_variables, self.list_features):
+            detector_lists = [detector_result[_detector_id][_variable] for _detector_id in self.detector_ids]
+            if self.vehicle_id_format == 'count': # 每个 movement 的车辆数, 不需要复制车辆 id
+                detector_counts = np.fromiter(map(len, detector_lists), dtype=np.int64, count=self.num_detectors)
+                slot_values[_feature] = (self.sum_matrix @ detector_counts).astype(np.int64).tolist()
+                continue
+            if self.vehicle_id_format == 'handle': # 每个探测器只转换一次
+                detector_lists = [self.vehicle_id_table.intern_many(_vehicle_ids) for _vehicle_ids in detector_lists]
+            slot_values[_feature] = [
+                [
+                    _vehicle_id
+                    for _detector_index, _repeat in zip(_detectors, _repeats)
+                    for _ in range(_repeat)
+                    for _vehicle_id in detector_lists[_detector_index]
+                ]
+                for _detectors, _repeats in zip(self.slot_detectors, self.slot_repeats)
+            ]
+        return slot_values
+
+    def apply(self, detector_result:Dict[str, Dict[int, Any]], traffic_lights:Dict[str, TrafficLightInfo]) -> None:
+        """聚合订阅结果, 并写入每一个信号灯 (只更新有探测器的 movement)
+        """
+        slot_values = self.aggregate(detector_result)
+        for _tls_id, (_slots, _movement_indices) in self.tls_updates.items():
+            movement_features = {}
+            for _feature, _values in slot_values.items():
+                if isinstance(_values, np.ndarray):
+                    movement_features[_feature] = _values[_slots].tolist()
+                else:
+                    movement_features[_feature] = [_values[_slot] for _slot in _slots]
+            traffic_lights[_tls_id].update_movement_features(_movement_indices, movement_features)
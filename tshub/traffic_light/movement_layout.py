@@ -0,0 +1,94 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:31:05
+@Description: 不同路口的 movement 数量不同 (T 型路口, 五岔路口, OSM 导入的路口), 使用 CSR 的方式排列所有的 movement
+- 所有路口的 movement 按照顺序拼接在一起, 路口 i 的 movement 为 [indptr[i], indptr[i+1])
+- 紧凑 (ragged) 的数组形状为 (num_movements, ...), 没有任何 padding
+- 需要固定形状的时候 (例如一个 batched policy), 使用 to_padded 导出 (num_tls, width, ...) 和对应的 mask
+LastEditTime: 2026-10-18 20:31:05
+'''
+import numpy as np
+from typing import Dict, List
+
+
+class MovementLayout:
+    def __init__(self, tls_movement_ids:Dict[str, List[str]]) -> None:
+        """
+        Args:
+            tls_movement_ids (Dict[str, List[str]]): 每个路口的 movement ids, 例如 {'J1': ['E1--s', 'E1--l', ...], ...}
+        """
+        self.tls_ids: List[str] = list(tls_movement_ids.keys())
+        self.tls_id2row: Dict[str, int] = {_tls_id: _row for _row, _tls_id in enumerate(self.tls_ids)}
+        self.movement_ids: List[str] = [] # 所有路口的 movement 拼接在一起
+        self.indptr = np.zeros(len(self.tls_ids)+1, dtype=np.int64)
+        for _row, _tls_id in enumerate(self.tls_ids):
+            self.movement_ids.extend(tls_movement_ids[_tls_id])
+            self.indptr[_row+1] = len(self.movement_ids)
+
+        self.num_tls = len(self.tls_ids)
+        self.num_movements = len(self.movement_ids)
+        self.movement_counts = np.diff(self.indptr) # 每个路口的 movement 数量
+        self.max_movements = int(self.movement_counts.max()) if self.num_tls else 0
+        # 每一个 movement 所在的路口 (row) 和在路口中的位置 (column)
+        self.movement_rows = np.repeat(np.arange(self.num_tls, dtype=np.int64), self.movement_counts)
+        self.movement_columns = np.arange(self.num_movements, dtype=np.int64) - self.indptr[self.movement_rows]
+
+    def get_slice(self, tls_id:str) -> slice:
+        """路口 tls_id 的 movement 在紧凑数组中的位置
+        """
+        _row = self.tls_id2row[tls_id]
+        return slice(int(self.indptr[_row]), int(self.indptr[_row+1]))
+
+    def check_width(self, width:int=None) -> int:
+        """检查 padding 的宽度, None 表示使用最大的 movement 数量
+        """
+        if width is None:
+            return self.max_movements
+        if width < self.max_movements:
+            _tls_id = self.tls_ids[int(self.movement_counts.argmax())]
+            raise ValueError(f'SIM: {_tls_id} has {self.max_movements} movements, more than the movement width {width}.')
+        return width
+
+    def get_mask(self, width:int=None) -> np.ndarray:
+        """(num_tls, width) 的 bool 数组, True 表示该位置有 movement
+        """
+        mask = np.zeros((self.num_tls, self.check_width(width)), dtype=bool)
+        mask[self.movement_rows, self.movement_columns] = True
+        return mask
+
+    def to_padded(self, values:np.ndarray, width:int=None, fill_value=0, out:np.ndarray=None) -> np.ndarray:
+        """将紧凑的数组 (num_movements, ...) 转换为固定形状 (num_tls, width, ...)
+
+        Args:
+            values (np.ndarray): 紧凑的数组, 第一维是 movement
+            width (int, optional): 每个路口的 movement 数量, None 表示使用最大的 movement 数量. Defaults to None.
+            fill_value (optional): padding 位置的值. Defaults to 0.
+            out (np.ndarray, optional): 写入已有的数组 (原地更新, padding 位置不会被修改). Defaults to None.
+
+        Returns:
+            np.ndarray: padding 之后的数组, 对应的 mask 使用 get_mask 获得
+        """
+        values = np.asarray(values)
+        width = self.check_width(width)
+        if out is None:
+            out = np.full((self.num_tls, width) + values.shape[1:], fill_value, dtype=values.dtype)
+        out[self.movement_rows, self.movement_columns] = values
+        return out
+
+    def from_padded(self, padded:np.ndarray) -> np.ndarray:
+        """将固定形状的数组 (num_tls, width, ...) 转换为紧凑的数组 (num_movements, ...), 例如 policy 输出的每个 movement 的值
+        """
+        return np.asarray(padded)[self.movement_rows, self.movement_columns]
+
+    def split(self, values:np.ndarray) -> Dict[str, np.ndarray]:
+        """将紧凑的数组拆分为每个路口的数组 (view, 不会复制)
+        """
+        return {_tls_id: values[self.get_slice(_tls_id)] for _tls_id in self.tls_ids}
+
+    def reduce_sum(self, values:np.ndarray) -> np.ndarray:
+        """每个路口所有 movement 的和, 返回 (num_tls, ...), 例如路口总的排队长度
+        """
+        values = np.asarray(values)
+        output = np.zeros((self.num_tls,) + values.shape[1:], dtype=np.result_type(values.dtype, np.float64))
+        np.add.at(output, self.movement_rows, values)
+        return output
@@ -0,0 +1,140 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 19:58:26
+@Description: 使用 NumPy 数组保存所有信号灯的观测 (紧凑的 CSR 数组, 以及固定形状的 padding 数组)
+- movement_values 为紧凑 (CSR) 的数组 (num_movements, F), 路口 i 的 movement 为 [movement_indptr[i], movement_indptr[i+1])
+- movement_features 为 padding 之后的数组 (num_tls, width, F), float32, 与 movement_mask 一起作为固定形状的输入
+- 两个数组每一步原地 (in place) 更新, 不需要重新拼接 list
+- (信号灯, movement) 在数组中的位置只在初始化的时候计算一次, 探测器的结果直接从 DetectorAggregationPlan 的 slot 写入数组
+LastEditTime: 2026-10-18 19:58:26
+'''
+import numpy as np
+from loguru import logger
+from typing import Dict, List, Any, Tuple
+
+from .traffic_light import TrafficLightInfo
+from .detector_plan import DetectorAggregationPlan
+from .movement_layout import MovementLayout
+
+# 可以写入 tensor 的特征 (每一个 movement 一个数值), 按照这个顺序排列
+TLS_TENSOR_FEATURES = (
+    'last_step_mean_speed', 'jam_length_vehicle', 'jam_length_meters', 'last_step_occupancy',
+    'this_phase',
+)
+
+
+class TLSObservationTensor:
+    """所有信号灯的 movement 特征保存在紧凑的 (num_movements, F) 数组和 padding 之后的 (num_tls, width, F) 数组中.
+
+    get_views 返回的是数组本身 (zero-copy), 下一次更新时会被原地覆盖,
+    如果需要保留某一步的结果, 需要自行 copy.
+    """
+    def __init__(self,
+                 traffic_lights:Dict[str, TrafficLightInfo],
+                 features:Tuple[str]=None,
+                 detector_plan:DetectorAggregationPlan=None,
+                 movement_width:int=12,
+        ) -> None:
+        """
+        Args:
+            traffic_lights (Dict[str, TrafficLightInfo]): 场景中的信号灯, 按照顺序对应 tensor 的第一维
+            features (Tuple[str], optional): 选择的特征, None 表示 TLS_TENSOR_FEATURES 中所有的特征. Defaults to None.
+            detector_plan (DetectorAggregationPlan, optional): 探测器的聚合方式, None 表示没有探测器. Defaults to None.
+            movement_width (int, optional): padding 之后每个路口的 movement 数量 (十字路口为 12), 
+                None 表示使用场景中最大的 movement 数量. Defaults to 12.
+        """
+        self.layout = MovementLayout({_tls_id: _traffic_light.movement_ids for _tls_id, _traffic_light in traffic_lights.items()})
+        self.tls_ids: List[str] = self.layout.tls_ids
+        self.tls_id2row: Dict[str, int] = self.layout.tls_id2row
+        self.features: Tuple[str] = self.select_features(features)
+        self.feature_index: Dict[str, int] = {_feature: _index for _index, _feature in enumerate(self.features)}
+        self.detector_features = tuple(_feature for _feature in self.features if _feature != 'this_phase')
+
+        num_tls = self.layout.num_tls
+        self.movement_width = self.layout.check_width(movement_width)
+        self.movement_values = np.zeros((self.layout.num_movements, len(self.features)), dtype=np.float32) # 紧凑的数组
+        self.movement_features = np.zeros((num_tls, self.movement_width, len(self.features)), dtype=np.float32)
+        self.movement_mask = self.layout.get_mask(self.movement_width) # 路口存在的 movement
+        self.this_phase_index = np.zeros(num_tls, dtype=np.int64)
+        self.can_perform_action = np.zeros(num_tls, dtype=bool)
+        self.movement_ids: Dict[str, List[str]] = {
+            _tls_id: list(traffic_lights[_tls_id].movement_ids) for _tls_id in self.tls_ids
+        }
+
+        # 探测器 slot -> 紧凑数组中的位置, 每一步只需要一次 fancy index
+        plan_slots, plan_positions = [], []
+        if detector_plan is not None:
+            for _tls_id, (_slots, _movement_indices) in detector_plan.tls_updates.items():
+                _offset = int(self.layout.indptr[self.tls_id2row[_tls_id]])
+                plan_slots.extend(_slots.tolist())
+                plan_positions.extend([_offset + _movement_index for _movement_index in _movement_indices])
+        self.plan_slots = np.asarray(plan_slots, dtype=np.int64)
+        self.plan_positions = np.asarray(plan_positions, dtype=np.int64)
+        logger.info(f'SIM: TLS Observation Tensor, shape {self.movement_features.shape}, {self.layout.num_movements} movements, features {self.features}.')
+
+    @staticmethod
+    def select_features(features:Tuple[str]=None) -> Tuple[str]:
+        """tensor 最后一维的特征 (按照 TLS_TENSOR_FEATURES 的顺序), 不需要连接 SUMO 就可以确定数组的形状
+        """
+        return tuple(
+            _feature for _feature in TLS_TENSOR_FEATURES
+            if (features is None) or (_feature in features)
+        )
+
+    def update_from_slots(self, slot_values:Dict[str, Any]) -> None:
+        """使用 DetectorAggregationPlan.aggregate 的结果更新探测器的特征 (只更新有探测器的 movement)
+        """
+        for _feature in self.detector_features:
+            _values = slot_values.get(_feature, None)
+            if _values is not None:
+                self.movement_values[self.plan_positions, self.feature_index[_feature]] = _values[self.plan_slots]
+
+    def update_from_traffic_lights(self, traffic_lights:Dict[str, TrafficLightInfo], update_detector_features:bool=False) -> None:
+        """从 TrafficLightInfo 中更新信号灯的状态, 最后写入 padding 之后的数组
+
+        Args:
+            traffic_lights (Dict[str, TrafficLightInfo]): 场景中的信号灯
+            update_detector_features (bool, optional): 是否同时复制 TrafficLightInfo 中探测器的特征
+                (没有使用 DetectorAggregationPlan 的时候). Defaults to False.
+        """
+        _phase_index = self.feature_index.get('this_phase', None)
+        for _tls_id, _row in self.tls_id2row.items():
+            _traffic_light = traffic_lights[_tls_id]
+            _slice = self.layout.get_slice(_tls_id)
+            _num_movements = _slice.stop - _slice.start
+            self.this_phase_index[_row] = _traffic_light.this_phase_index
+            self.can_perform_action[_row] = _traffic_light.can_perform_action
+            if _phase_index is not None:
+                self.movement_values[_slice, _phase_index] = _traffic_light.this_phase_mask[:_num_movements]
+            if update_detector_features:
+                for _feature in self.detector_features:
+                    self.movement_values[_slice, self.feature_index[_feature]] = getattr(_traffic_light, _feature)[:_num_movements]
+        self.layout.to_padded(self.movement_values, width=self.movement_width, out=self.movement_features)
+
+    def get_views(self) -> Dict[str, Any]:
+        """返回所有信号灯的观测, 数组不会进行复制
+            {
+                'tls_ids': ['J1', 'J2', ...], # row -> tls id
+                'tls_id2row': {'J1': 0, 'J2': 1, ...},
+                'features': ('last_step_mean_speed', ..., 'this_phase'), # 最后一维的含义
+                'movement_ids': {'J1': ['E1--s', ...], ...}, # 每个路口 movement 的顺序
+                'movement_indptr': array (num_tls+1,), 路口 i 的 movement 为 movement_values[indptr[i]:indptr[i+1]],
+                'movement_values': array (num_movements, F), 紧凑的数组,
+                'movement_mask': array (num_tls, width), 路口存在的 movement,
+                'movement_features': array (num_tls, width, F), padding 的位置为 0,
+                'this_phase_index': array (num_tls,),
+                'can_perform_action': array (num_tls,),
+            }
+        """
+        return {
+            'tls_ids': self.tls_ids,
+            'tls_id2row': self.tls_id2row,
+            'features': self.features,
+            'movement_ids': self.movement_ids,
+            'movement_indptr': self.layout.indptr,
+            'movement_values': self.movement_values,
+            'movement_mask': self.movement_mask,
+            'movement_features': self.movement_features,
+            'this_phase_index': self.this_phase_index,
+            'can_perform_action': self.can_perform_action,
+        }
@@ -0,0 +1,119 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 19:12:40
+@Description: 缓存信号灯路口的拓扑信息 (BaseTLS 初始化时通过 TraCI 获得的静态信息)
+- key 为 (路网文件的 hash, tls id, 信号灯初始方案), 路网或信号灯方案改变之后会重新生成
+- 内存中的缓存在多次 reset 之间共享 (最多保存 max_memory_entries 个, 超过之后删除最久没有使用的), 设置 cache_dir 之后会保存在硬盘上, 可以在多个进程之间共享
+- 缓存的内容使用 pickle 保存, 每次读取都会得到新的对象 (不会被外部修改)
+LastEditTime: 2026-10-18 19:12:40
+'''
+import os
+import pickle
+import hashlib
+import tempfile
+from loguru import logger
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+
+
+class TLSTopologyCache:
+    def __init__(self, cache_dir:str=None, max_memory_entries:int=4096) -> None:
+        """
+        Args:
+            cache_dir (str, optional): 保存缓存文件的文件夹, None 表示只在内存中缓存. Defaults to None.
+            max_memory_entries (int, optional): 内存中最多缓存的路口数量. Defaults to 4096.
+        """
+        assert max_memory_entries >= 1, f'max_memory_entries should be >= 1, now is {max_memory_entries}.'
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self._memory: Dict[str, bytes] = OrderedDict() # key -> pickle 之后的拓扑信息, 按照最近使用的顺序
+        self._net_hashes: Dict[str, Tuple[float, int, str]] = {} # 路网文件 (realpath) -> (修改时间, 大小, hash)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def clear(self) -> None:
+        """清空内存中的缓存 (硬盘上的缓存文件不会被删除)
+        """
+        self._memory.clear()
+        self._net_hashes.clear()
+
+    @staticmethod
+    def resolve_net_files(sumo) -> List[str]:
+        """当前仿真的路网文件 (realpath). 
+        sumocfg 中的相对路径在 SUMO 中已经加上了 sumocfg 所在的文件夹 (例如 env/3junctions.net.xml), 与命令行中的 -n 一样是相对于 SUMO 的工作目录, 
+        使用 realpath 之后, 同一个文件的不同写法 (相对路径, 符号链接, ..) 得到相同的路径
+        """
+        return [
+            os.path.realpath(_net_file.strip())
+            for _net_file in sumo.simulation.getOption('net-file').split(',')
+            if _net_file.strip()
+        ]
+
+    def get_net_hash(self, sumo) -> str:
+        """当前仿真路网文件内容的 hash, 文件没有改变的时候不会重复计算
+        """
+        net_hash = hashlib.sha1()
+        for _net_file in self.resolve_net_files(sumo):
+            _stat = os.stat(_net_file)
+            _cached = self._net_hashes.get(_net_file, None)
+            if (_cached is None) or (_cached[:2] != (_stat.st_mtime, _stat.st_size)): # 文件修改之后重新计算
+                with open(_net_file, 'rb') as f:
+                    _cached = (_stat.st_mtime, _stat.st_size, hashlib.sha1(f.read()).hexdigest())
+                self._net_hashes[_net_file] = _cached
+            net_hash.update(_cached[2].encode('utf8'))
+        return net_hash.hexdigest()
+
+    def get_key(self, sumo, tls_id:str, program_id:str, phase_states:Tuple[str]) -> str:
+        """路网, 信号灯 id 和初始的信号灯方案 (phase 的 state) 共同组成 key
+        """
+        key = hashlib.sha1()
+        for _item in (self.get_net_hash(sumo), tls_id, program_id, *phase_states):
+            key.update(f'{_item}\n'.encode('utf8'))
+        return key.hexdigest()
+
+    def __get_path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, f'tls_topology_{key}.pkl')
+
+    def load(self, key:str) -> Dict[str, Any]:
+        """读取拓扑信息, 没有缓存的时候返回 None
+        """
+        data = self._memory.get(key, None)
+        if data is not None:
+            self._memory.move_to_end(key)
+        elif self.cache_dir is not None:
+            _path = self.__get_path(key)
+            if os.path.exists(_path):
+                with open(_path, 'rb') as f:
+                    data = f.read()
+                self.__remember(key, data)
+        if data is None:
+            return None
+        return pickle.loads(data)
+
+    def __remember(self, key:str, data:bytes) -> None:
+        """保存在内存中, 超过 max_memory_entries 之后删除最久没有使用的路口
+        """
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def save(self, key:str, topology:Dict[str, Any]) -> None:
+        """保存拓扑信息, 写入硬盘时先写入临时文件再替换, 多个进程同时写入也不会读到不完整的文件
+        """
+        data = pickle.dumps(topology, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__remember(key, data)
+        if self.cache_dir is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.__get_path(key))
+        except OSError as e:
+            logger.warning(f'SIM: Fail to save TLS topology cache, {e}.')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -11,6 +11,8 @@ import numpy as np
 from typing import List
 from loguru import logger
 from .base_tls import BaseTLS
+from ...tshub_env.simulation_clock import SimulationClock
+from ..tls_topology_cache import TLSTopologyCache
 
 class adjust_cycle_duration(BaseTLS):
     def __init__(self, ts_id, sumo, 
@@ -18,8 +20,10 @@ class adjust_cycle_duration(BaseTLS):
                  min_green:int=5,
                  yellow_time:int=3,
                  init_green_duration:int=20, 
+                 clock:SimulationClock=None,
+                 topology_cache:TLSTopologyCache=None,
         ) -> None:
-        super().__init__(ts_id, sumo)
+        super().__init__(ts_id, sumo, clock, topology_cache)
         
         self.delta_time = delta_time # 动作的间隔时间
         self.min_green = min_green # 最小的绿灯时间, 不要把绿灯时间调整的太小了
@@ -37,9 +41,7 @@ class adjust_cycle_duration(BaseTLS):
         Args:
             init_green_duration (int): 初始绿灯的时间
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         # 设置初始绿灯和黄灯时长, 删除全红
         new_phase_list = []
@@ -58,7 +60,7 @@ class adjust_cycle_duration(BaseTLS):
                 pass
         logic.type = 0
         logic.phases = tuple(new_phase_list)
-        self.sumo.trafficlight.setProgramLogic(self.id, logic)
+        self.set_program_logic(logic) # 同时更新缓存
         # setProgramLogic 对当前相位不生效, 因此需要单独设置第一相位的时间
         self.sumo.trafficlight.setPhaseDuration(tlsID=self.id, phaseDuration=self.init_green_duration)
         # 把 next_action_time 修改为初始
@@ -89,13 +91,12 @@ class adjust_cycle_duration(BaseTLS):
         if self.delta_time == None:
             self.set_duration(new_green_durations) # 设置动作
             self.next_action_time = self.sim_step + sum(new_green_durations) + self.green_loss # 计算下一次
-            logger.debug('SIM: Time: {}; Adjust Phase: {}; Durations: {}; New Durations: {}; Cycle: {};'.format(
-                                                        self.sim_step, 
-                                                        adjust_phase,
-                                                        green_durations, 
-                                                        new_green_durations,
-                                                        sum(new_green_durations)+self.green_loss
-                )
+            logger.opt(lazy=True).debug('SIM: Time: {}; Adjust Phase: {}; Durations: {}; New Durations: {}; Cycle: {};',
+                                                        lambda: self.sim_step, 
+                                                        lambda: adjust_phase,
+                                                        lambda: green_durations, 
+                                                        lambda: new_green_durations,
+                                                        lambda: sum(new_green_durations)+self.green_loss
             )
         # 设置了 delta time, 需要重新计算下一次的动作时间
         else:
@@ -104,15 +105,14 @@ class adjust_cycle_duration(BaseTLS):
             _deltaTime = int(np.ceil(self.delta_time/_cycle) * _cycle) # 计算新的动作时间
             assert self.next_action_time == self.sim_step, f'确认时间是否同步.'
             self.next_action_time += _deltaTime
-            logger.debug('SIM: Time: {}; Adjust Phase: {}; Durations: {}; New Durations: {}; Cycle: {}; Delta Time: {}; Next Action Time: {};'.format(
-                                            self.sim_step, 
-                                            adjust_phase,
-                                            green_durations, 
-                                            new_green_durations,
-                                            sum(new_green_durations)+self.green_loss,
-                                            _deltaTime,
-                                            self.next_action_time,
-                )
+            logger.opt(lazy=True).debug('SIM: Time: {}; Adjust Phase: {}; Durations: {}; New Durations: {}; Cycle: {}; Delta Time: {}; Next Action Time: {};',
+                                            lambda: self.sim_step, 
+                                            lambda: adjust_phase,
+                                            lambda: green_durations, 
+                                            lambda: new_green_durations,
+                                            lambda: sum(new_green_durations)+self.green_loss,
+                                            lambda: _deltaTime,
+                                            lambda: self.next_action_time,
             )
 
     def set_duration(self, duration_list: List[float]):
@@ -121,9 +121,7 @@ class adjust_cycle_duration(BaseTLS):
         Args:
             duration_list (List[float]): 绿灯相位的时长, 例如为 [20, 10, 20, 10]
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         # 确保 duration_list 的长度和绿灯相位数量相同
         all_green_phase = [phase for phase in logic.phases if ('G' in phase.state)] # 绿灯相位
@@ -139,7 +137,7 @@ class adjust_cycle_duration(BaseTLS):
                 phase.minDur = duration
                 phase.maxDur = duration
                 duration_index += 1
-        self.sumo.trafficlight.setProgramLogic(self.id, logic)
+        self.set_program_logic(logic) # 同时更新缓存
 
         # 如果仿真时间为 0, 第一个动作, 则使用 setPhaseDuration 对第一个相位调整
         if self.sim_step == 0:
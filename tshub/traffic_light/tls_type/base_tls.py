@@ -7,16 +7,51 @@ LastEditTime: 2025-07-16 19:18:12
 import sumolib
 from abc import ABC, abstractmethod
 from ...sumo_tools.sumo_infos.tls_connections import tls_connection
+from ...tshub_env.simulation_clock import SimulationClock
+from ..tls_topology_cache import TLSTopologyCache
+
+# 路口的拓扑信息, 可以使用 TLSTopologyCache 缓存
+TLS_TOPOLOGY_ATTRIBUTES = (
+    'tls_connections', 'fromEdge_toEdge',
+    'movement_ids', 'movement_directions', 'movement_lane_numbers', 'movement_lane_ids', 'phase2movements',
+    'lanes', 'in_out_lanes', 'in_lanes', 'out_lanes', 'lanes_lenght',
+    'in_roads', 'out_roads', 'roads_lanes', 'in_roads_heading', 'out_roads_heading', 'in_road_stop_line',
+)
 
 class BaseTLS(ABC):
     """
     This class represents a Traffic Signal of an intersection
     It is responsible for retrieving information and changing the traffic phase using Traci API
     """
-    def __init__(self, ts_id, sumo) -> None:
+    def __init__(self, ts_id, sumo, clock:SimulationClock=None, topology_cache:TLSTopologyCache=None) -> None:
         self.id = ts_id # 信号灯的 id
         self.sumo = sumo
+        self.clock = clock if clock is not None else SimulationClock(sumo) # 与 env 共享的仿真时间
+        self.program_phase_index = None # 最近一次 set_phase 设置的 phase (all_phases 中的 index)
 
+        self.program_id = self.sumo.trafficlight.getProgram(self.id) # 获得这个信号的当前的 program id
+        self.program_logic = None # program_id 对应的信号灯方案 (缓存), 需要通过 set_program_logic 修改
+
+        # 获得路口的拓扑信息, 有缓存的时候不需要通过 TraCI 获取
+        topology, topology_key = None, None
+        if topology_cache is not None:
+            phase_states = tuple(_phase.state for _phase in self.get_program_logic().phases)
+            topology_key = topology_cache.get_key(self.sumo, self.id, self.program_id, phase_states)
+            topology = topology_cache.load(topology_key)
+        if topology is not None:
+            for _attribute, _value in topology.items():
+                setattr(self, _attribute, _value)
+        else:
+            self.collect_topology()
+            if topology_cache is not None:
+                topology_cache.save(topology_key, {
+                    _attribute: getattr(self, _attribute)
+                    for _attribute in TLS_TOPOLOGY_ATTRIBUTES
+                })
+
+    def collect_topology(self) -> None:
+        """通过 TraCI 获得路口的拓扑信息 (TLS_TOPOLOGY_ATTRIBUTES), 只与路网和信号灯初始方案有关
+        """
         # 获得路口连接
         tls_info = tls_connection(self.sumo)
         self.tls_connections = tls_info._get_tls_connection(self.id, keep_connection=True) # 获得当前路口的连接
@@ -57,8 +92,6 @@ class BaseTLS(ABC):
             _lane_end_position = self.sumo.lane.getShape(_lane_id)[-1] # 这个是 lane 出口中心的点
             self.in_road_stop_line[_road_name].append(_lane_end_position)
 
-        self.program_id = self.sumo.trafficlight.getProgram(self.id) # 获得这个信号的当前的 program id
-
         # 初始化 traffic light
         self.collect_movements_infos()
         self.collect_controled_phase_movements()
@@ -71,9 +104,45 @@ class BaseTLS(ABC):
     
     @property
     def sim_step(self):
-        """Return current simulation second on SUMO
+        """Return current simulation second on SUMO (由 env 每一步更新一次)
+        """
+        return self.clock.time
+
+    def set_phase(self, phase_index:int) -> None:
+        """切换到 all_phases 中的 phase_index (绿灯或黄灯), 使用缓存的 all_phases 检查 phase_index
         """
-        return self.sumo.simulation.getTime()
+        if not (0 <= phase_index < len(self.all_phases)):
+            raise ValueError(f'SIM: {self.id} phase index 需要在 [0, {len(self.all_phases)}) 之间, 现在是 {phase_index}.')
+        self.program_phase_index = phase_index
+        self.sumo.trafficlight.setPhase(self.id, phase_index)
+
+    @property
+    def requested_phase_state(self) -> str:
+        """最近一次 set_phase 请求的信号灯状态, 例如 'rrrrGGrrrrrrrrGrrrr' (来自 all_phases, 不需要查询 SUMO).
+        Note: 来自缓存的 all_phases, 在 DEBUG 日志中使用, 不需要每次查询 SUMO
+        """
+        if self.program_phase_index is None:
+            return self.sumo.trafficlight.getRedYellowGreenState(self.id)
+        return self.all_phases[self.program_phase_index].state
+
+    def get_program_logic(self):
+        """获得 program_id 对应的信号灯方案, 只在没有缓存的时候从 SUMO 获取.
+        返回的是缓存的对象, 修改之后需要使用 set_program_logic 写回 SUMO (同时更新缓存)
+        Note: setPhaseDuration 只修改当前相位剩余的时间, 不会改变信号灯方案, 因此不需要更新缓存
+        """
+        if self.program_logic is None:
+            logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
+            logic_index = [logic.programID for logic in logics].index(self.program_id) # 找到对应 program_id 的 logic
+            self.program_logic = logics[logic_index]
+        return self.program_logic
+
+    def set_program_logic(self, logic) -> None:
+        """设置信号灯方案, 并更新缓存 (write-through)
+        """
+        if logic is self.program_logic: # 缓存中的 currentPhaseIndex 可能已经过时, 需要使用当前的 phase
+            logic.currentPhaseIndex = self.sumo.trafficlight.getPhase(self.id)
+        self.sumo.trafficlight.setProgramLogic(self.id, logic)
+        self.program_logic = logic if logic.programID == self.program_id else None
 
     def build_phases(self) -> None:
         """初始化信号灯的方案, 在中间添加黄灯状态, 下面是一个例子.
@@ -115,7 +184,8 @@ class BaseTLS(ABC):
                 (2, 3): 12, (3, 0): 13, (3, 1): 14, (3, 2): 15
             }
         """
-        phases = self.sumo.trafficlight.getAllProgramLogics(self.id)[0].phases
+        programs = self.sumo.trafficlight.getAllProgramLogics(self.id)
+        phases = programs[0].phases
 
         self.green_phases = []
         self.yellow_dict = {} # 储存从 phase-i --> phase-j 需要的中间过渡相位的 phase_id
@@ -141,11 +211,10 @@ class BaseTLS(ABC):
                 self.yellow_dict[(i,j)] = len(self.all_phases) # 从 phase_1 -> phase_2 中间的过渡时间
                 self.all_phases.append(self.sumo.trafficlight.Phase(self.yellow_time, yellow_state))
 
-        programs = self.sumo.trafficlight.getAllProgramLogics(self.id)
         logic = programs[0]
         logic.type = 0
         logic.phases = self.all_phases
-        self.sumo.trafficlight.setProgramLogic(self.id, logic) # 设置信号灯
+        self.set_program_logic(logic) # 设置信号灯
     
     # #################
     # 信号灯信息（工具函数）
@@ -157,11 +226,9 @@ class BaseTLS(ABC):
         Returns:
             (list): 一个信号灯的所有绿灯相位, 例如 [20, 20, 20, 20]
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
         
-        green_durations = [phase.duration for phase in logic.phases if 'G' in phase.state] # 绿灯相位的时长
+        green_durations = [float(phase.duration) for phase in logic.phases if 'G' in phase.state] # 绿灯相位的时长
         return green_durations
 
     def get_complete_durations(self):
@@ -170,11 +237,9 @@ class BaseTLS(ABC):
         Returns:
             (list): 一个信号灯的所有相位, 例如 [20, 3, 20, 3, 20, 3, 20]
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
-        complete_durations = [phase.duration for phase in logic.phases] # 所有相位的时长
+        complete_durations = [float(phase.duration) for phase in logic.phases] # 所有相位的时长
         return complete_durations
     
     def get_controled_phase(self):
@@ -189,9 +254,7 @@ class BaseTLS(ABC):
                     ...
                 }
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id) # 找到对应 program_id 的 logic
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         controled_phase = dict()
         for phase_index, phase in enumerate(logic.phases):
@@ -229,9 +292,7 @@ class BaseTLS(ABC):
 
         其中包含 'None__None'（也就是 movement 为空）和「右转」，之后可以去除这些值。
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id) # 找到对应 program_id 的 logic
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         phase_id = 0
         for phase in logic.phases: # 每个 phase 的组成, 例如 rrrrrrGGGGrrrrrGGGr
@@ -6,13 +6,17 @@
 '''
 from loguru import logger
 from .base_tls import BaseTLS
+from ...tshub_env.simulation_clock import SimulationClock
+from ..tls_topology_cache import TLSTopologyCache
 
 class choose_next_phase(BaseTLS):
     def __init__(self, ts_id, sumo, 
                  delta_time:int=5, 
                  yellow_time:int=3, 
+                 clock:SimulationClock=None,
+                 topology_cache:TLSTopologyCache=None,
                 ) -> None:
-        super().__init__(ts_id, sumo)
+        super().__init__(ts_id, sumo, clock, topology_cache)
         
         self.delta_time = delta_time # 每隔 delta_time 做一次动作
         self.yellow_time = yellow_time # 黄灯+红灯时间
@@ -30,19 +34,20 @@ class choose_next_phase(BaseTLS):
         """设置下一阶段的信号灯方案, 需要将方案转换为绿灯的时间长度
         """
         new_phase = int(new_phase) # 切换到 new_phase_id
+        assert 0 <= new_phase < self.num_green_phases, f'Choose Next Phase 动作需要在 [0, {self.num_green_phases}) 之间, 现在是 {new_phase}'
         if self.phase_index == new_phase: # 当相位不改变
-            self.sumo.trafficlight.setPhase(self.id, self.phase_index)
-            logger.debug('SIM: Time: {}; Keep: Action: {}; State: {};'.format(
-                                                    self.sim_step,
-                                                    self.phase_index, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.phase_index)
+            logger.opt(lazy=True).debug('SIM: Time: {}; Keep: Action: {}; Requested State: {};',
+                                                    lambda: self.sim_step,
+                                                    lambda: self.phase_index, 
+                                                    lambda: self.requested_phase_state)
             self.next_action_time = self.sim_step + self.delta_time # 重置下一次执行 action 的时间
         else: # 相位改变, 首先切换为黄灯, 接着使用 update 切换为绿灯
-            self.sumo.trafficlight.setPhase(self.id, self.yellow_dict[(self.phase_index, new_phase)])  # turns yellow
-            logger.debug('SIM: Time: {}; Yellow: Action: {}; State: {};'.format(
-                                                    self.sim_step, 
-                                                    new_phase, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.yellow_dict[(self.phase_index, new_phase)])  # turns yellow
+            logger.opt(lazy=True).debug('SIM: Time: {}; Yellow: Action: {}; Requested State: {};',
+                                                    lambda: self.sim_step, 
+                                                    lambda: new_phase, 
+                                                    lambda: self.requested_phase_state)
             self.phase_index = new_phase # 切换 phase
             self.next_action_time = self.sim_step + self.delta_time + self.yellow_time # 这里需要加上黄灯的时间, 因为首先会切换为黄灯, 然后再经过 delta time 才会进行切换（之后的版本需要切换为这个）
             self.is_yellow = True # 目前是黄灯, 下一个切换为绿灯
@@ -51,9 +56,9 @@ class choose_next_phase(BaseTLS):
     def update(self):
         self.time_since_last_phase_change += 1
         if self.is_yellow and self.time_since_last_phase_change == self.yellow_time:
-            self.sumo.trafficlight.setPhase(self.id, self.phase_index) # 黄灯时间到, 切换为绿灯
-            logger.debug('SIM: Time {}; Yellow -> Green: Action: {}; State: {};'.format(
-                                                    self.sim_step, 
-                                                    self.phase_index, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.phase_index) # 黄灯时间到, 切换为绿灯
+            logger.opt(lazy=True).debug('SIM: Time {}; Yellow -> Green: Action: {}; Requested State: {};',
+                                                    lambda: self.sim_step, 
+                                                    lambda: self.phase_index, 
+                                                    lambda: self.requested_phase_state)
             self.is_yellow = False
\ No newline at end of file
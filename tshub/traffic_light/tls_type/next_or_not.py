@@ -6,13 +6,17 @@
 '''
 from loguru import logger
 from .base_tls import BaseTLS
+from ...tshub_env.simulation_clock import SimulationClock
+from ..tls_topology_cache import TLSTopologyCache
 
 class next_or_not(BaseTLS):
     def __init__(self, ts_id, sumo,
                 delta_time:int=5, 
                 yellow_time:int=3,
+                clock:SimulationClock=None,
+                topology_cache:TLSTopologyCache=None,
             ):
-        super().__init__(ts_id, sumo)
+        super().__init__(ts_id, sumo, clock, topology_cache)
         
         self.delta_time = delta_time # 每隔 5s 做一次动作
         self.yellow_time = yellow_time # 黄灯
@@ -32,20 +36,20 @@ class next_or_not(BaseTLS):
         assert keep_change in [0, 1], f'Next or Not 动作只可以是 0 或是 1, 现在是 {keep_change}'
         keep_change_signal = bool(keep_change) # 是否切换, keep->True, bool(1), change->False, bool(0)
         if keep_change_signal: # 当相位不改变
-            self.sumo.trafficlight.setPhase(self.id, self.phase_index) # setPhase 会立即进行切换, 不会等待当前的 state 结束
-            logger.debug('SIM: Time: {}; Keep: Action: {}; Phase Index: {}; State: {};'.format(
-                                                    self.sim_step, 
-                                                    keep_change,
-                                                    self.phase_index, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.phase_index) # setPhase 会立即进行切换, 不会等待当前的 state 结束
+            logger.opt(lazy=True).debug('SIM: Time: {}; Keep: Action: {}; Phase Index: {}; Requested State: {};',
+                                                    lambda: self.sim_step, 
+                                                    lambda: keep_change,
+                                                    lambda: self.phase_index, 
+                                                    lambda: self.requested_phase_state)
             self.next_action_time = self.sim_step + self.delta_time
         else: # 切换到下一个绿灯相位
             self.next_phase_index = (self.phase_index + 1)%self.num_green_phases
-            self.sumo.trafficlight.setPhase(self.id, self.yellow_dict[(self.phase_index, self.next_phase_index)])  # turns yellow
-            logger.debug('SIM: Time: {}; Yellow: Action: {}; State: {};'.format(
-                                                    self.sim_step, 
-                                                    keep_change, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.yellow_dict[(self.phase_index, self.next_phase_index)])  # turns yellow
+            logger.opt(lazy=True).debug('SIM: Time: {}; Yellow: Action: {}; Requested State: {};',
+                                                    lambda: self.sim_step, 
+                                                    lambda: keep_change, 
+                                                    lambda: self.requested_phase_state)
             self.phase_index = self.next_phase_index # 切换 phase
             self.is_yellow = True # 目前是黄灯, 下一个切换为绿灯
             self.time_since_last_phase_change = 0
@@ -56,9 +60,9 @@ class next_or_not(BaseTLS):
         """
         self.time_since_last_phase_change += 1
         if self.is_yellow and self.time_since_last_phase_change == self.yellow_time:
-            self.sumo.trafficlight.setPhase(self.id, self.phase_index)
-            logger.debug('SIM: Time {}; Yellow -> Green: Phase Index: {}; State: {};'.format(
-                                                    self.sim_step, 
-                                                    self.phase_index, 
-                                                    self.sumo.trafficlight.getRedYellowGreenState(self.id)))
+            self.set_phase(self.phase_index)
+            logger.opt(lazy=True).debug('SIM: Time {}; Yellow -> Green: Phase Index: {}; Requested State: {};',
+                                                    lambda: self.sim_step, 
+                                                    lambda: self.phase_index, 
+                                                    lambda: self.requested_phase_state)
             self.is_yellow = False
\ No newline at end of file
@@ -8,6 +8,8 @@ import numpy as np
 from typing import List
 from loguru import logger
 from .base_tls import BaseTLS
+from ...tshub_env.simulation_clock import SimulationClock
+from ..tls_topology_cache import TLSTopologyCache
 
 class set_phase_duration(BaseTLS):
     def __init__(self, ts_id, sumo, 
@@ -15,8 +17,10 @@ class set_phase_duration(BaseTLS):
                  min_green:int=5, 
                  yellow_time:int=3,
                  init_green_duration:int=20,
+                 clock:SimulationClock=None,
+                 topology_cache:TLSTopologyCache=None,
         ) -> None:
-        super().__init__(ts_id, sumo)
+        super().__init__(ts_id, sumo, clock, topology_cache)
         
         self.delta_time = delta_time # 做动作的间隔
         self.min_green = min_green # 最小绿灯时间
@@ -42,9 +46,7 @@ class set_phase_duration(BaseTLS):
         Args:
             init_green_duration (int): 初始绿灯的时间
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         # 设置初始绿灯和黄灯时长, 删除全红
         new_phase_list = []
@@ -63,7 +65,7 @@ class set_phase_duration(BaseTLS):
                 pass
         logic.type = 0
         logic.phases = tuple(new_phase_list)
-        self.sumo.trafficlight.setProgramLogic(self.id, logic)
+        self.set_program_logic(logic) # 同时更新缓存
         # setProgramLogic 对当前相位不生效, 因此需要单独设置第一相位的时间
         self.sumo.trafficlight.setPhaseDuration(tlsID=self.id, phaseDuration=self.init_green_duration)
 
@@ -92,14 +94,13 @@ class set_phase_duration(BaseTLS):
             tlsID=self.id,
             phaseDuration=new_phase_duration
         ) # 修改绿灯时长, 修改剩下的时间, 需要减去一秒; 且 setPhaseDuration 只会改变一次 (就是后面还是按照初始信号灯时间)
-        logger.debug('SIM: Time: {}; Phase ID: [{}/{}]; Time Since Last Change: {}; Durations: {}; New Durations: {};'.format(
-                                                    self.sim_step, # Time
-                                                    self.phase_index, # phase id
-                                                    self.sumo.trafficlight.getPhase(self.id), # 对于信号灯的 phase id, 算上黄灯
-                                                    current_phase_duration, # 原始相位时长
-                                                    new_phase_duration, # 新相位时长
-                                                    self.time_since_last_phase_change
-                    )
+        logger.opt(lazy=True).debug('SIM: Time: {}; Phase ID: [{}/{}]; Time Since Last Change: {}; Durations: {}; New Durations: {};',
+                                                    lambda: self.sim_step, # Time
+                                                    lambda: self.phase_index, # phase id
+                                                    lambda: self.sumo.trafficlight.getPhase(self.id), # 对于信号灯的 phase id, 算上黄灯
+                                                    lambda: current_phase_duration, # 原始相位时长
+                                                    lambda: new_phase_duration, # 新相位时长
+                                                    lambda: self.time_since_last_phase_change
         )
         self.time_since_last_phase_change = 0 # 记录距离上次动作的时间
         
@@ -129,9 +130,7 @@ class set_phase_duration(BaseTLS):
         Args:
             duration_list (List[float]): 绿灯相位的时长, 例如为 [20, 10, 20, 10]
         """
-        logics = self.sumo.trafficlight.getAllProgramLogics(self.id) # 获得当前信号灯的情况
-        logic_index = [logic.programID for logic in logics].index(self.program_id)
-        logic = logics[logic_index]
+        logic = self.get_program_logic() # 获得当前信号灯的情况 (缓存)
 
         # 确保 duration_list 的长度和绿灯相位数量相同
         all_green_phase = [phase for phase in logic.phases if ('G' in phase.state)] # 绿灯相位
@@ -147,7 +146,7 @@ class set_phase_duration(BaseTLS):
                 phase.minDur = duration
                 phase.maxDur = duration
                 duration_index += 1
-        self.sumo.trafficlight.setProgramLogic(self.id, logic)
+        self.set_program_logic(logic) # 同时更新缓存
 
         # 如果仿真时间为 0, 第一个动作, 则使用 setPhaseDuration 对第一个相位调整
         if self.sim_step == 0:
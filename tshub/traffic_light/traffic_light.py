@@ -20,6 +20,39 @@ from .tls_type.choose_next_phase_syn import choose_next_phase_syn
 from .tls_type.adjust_cycle_duration import adjust_cycle_duration
 from .tls_type.set_phase_duration import set_phase_duration
 from ..utils.format_dict import dict_to_str
+from ..tshub_env.simulation_clock import SimulationClock
+from .tls_topology_cache import TLSTopologyCache
+
+# 探测器的每一个特征对应的订阅变量
+TLS_DETECTOR_FEATURE_VARIABLES = {
+    'last_step_vehicle_id_list': traci.constants.LAST_STEP_VEHICLE_ID_LIST, # 18
+    'last_step_mean_speed': traci.constants.LAST_STEP_MEAN_SPEED, # 17
+    'jam_length_vehicle': traci.constants.JAM_LENGTH_VEHICLE, # 24
+    'jam_length_meters': traci.constants.JAM_LENGTH_METERS, # 25
+    'last_step_occupancy': traci.constants.LAST_STEP_OCCUPANCY, # 19, Note: 因为车辆之间有间隔, 所以即使排满了, occ 也不会是 100%
+}
+
+# 每一个 movement 一个值的特征, 以及生成默认值的函数 (list 的长度为 movement_width)
+TLS_MOVEMENT_FEATURES = {
+    'last_step_vehicle_id_list': list,
+    'last_step_mean_speed': float,
+    'jam_length_vehicle': float,
+    'jam_length_meters': float,
+    'last_step_occupancy': float,
+    'this_phase': bool,
+    'last_phase': bool,
+    'next_phase': bool,
+}
+
+# last_step_vehicle_id_list 在不同格式下的默认值 (没有探测器的 movement)
+TLS_VEHICLE_ID_DEFAULTS = {
+    'list': list,
+    'handle': list,
+    'count': int,
+}
+
+# 不属于特征的 field (配置或是共享的对象), 不会输出
+TLS_NON_FEATURE_FIELDS = ('sumo', 'features', 'clock', 'topology_cache', 'movement_width', 'vehicle_id_format')
 
 @dataclass
 class TrafficLightInfo:
@@ -50,6 +83,11 @@ class TrafficLightInfo:
     movement_ids: List[str] = None # 存储 movement id (fromEdge, toEdge)
     phase2movements: Dict[int, List[str]] = None # 记录每个 phase 控制的 connection
     can_perform_action: bool = False # 是否可以执行动作
+    features: Tuple[str] = None # 需要输出的特征, None 表示输出所有的特征
+    clock: SimulationClock = None # 与 env 共享的仿真时间, None 表示每次从 SUMO 获取
+    topology_cache: TLSTopologyCache = None # 路口拓扑信息的缓存, None 表示每次通过 TraCI 获取
+    movement_width: int = 12 # 每个特征 list 的长度 (十字路口包含 12 个 movement), None 表示与路口的 movement 数量相同
+    vehicle_id_format: str = 'list' # last_step_vehicle_id_list 的格式, list, handle 或是 count (VEHICLE_ID_FORMATS)
 
     def __post_init__(self) -> None:
         """初始化 traffic light, 包括:
@@ -60,15 +98,15 @@ class TrafficLightInfo:
         """
         _action = tls_action_type(self.action_type)
         if _action == tls_action_type.ChooseNextPhase:
-            self.tls_action = choose_next_phase(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time)
+            self.tls_action = choose_next_phase(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time, clock=self.clock, topology_cache=self.topology_cache)
         elif _action == tls_action_type.ChooseNextPhaseSyn:
-            self.tls_action = choose_next_phase_syn(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time)
+            self.tls_action = choose_next_phase_syn(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time, clock=self.clock, topology_cache=self.topology_cache)
         elif _action == tls_action_type.NextorNot:
-            self.tls_action = next_or_not(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time)
+            self.tls_action = next_or_not(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time, clock=self.clock, topology_cache=self.topology_cache)
         elif _action == tls_action_type.AdjustCycleDuration:
-            self.tls_action = adjust_cycle_duration(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time)
+            self.tls_action = adjust_cycle_duration(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time, clock=self.clock, topology_cache=self.topology_cache)
         elif _action == tls_action_type.SetPhaseDuration:
-            self.tls_action = set_phase_duration(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time)
+            self.tls_action = set_phase_duration(ts_id=self.id, sumo=self.sumo, delta_time=self.delta_time, clock=self.clock, topology_cache=self.topology_cache)
         else:
             logger.error(f'SIM: 信号灯动作只支持 choose_next_phase 和 next_or_not, 现在是 {self.action_type}.')
             raise ValueError(f'SIM: 信号灯动作只支持 choose_next_phase 和 next_or_not, 现在是 {self.action_type}.')
@@ -86,22 +124,51 @@ class TrafficLightInfo:
         self.movement_lane_numbers = self.tls_action.movement_lane_numbers
         self.phase2movements = self.tls_action.phase2movements
         self.fromEdge_toEdge = self.tls_action.fromEdge_toEdge
+        self.__resize_movement_features()
+
+        # 每一个 phase 控制的 movement (bool mask), 只计算一次
+        movement_index = {_movement_id: _index for _index, _movement_id in enumerate(self.movement_ids)}
+        self.phase_masks: Dict[int, np.ndarray] = {}
+        for _phase_index, _movements in self.phase2movements.items():
+            self.phase_masks[_phase_index] = np.zeros(len(self.this_phase), dtype=bool)
+            self.phase_masks[_phase_index][[movement_index[_movement_id] for _movement_id in _movements]] = True
+        self.this_phase_mask = np.zeros(len(self.this_phase), dtype=bool) # 当前 phase 的 mask, 与 this_phase 相同
 
         logger.debug(f'SIM: Phase to Movement: \n{dict_to_str(self.phase2movements)}')
 
+    def __resize_movement_features(self) -> None:
+        """根据路口的 movement 数量调整每一个 movement 特征的长度, 不足的位置使用默认值
+        """
+        num_movements = len(self.movement_ids)
+        if self.movement_width is None:
+            width = num_movements # 紧凑的 list, 没有 padding
+        elif num_movements > self.movement_width:
+            raise ValueError(
+                f'SIM: {self.id} has {num_movements} movements, more than the movement width {self.movement_width}. '
+                'Please set a larger movement width, or None to use the number of movements.'
+            )
+        else:
+            width = self.movement_width
+        for _feature, _default in TLS_MOVEMENT_FEATURES.items():
+            if _feature == 'last_step_vehicle_id_list':
+                _default = TLS_VEHICLE_ID_DEFAULTS[self.vehicle_id_format]
+            _values = list(getattr(self, _feature))[:width]
+            setattr(self, _feature, _values + [_default() for _ in range(width - len(_values))])
+
     @classmethod
     def create_traffic_light(
             cls, id, action_type, delta_time, this_phase_index,
             last_step_vehicle_id_list, last_step_mean_speed, jam_length_vehicle, jam_length_meters, last_step_occupancy,
             this_phase, last_phase, next_phase, 
-            sumo) -> TrafficLightInfo:
+            sumo, features=None, clock=None, topology_cache=None, movement_width=12, vehicle_id_format='list') -> TrafficLightInfo:
         """
         创建交通信号灯
         """
         logger.info(f'SIM: Init Traffic Light: {id}.')
         return cls(id, action_type, delta_time, this_phase_index,
                    last_step_vehicle_id_list, last_step_mean_speed, jam_length_vehicle, jam_length_meters, last_step_occupancy,
-                   this_phase, last_phase, next_phase, sumo)
+                   this_phase, last_phase, next_phase, sumo, features=features, clock=clock, topology_cache=topology_cache,
+                   movement_width=movement_width, vehicle_id_format=vehicle_id_format)
     
     def __update_this_phase(self, phase_index:int) -> None:
         """根据 phase_index 更新 this_phase, 将目前控制的 movement 设置为 True, 其余的设置为 False
@@ -110,12 +177,8 @@ class TrafficLightInfo:
             phase_index (int): phase index
         """
         self.this_phase_index = phase_index # 更新 phase 索引
-        self.this_phase = np.zeros(12).astype(bool).tolist()
-        if phase_index in self.phase2movements:
-            movements = self.phase2movements[phase_index]
-            for movement_id in movements:
-                movement_index = self.movement_ids.index(movement_id)
-                self.this_phase[movement_index] = True
+        self.this_phase_mask = self.phase_masks.get(phase_index, np.zeros(len(self.this_phase), dtype=bool))
+        self.this_phase = self.this_phase_mask.tolist()
 
     def update_features(self, tls_data) -> None:
         """
@@ -123,27 +186,63 @@ class TrafficLightInfo:
         """
         # 更新路况信息（道路拥堵程度）
         for i, key in enumerate(self.movement_ids):
-            if key in tls_data:
-                self.last_step_mean_speed[i] = tls_data[key]['last_step_mean_speed']
-                self.jam_length_vehicle[i] = tls_data[key]['jam_length_vehicle']
-                self.jam_length_meters[i] = tls_data[key]['jam_length_meters']
-                self.last_step_occupancy[i] = tls_data[key]['last_step_occupancy']
-                self.last_step_vehicle_id_list[i] = tls_data[key]['last_step_vehicle_id_list']
-                
-        # 更新 phase 的信息
+            if key in tls_data: # 只包含订阅的探测器特征
+                for _feature, _value in tls_data[key].items():
+                    getattr(self, _feature)[i] = _value
+        self.update_phase_state()
+
+    def update_movement_features(self, movement_indices:List[int], movement_features:Dict[str, List[Any]]) -> None:
+        """使用 DetectorAggregationPlan 聚合好的结果更新交通信号灯的属性
+
+        Args:
+            movement_indices (List[int]): 需要更新的 movement 在 movement_ids 中的位置
+            movement_features (Dict[str, List[Any]]): 每一个特征的值, 与 movement_indices 一一对应
+        """
+        for _feature, _values in movement_features.items():
+            _feature_values = getattr(self, _feature)
+            for i, _value in zip(movement_indices, _values):
+                _feature_values[i] = _value
+        self.update_phase_state()
+
+    def update_phase_state(self) -> None:
+        """更新 phase 的信息, 以及是否可以做动作 (不包含探测器的特征)
+        """
         self.__update_this_phase(self.tls_action.phase_index)
         # 当前的 traffic light 是否可以执行动作
         self.can_perform_action = (self.tls_action.sim_step == self.tls_action.next_action_time)
 
+    @staticmethod
+    def get_detector_variables(features:Tuple[str]=None) -> List[int]:
+        """根据选择的特征, 得到探测器需要订阅的变量
+        """
+        return [
+            _variable for _feature, _variable in TLS_DETECTOR_FEATURE_VARIABLES.items()
+            if (features is None) or (_feature in features)
+        ]
+
+    @staticmethod
+    def check_features(features:List[str]=None) -> Tuple[str]:
+        """检查选择的特征是否都是 TrafficLightInfo 的特征
+        """
+        if features is None:
+            return None
+        unknown_features = [_feature for _feature in features if _feature not in TLS_FEATURES]
+        if unknown_features:
+            raise ValueError(f'Unknown traffic light features {unknown_features}, should be in {TLS_FEATURES}.')
+        return tuple(features)
+
     def get_features(self) -> Dict[str, Any]:
         """
         返回交通信号灯的特征, 不需要包含 SUMO 的连接
         """
+        if self.features is not None:
+            return {_feature: getattr(self, _feature) for _feature in self.features}
+
         output_dict = {}
         for field in fields(self):
             field_name = field.name
             field_value = getattr(self, field_name)
-            if field_name != 'sumo':
+            if field_name not in TLS_NON_FEATURE_FIELDS:
                 output_dict[field_name] = field_value
         return output_dict
 
@@ -155,4 +254,11 @@ class TrafficLightInfo:
         if self.can_perform_action:
             self.tls_action.set_next_phases(action)
         else:
-            self.tls_action.update()
\ No newline at end of file
+            self.tls_action.update()
+
+
+# TrafficLightInfo 可以输出的所有特征
+TLS_FEATURES = tuple(
+    _field.name for _field in fields(TrafficLightInfo)
+    if _field.name not in TLS_NON_FEATURE_FIELDS
+)
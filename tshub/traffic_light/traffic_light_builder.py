@@ -7,65 +7,157 @@
 import traci
 import numpy as np
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Any, Tuple
 
 from .traffic_light import TrafficLightInfo
+from .detector_plan import DetectorAggregationPlan
+from .tls_observation_tensor import TLSObservationTensor
+from .decision_scheduler import TLSDecisionScheduler
+from .vehicle_id_table import VehicleIDTable, VEHICLE_ID_FORMATS
 from .traffic_light_feature_convert import TSCKeyMeaningsConverter
 from ..utils.nested_dict_conversion import defaultdict2dict, create_nested_defaultdict
 from ..tshub_env.base_builder import BaseBuilder
+from ..tshub_env.simulation_clock import SimulationClock
+from .tls_topology_cache import TLSTopologyCache
 
 class TrafficLightBuilder(BaseBuilder):
     def __init__(self, sumo, 
                  tls_ids:List[str], 
                  action_type:str, 
-                 delta_time:int=5) -> None:
+                 delta_time:int=5,
+                 features:List[str]=None,
+                 clock:SimulationClock=None,
+                 topology_cache:TLSTopologyCache=None,
+                 is_tensor:bool=False,
+                 movement_width:int=12,
+                 vehicle_id_format:str='list') -> None:
         self.sumo = sumo
         self.tls_ids = tls_ids # 信号灯 id 列表
         self.action_type = action_type # 信号灯支持的动作类型
         self.delta_time = delta_time # 信号灯的动作间隔
+        self.movement_width = movement_width # 每个路口 movement 特征的长度, None 表示与路口的 movement 数量相同
+        if vehicle_id_format not in VEHICLE_ID_FORMATS:
+            raise ValueError(f'Unknown vehicle id format {vehicle_id_format}, should be in {VEHICLE_ID_FORMATS}.')
+        self.vehicle_id_format = vehicle_id_format # 探测器中车辆 id 的格式
+        self.vehicle_id_table = VehicleIDTable() # handle 格式时, 车辆 handle -> id
+        self.clock = clock if clock is not None else SimulationClock(sumo) # 所有信号灯共享的仿真时间
+        self.topology_cache = topology_cache # 路口拓扑信息的缓存 (由 env 持有, 在多次 reset 之间共享)
         self.traffic_lights = dict()  # 存储场景中的所有交通信号灯
+        self.decision_scheduler = TLSDecisionScheduler(on_missed=self.reschedule_traffic_light) # 所有信号灯下一次做动作的时间
         self.tsc_convert = TSCKeyMeaningsConverter()
+        self.features = TrafficLightInfo.check_features(features) # 只订阅和输出选择的特征, None 表示所有的特征
+        self.reset_window_stats() # 多步仿真 (frame skip) 中排队长度的统计
 
+        self.detector_plan: DetectorAggregationPlan = None # 探测器 -> movement 的聚合方式
         self.subscribe_detector() # 订阅传感器
         self.create_objects() # 初始化场景所有信号灯
-        
+        self.compile_detector_plan() # 需要使用信号灯的 movement_ids
+
+        self.is_tensor = is_tensor # 信号灯信息以紧凑的 (num_movements, F) 和 padding 之后的 (num_tls, width, F) 数组返回
+        self.observation_tensor = (
+            TLSObservationTensor(
+                self.traffic_lights, features=self.features, 
+                detector_plan=self.detector_plan, movement_width=self.movement_width
+            )
+            if self.is_tensor else None
+        )
+
 
     def subscribe_detector(self) -> None:
         """
-        订阅传感器
+        订阅传感器, 只订阅选择的特征 (没有选择探测器的特征时不进行订阅)
+        """
+        self.detector_variables = TrafficLightInfo.get_detector_variables(self.features)
+        self.detector_ids = list(self.sumo.lanearea.getIDList()) if self.detector_variables else []
+        for e2_id in self.detector_ids:
+            self.sumo.lanearea.subscribe(e2_id, self.detector_variables)
+
+    @staticmethod
+    def get_program_states(sumo, tls_ids:List[str]) -> Dict[str, Tuple[str, Any, int, float]]:
+        """保存快照时每个信号灯的状态, {tls_id: (program_id, logics, phase, 当前 phase 剩余的时间)}
+        """
+        _time = sumo.simulation.getTime()
+        return {
+            _tls_id: (
+                sumo.trafficlight.getProgram(_tls_id), sumo.trafficlight.getAllProgramLogics(_tls_id),
+                sumo.trafficlight.getPhase(_tls_id), sumo.trafficlight.getNextSwitch(_tls_id) - _time,
+            )
+            for _tls_id in tls_ids
+        }
+
+    def restore_programs(self, program_states:Dict[str, Tuple[str, Any, int, float]]) -> None:
+        """加载快照之后 (仿真之前) 恢复信号灯的方案.
+        create_objects 会修改 SUMO 中的方案, loadState 只恢复当前的 program 和 phase index, 因此需要恢复为保存快照时的方案, phase 和剩余时间
+
+        Args:
+            program_states (Dict[str, Tuple[str, Any, int, float]]): get_program_states 的结果
         """
-        for e2_id in self.sumo.lanearea.getIDList():
-            self.sumo.lanearea.subscribe(e2_id, 
-                    [
-                        traci.constants.LAST_STEP_VEHICLE_ID_LIST, # 18
-                        traci.constants.LAST_STEP_MEAN_SPEED, # 17
-                        traci.constants.JAM_LENGTH_VEHICLE, # 24
-                        traci.constants.JAM_LENGTH_METERS, # 25
-                        traci.constants.LAST_STEP_OCCUPANCY, # 19, Note: 因为车辆之间有间隔, 所以即使排满了, occ 也不会是 100%
-                    ])
+        for _tls_id, (_program_id, _logics, _phase, _remaining) in program_states.items():
+            for _logic in _logics:
+                if _logic.programID == _program_id:
+                    _logic.currentPhaseIndex = _phase
+                self.sumo.trafficlight.setProgramLogic(_tls_id, _logic)
+            if self.sumo.trafficlight.getProgram(_tls_id) != _program_id:
+                self.sumo.trafficlight.setProgram(_tls_id, _program_id)
+                self.sumo.trafficlight.setPhase(_tls_id, _phase)
+            self.sumo.trafficlight.setPhaseDuration(_tls_id, _remaining)
+
+    def resync(self) -> None:
+        """加载快照之后重新同步信号灯 (信号灯的方案已经通过 restore_programs 恢复):
+        1. 重新订阅探测器
+        2. 重新创建每个信号灯 (路口拓扑来自 topology_cache), detector_plan 和 observation_tensor 只与路口的 movement 有关, 不需要重新创建
+        """
+        for e2_id in self.detector_ids:
+            self.sumo.lanearea.subscribe(e2_id, self.detector_variables)
+
+        self.vehicle_id_table.clear()
+        self.reset_window_stats()
+        self.decision_scheduler = TLSDecisionScheduler(on_missed=self.reschedule_traffic_light)
+        self.traffic_lights = dict()
+        self.create_objects()
+
+    def compile_detector_plan(self) -> None:
+        """只在初始化的时候解析一次探测器的 id, 之后每一步使用 plan 聚合订阅的结果
+        """
+        if self.detector_ids:
+            self.detector_plan = DetectorAggregationPlan(
+                detector_ids=self.detector_ids,
+                traffic_lights=self.traffic_lights,
+                detector_variables=self.detector_variables,
+                vehicle_id_format=self.vehicle_id_format,
+                vehicle_id_table=self.vehicle_id_table,
+            )
 
     def create_objects(self) -> None:
         """
         为场景初始化所有的交通信号灯
         """
-        zeros = np.zeros(12) # 十字路口包含 12 个 movement
         for _tls_id in self.tls_ids:
             traffic_light = TrafficLightInfo.create_traffic_light(
                 id=_tls_id,
                 action_type=self.action_type,
                 this_phase_index=0,
                 delta_time=self.delta_time,
-                last_step_vehicle_id_list=[[] for _ in range(12)],
-                last_step_mean_speed=zeros.tolist(), 
-                jam_length_vehicle=zeros.tolist(), 
-                jam_length_meters=zeros.tolist(),
-                last_step_occupancy=zeros.tolist(),
-                this_phase=zeros.astype(bool).tolist(), 
-                last_phase=zeros.astype(bool).tolist(), 
-                next_phase=zeros.astype(bool).tolist(), 
+                # movement 特征的长度在获得路口的 movement 之后确定 (movement_width)
+                last_step_vehicle_id_list=[],
+                last_step_mean_speed=[], 
+                jam_length_vehicle=[], 
+                jam_length_meters=[],
+                last_step_occupancy=[],
+                this_phase=[], 
+                last_phase=[], 
+                next_phase=[], 
                 sumo=self.sumo,
+                features=self.features,
+                clock=self.clock,
+                topology_cache=self.topology_cache,
+                movement_width=self.movement_width,
+                vehicle_id_format=self.vehicle_id_format,
             )
+            if traffic_light.tls_action.next_action_time < self.clock.time: # 仿真不是从 0 开始 (例如 warm-up 或是加载快照)
+                traffic_light.tls_action.next_action_time = self.clock.time
             self.traffic_lights[_tls_id] = traffic_light
+            self.decision_scheduler.push(_tls_id, traffic_light.tls_action.next_action_time)
 
     def process_detector_data(self, raw_data) -> Dict[str, Dict[str, Dict[str, float]]]:
         """
@@ -115,7 +207,7 @@ class TrafficLightBuilder(BaseBuilder):
                 
                 # 处理每一个 lane 对应的 {17: 14.374141326903933, 24: 7, 25: 1, 19: 0.4} 的信息
                 for k, v in value.items():
-                    _meaning_key = self.tsc_convert.get_meaning(k) # key 名称转换
+                    _meaning_key = self.tsc_convert.get_meaning(k) or k # key 名称转换 (已经是名称的 key 保持不变)
                     _is_init = (output[junction_id][edge_direction][_meaning_key] == defaultdict()) # 需要初始化的状态
                     if isinstance(v, (int, float)):
                         if _is_init:
@@ -155,8 +247,21 @@ class TrafficLightBuilder(BaseBuilder):
                 }
         """
         for _tls_id, _tls_data in processed_data.items():
+            if self.vehicle_id_format != 'list': # 车辆 id 转换为 handle 或是车辆数
+                for _movement_data in _tls_data.values():
+                    if 'last_step_vehicle_id_list' in _movement_data:
+                        _movement_data['last_step_vehicle_id_list'] = self.convert_vehicle_ids(_movement_data['last_step_vehicle_id_list'])
             self.traffic_lights[_tls_id].update_features(_tls_data)
 
+    def convert_vehicle_ids(self, vehicle_ids:List[str]) -> Any:
+        """将一个 movement 的车辆 id 转换为 vehicle_id_format 对应的格式
+        """
+        if self.vehicle_id_format == 'handle':
+            return self.vehicle_id_table.intern_many(vehicle_ids)
+        if self.vehicle_id_format == 'count':
+            return len(vehicle_ids)
+        return vehicle_ids
+
     def get_objects_infos(self):
         """
         获取场景中所有交通信号灯的信息, 主要有以下的步骤:
@@ -164,20 +269,126 @@ class TrafficLightBuilder(BaseBuilder):
         2. 处理探测器的结果, 得到 processed_data
         3. 根据处理好的数据去更新 traffic light 的信息
         4. 将更新好的结果转换为 dict 进行输出
+        其中 2, 3 在订阅结果完整的时候使用预先编译的 detector_plan, 直接写入每一个信号灯
+        使用 tensor 的时候, 探测器的结果直接写入 observation_tensor, 返回数组而不是每个信号灯的 dict
         """
+        self.decision_scheduler.peek(self.clock.time) # 错过动作时间的信号灯在计算 can_perform_action 之前重新调度
         detector_result = self.sumo.lanearea.getAllSubscriptionResults()
-        processed_data = self.process_detector_data(detector_result)
-        self.update_objects_state(processed_data)
+        is_plan_complete = (self.detector_plan is not None) and self.detector_plan.is_complete(detector_result)
+        if self.is_tensor:
+            return self.__get_tensor_infos(detector_result, is_plan_complete)
+
+        if is_plan_complete:
+            self.detector_plan.apply(detector_result, self.traffic_lights)
+        else:
+            processed_data = self.process_detector_data(detector_result)
+            self.update_objects_state(processed_data)
         # 最后需要将其转换为 dict 进行输出
         tls_features = {}
         for _tls_id in self.tls_ids:
             tls_features[_tls_id] = self.traffic_lights[_tls_id].get_features()
         return tls_features
 
+    def __get_tensor_infos(self, detector_result, is_plan_complete:bool) -> Dict[str, Any]:
+        """更新 observation_tensor, 返回数组的 views (TLSObservationTensor.get_views)
+        """
+        if is_plan_complete:
+            self.observation_tensor.update_from_slots(self.detector_plan.aggregate(detector_result))
+            for _tls_id in self.tls_ids:
+                self.traffic_lights[_tls_id].update_phase_state()
+        else:
+            processed_data = self.process_detector_data(detector_result)
+            self.update_objects_state(processed_data)
+        self.observation_tensor.update_from_traffic_lights(
+            self.traffic_lights, update_detector_features=not is_plan_complete
+        )
+        return self.observation_tensor.get_views()
+
+    def update_pending_transitions(self, sim_step:float) -> bool:
+        """多步仿真 (frame skip) 中不计算 obs 的仿真步, 只执行信号灯的 update (例如黄灯->绿灯).
+        与每一步调用 control_objects 时信号灯不能做动作的情况相同.
+
+        Args:
+            sim_step (float): 当前的仿真时间
+
+        Returns:
+            bool: 是否有信号灯到了可以做动作的时间. 如果有, 不执行任何 update, 需要返回 obs 由外部做动作.
+        """
+        if self.decision_scheduler.is_due(sim_step):
+            return True
+        for _tls_id in self.tls_ids:
+            self.traffic_lights[_tls_id].tls_action.update()
+        return False
+
+    def reschedule_traffic_light(self, tls_id:str, sim_step:float) -> None:
+        """decision_scheduler 将错过动作时间的信号灯重新调度到 sim_step 时调用, 信号灯在 sim_step 做动作
+        """
+        self.traffic_lights[tls_id].tls_action.next_action_time = sim_step
+
+    def get_next_decision_time(self, sim_step:float) -> float:
+        """最早需要有信号灯做动作的时间, 没有信号灯需要做动作时返回 None
+        """
+        return self.decision_scheduler.peek(sim_step)
+
+    def reset_window_stats(self) -> None:
+        """清空排队长度的统计, 每次多步仿真开始的时候调用
+        """
+        self._window_steps = 0
+        self._window_sum: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float)) # detector id -> {key: sum}
+        self._window_max: Dict[str, Dict[int, float]] = defaultdict(dict) # detector id -> {key: max}
+
+    def accumulate_window_stats(self) -> None:
+        """每一个仿真步之后, 累积每一个探测器的排队长度 (只使用已经订阅的结果, 不会增加 TraCI 的调用)
+        """
+        self._window_steps += 1
+        detector_result = self.sumo.lanearea.getAllSubscriptionResults()
+        for _detector_id, _values in detector_result.items():
+            for _key in (traci.constants.JAM_LENGTH_VEHICLE, traci.constants.JAM_LENGTH_METERS):
+                if _key not in _values:
+                    continue
+                _value = _values[_key]
+                self._window_sum[_detector_id][_key] += _value
+                _max_values = self._window_max[_detector_id]
+                _max_values[_key] = max(_max_values.get(_key, _value), _value)
+
+    def get_window_stats(self) -> Dict[str, Dict[str, List[float]]]:
+        """返回多步仿真中每个 movement 排队长度的最大值和平均值, 与 obs 一样按照 movement_ids 排列
+            {
+                'htddj_gsndj': {
+                    'jam_length_meters_max': [...], 'jam_length_meters_mean': [...],
+                    'jam_length_vehicle_max': [...], 'jam_length_vehicle_mean': [...],
+                },
+                ...
+            }
+        """
+        raw_data = {}
+        for _detector_id, _max_values in self._window_max.items():
+            raw_data[_detector_id] = {}
+            for _key, _max_value in _max_values.items():
+                _meaning = self.tsc_convert.get_meaning(_key)
+                raw_data[_detector_id][f'{_meaning}_max'] = _max_value
+                raw_data[_detector_id][f'{_meaning}_mean'] = self._window_sum[_detector_id][_key] / self._window_steps
+        processed_data = self.process_detector_data(raw_data) # 同一个 movement 的多个车道取平均
+
+        window_stats = {}
+        for _tls_id in self.tls_ids:
+            movement_ids = self.traffic_lights[_tls_id].movement_ids
+            tls_data = processed_data.get(_tls_id, {})
+            _width = len(self.traffic_lights[_tls_id].this_phase)
+            window_stats[_tls_id] = defaultdict(lambda: np.zeros(_width).tolist())
+            for i, _movement_id in enumerate(movement_ids):
+                for _stat_name, _value in tls_data.get(_movement_id, {}).items():
+                    window_stats[_tls_id][_stat_name][i] = _value
+            window_stats[_tls_id] = dict(window_stats[_tls_id])
+        return window_stats
+
     def control_objects(self, actions):
         """
         控制所有交通信号灯, 即使不能做动作, 也需要 control, 因为需要 update (黄灯->绿灯)
         """
         for _tls_id in self.tls_ids:
             tls_action = actions[_tls_id] # 得到对应 tls 的 action
-            self.traffic_lights[_tls_id].control_traffic_light(tls_action)
+            traffic_light = self.traffic_lights[_tls_id]
+            traffic_light.control_traffic_light(tls_action)
+            if traffic_light.can_perform_action: # 做了动作, 更新下一次动作的时间
+                self.decision_scheduler.push(_tls_id, traffic_light.tls_action.next_action_time)
@@ -0,0 +1,58 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 20:58:14
+@Description: 探测器中车辆 id 的压缩表示
+- 车辆 id (str) 第一次出现时分配一个整数 handle, 同一个 builder (一次 reset) 中 handle 不会改变
+- 每个 movement 的车辆使用 handle 的 list 表示 (比 str 更小, 比较和 hash 更快), 需要 id 的时候使用 get_ids 转换
+LastEditTime: 2026-10-18 20:58:14
+'''
+from itertools import chain
+from typing import Dict, List, Set, Iterable
+
+# last_step_vehicle_id_list 的输出格式
+VEHICLE_ID_FORMATS = (
+    'list', # 每个 movement 为车辆 id 的 list (str)
+    'handle', # 每个 movement 为车辆 handle 的 list (int), 使用 VehicleIDTable 转换为 id
+    'count', # 每个 movement 的车辆数 (int), 与 list 格式时 list 的长度相同
+)
+
+
+class VehicleIDTable:
+    def __init__(self) -> None:
+        self.handles: Dict[str, int] = {} # vehicle id -> handle
+        self.ids: List[str] = [] # handle -> vehicle id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def clear(self) -> None:
+        """清空所有的 handle (加载快照之后, 与新的 episode 对应)
+        """
+        self.handles.clear()
+        self.ids.clear()
+
+    def intern(self, vehicle_id:str) -> int:
+        """获得车辆的 handle, 第一次出现的车辆分配一个新的 handle
+        """
+        handle = self.handles.get(vehicle_id, None)
+        if handle is None:
+            handle = len(self.ids)
+            self.handles[vehicle_id] = handle
+            self.ids.append(vehicle_id)
+        return handle
+
+    def intern_many(self, vehicle_ids:Iterable[str]) -> List[int]:
+        """将一组车辆 id 转换为 handle
+        """
+        return [self.intern(_vehicle_id) for _vehicle_id in vehicle_ids]
+
+    def get_ids(self, handles:Iterable[int]) -> List[str]:
+        """将 handle 转换为车辆 id
+        """
+        return [self.ids[_handle] for _handle in handles]
+
+    @staticmethod
+    def unique(handle_lists:Iterable[List[int]]) -> Set[int]:
+        """多个 movement (或多个时刻) 的车辆 handle 合并并去重
+        """
+        return set(chain.from_iterable(handle_lists))
@@ -31,4 +31,11 @@ class BaseBuilder(ABC):
     def control_objects(self) -> None:
         """控制场景内所有的 objects
         """
+        pass
+
+    @abstractmethod
+    def resync(self) -> None:
+        """SUMO 加载快照 (loadState) 之后重新同步场景内的 object, 不需要重新创建 builder.
+        Note: loadState 会清空所有的订阅, 需要重新订阅
+        """
         pass
\ No newline at end of file
@@ -5,12 +5,13 @@
 @LastEditTime: 2024-06-25 17:36:13
 '''
 import os
-import shutil
+import heapq
 import sumolib
 from typing import List
 from loguru import logger
 
 from abc import ABC, abstractmethod
+from .simulation_clock import SimulationClock
 
 class BaseSumoEnvironment(ABC):
     """
@@ -34,7 +35,8 @@ class BaseSumoEnvironment(ABC):
     - reset, 初始化 feature 和 agent
     - computer_observations_rewards, 重写计算特征
     """
-    CONNECTION_LABEL = 1  # For traci multi-client support
+    CONNECTION_LABEL = 1  # For traci multi-client support, 下一个新的 label
+    FREE_LABELS: List[int] = [] # 已经释放的 label (heapq), 新的环境优先使用, 不会一直增加 CONNECTION_LABEL
     
     def __init__(self, 
                 sumo_cfg:str, # sumo config 文件
@@ -55,7 +57,9 @@ class BaseSumoEnvironment(ABC):
                 tripinfo_output_unfinished:bool=True,
                 collision_action:str=None, # 发生碰撞后的变化 # https://sumo.dlr.de/docs/Simulation/Safety.html
                 remote_port:int=None, # 设置端口, 使用 libsumo 不要开启这个
-                num_clients:int=1
+                num_clients:int=1,
+                reuse_process:bool=False, # reset 的时候不重启 SUMO, 使用 load 重新加载仿真
+                is_output_gzip:bool=False, # trip_info, statistic_output, summary 和 queue_output 使用 gzip 压缩 (文件名加上 .gz), tls_state_add 中信号灯的 output 不会被压缩
         ) -> None:
         # sumo basic config file
         self._sumo_cfg = sumo_cfg # sumo 配置文件
@@ -68,6 +72,12 @@ class BaseSumoEnvironment(ABC):
         self.summary = summary # 记录每一秒的综合信息
         self.queue_output = queue_output # 记录每一个车道的排队长度
         self.tls_state_add = tls_state_add # 记录信号灯信息
+        self.is_output_gzip = is_output_gzip # SUMO 直接写入 .gz 文件 (信号灯的 output 在 add 文件中指定, 不会修改)
+        if self.is_output_gzip:
+            self.trip_info, self.statistic_output, self.summary, self.queue_output = [
+                (_output_file if (_output_file is None) or _output_file.endswith('.gz') else f'{_output_file}.gz')
+                for _output_file in (self.trip_info, self.statistic_output, self.summary, self.queue_output)
+            ]
 
         # 多个 traci 连接
         self.remote_port = remote_port # 指定端口
@@ -96,55 +106,66 @@ class BaseSumoEnvironment(ABC):
         self.sumo_seed = sumo_seed # 设置 sumo 的随机数种子
         self.tripinfo_output_unfinished = tripinfo_output_unfinished # 车辆不达到终点也可以写入 tripinfo
         self.sumo = None # self.sumo=traic
+        self.clock = SimulationClock() # 当前的仿真时间, 每次 simulationStep 之后更新一次
+        self.snapshot_file = None # warm-start reset 的快照文件 (saveState/loadState), 由子类设置
+        self.is_snapshot_tempfile = False # 快照是否为临时文件, 关闭仿真的时候删除
 
-        self.label = str(BaseSumoEnvironment.CONNECTION_LABEL)
-        BaseSumoEnvironment.CONNECTION_LABEL += 1 # 多次初始化 label 是不同的
+        # 保持 SUMO 进程 (以及 TraCI 连接), reset 的时候使用 load 重新加载 (使用当前的 sumo_seed 和 route 文件)
+        self.reuse_process = reuse_process
+        if self.reuse_process:
+            assert self.num_clients == 1, 'reuse_process does not support multiple traci clients.'
+
+        self.label = BaseSumoEnvironment._acquire_label() # 同时存在的环境 label 是不同的
         self.reset_num = 0 # 重启环境的次数
         logger.info(f'SIM: Env Label, {self.label}.')
 
-    def __copy_files_with_reset_num(self) -> None:
-        """在 reset 之前, 需要复制产生的 output 文件, 然后进行重命名, 防止被覆盖
+    @staticmethod
+    def _acquire_label() -> str:
+        """获得一个没有被使用的 label, 优先使用已经释放的 label
         """
-        # Check and copy `self.trip_info` if it's not None
-        if self.trip_info is not None:
-            new_trip_info_path = f"{os.path.splitext(self.trip_info)[0]}_{self.reset_num}{os.path.splitext(self.trip_info)[1]}"
-            shutil.copy(self.trip_info, new_trip_info_path)
-
-        # Check and copy `self.statistic_output` if it's not None
-        if self.statistic_output is not None:
-            new_statistic_output_path = f"{os.path.splitext(self.statistic_output)[0]}_{self.reset_num}{os.path.splitext(self.statistic_output)[1]}"
-            shutil.copy(self.statistic_output, new_statistic_output_path)
+        if BaseSumoEnvironment.FREE_LABELS:
+            return str(heapq.heappop(BaseSumoEnvironment.FREE_LABELS))
+        label = BaseSumoEnvironment.CONNECTION_LABEL
+        BaseSumoEnvironment.CONNECTION_LABEL += 1
+        return str(label)
 
-        # Check and copy `self.summary` if it's not None
-        if self.summary is not None:
-            new_summary_path = f"{os.path.splitext(self.summary)[0]}_{self.reset_num}{os.path.splitext(self.summary)[1]}"
-            shutil.copy(self.summary, new_summary_path)
+    def _release_label(self) -> None:
+        """释放 label (环境被删除的时候), 之后新建的环境可以重新使用
+        """
+        if getattr(self, 'label', None) is None:
+            return
+        heapq.heappush(BaseSumoEnvironment.FREE_LABELS, int(self.label))
+        self.label = None
 
-        # Check and copy `self.queue_output` if it's not None
-        if self.queue_output is not None:
-            new_queue_output_path = f"{os.path.splitext(self.queue_output)[0]}_{self.reset_num}{os.path.splitext(self.queue_output)[1]}"
-            shutil.copy(self.queue_output, new_queue_output_path)
+    @staticmethod
+    def _get_reset_num_path(output_file:str, reset_num:int) -> str:
+        """output 文件在第 reset_num 个 episode 的文件名, 例如 tripinfo.xml -> tripinfo_1.xml, tripinfo.xml.gz -> tripinfo_1.xml.gz
+        """
+        output_file, gz_ext = (output_file[:-3], '.gz') if output_file.endswith('.gz') else (output_file, '')
+        file_name, file_ext = os.path.splitext(output_file)
+        return f"{file_name}_{reset_num}{file_ext}{gz_ext}"
 
-        # Check and copy each file in `self.tls_state_add` if it's not None
+    def __rotate_files_with_reset_num(self) -> None:
+        """在 reset 之前, 将上一个 episode 的 output 文件重命名 (os.replace), 防止被覆盖, 不需要复制文件.
+        - 关闭 SUMO 之后重命名, 启动的时候 SUMO 会在原来的位置创建新的文件
+        - reuse_process 在 load 之前重命名, SUMO 会继续写入已经打开的文件, 直到 load 的时候关闭 (load 会在原来的位置创建新的文件, 因此不能在 load 之后重命名).
+            Windows 上不能重命名打开的文件, 会抛出 OSError (PermissionError)
+        """
+        output_files = [self.trip_info, self.statistic_output, self.summary, self.queue_output]
         # 这里需要确保 output 的文件名字和 add 的文件名是一样的
         if self.tls_state_add is not None:
-            for tls_state in self.tls_state_add:
-                tls_state = tls_state.replace('.add', '.out') # 只需要 output 文件，即可
-                if os.path.exists(tls_state):
-                    new_tls_state_path = f"{os.path.splitext(tls_state)[0]}_{self.reset_num}{os.path.splitext(tls_state)[1]}"
-                    shutil.copy(tls_state, new_tls_state_path)
+            output_files += [tls_state.replace('.add', '.out') for tls_state in self.tls_state_add] # 只需要 output 文件，即可
+        for output_file in output_files:
+            if (output_file is not None) and os.path.exists(output_file):
+                os.replace(output_file, self._get_reset_num_path(output_file, self.reset_num))
 
-    def _start_simulation(self) -> None:
-        """开始仿真. 在开启之前, 需要首先检查是否有 output 的文件, 如果有就进行复制, 仿真开启仿真之后被删除.
-        接着就可以开启仿真, 有四种情况来开启仿真
+    def _get_sumo_cmd(self) -> List[str]:
+        """生成启动 SUMO 的命令, 有四种情况来开启仿真
         1. 只指定 sumocfg 文件
         2. 指定 sumocfg 和 route 文件, (新的 route 可以覆盖 sumocfg 的设置)
         3. 制定 sumocfg 和 net 文件, (新的 net 可以覆盖 sumocfg 的设置)
         4. 直接指定 net 和 route, 不使用 sumocfg
         """
-        if self.reset_num>0: # 第一次启动是不需要复制文件的
-            self.__copy_files_with_reset_num() # 复制 output 的文件
-        self.reset_num += 1 # 重置次数 +1
         if (self._net == None) and (self._route == None):
             # 使用 sumocfg 来启动 (没有指定 route 和 net)
             logger.info('SIM: 使用 sumocfg 来启动 (没有指定 route 和 net)')
@@ -191,10 +212,10 @@ class BaseSumoEnvironment(ABC):
             sumo_cmd.append('-b {}'.format(self.begin_time))
         if self.sumo_seed == 'random': # 随机数种子
             sumo_cmd.append('--random')
-        if self.tripinfo_output_unfinished:
-            sumo_cmd.append('--tripinfo-output.write-unfinished')
         else:
             sumo_cmd.extend(['--seed', str(self.sumo_seed)])
+        if self.tripinfo_output_unfinished: # 与随机数种子无关
+            sumo_cmd.append('--tripinfo-output.write-unfinished')
 
         
         if self.num_clients > 1: # 设置 num clients
@@ -218,6 +239,28 @@ class BaseSumoEnvironment(ABC):
         if self.tls_state_add is not None: # !, 注意, 需要额外去指定探测器, 不然会没有探测器
             assert isinstance(self.tls_state_add, list), '指定需要的 tls add 文件'
             sumo_cmd.extend(['-a', ','.join(self.tls_state_add)])
+        if self.snapshot_file is not None: # 快照使用更高的精度保存, 同时保存行人
+            # Note: 不保存随机数的状态, 运行中的 SUMO 使用 loadState 时不会恢复随机数的状态 (只有启动时 --load-state 会恢复)
+            sumo_cmd.extend(['--save-state.precision', '6', '--save-state.transportables'])
+        return sumo_cmd
+
+    def _start_simulation(self) -> None:
+        """开始仿真. 在开启之前, 需要首先检查是否有 output 的文件, 如果有就进行重命名, 防止开启仿真之后被覆盖.
+        开启 reuse_process 并且 SUMO 已经启动的时候, 不重启 SUMO, 直接重新加载仿真
+        """
+        if self.reuse_process and (self.sumo is not None):
+            try:
+                self.__rotate_files_with_reset_num() # 重命名 output 的文件 (SUMO 仍然打开着这些文件), load 之后 SUMO 会重新创建
+            except OSError as e: # 例如 Windows, 关闭 SUMO (关闭 output 文件) 之后再重命名, 这次 reset 重新启动 SUMO
+                logger.warning(f'SIM: Fail to rename the open output files ({e}), restart SUMO instead of load.')
+                self._close_simulation()
+            else:
+                self.__reload_simulation()
+                return
+        if self.reset_num>0: # 第一次启动是不需要重命名文件的
+            self.__rotate_files_with_reset_num() # 重命名 output 的文件
+        self.reset_num += 1 # 重置次数 +1
+        sumo_cmd = self._get_sumo_cmd()
         if self.is_libsumo: # 使用 libsumo, 需要在不同 process 才可以多开
             self.traci.start(sumo_cmd)
             self.sumo = self.traci
@@ -233,8 +276,19 @@ class BaseSumoEnvironment(ABC):
             if self.num_clients > 1:
                 self.sumo.setOrder(1) # 这里设置为 1
 
+        self.clock.bind(self.sumo) # 读取仿真开始的时间
         logger.info(f'SIM: Start Env Label, {self.label}.')
 
+    def __reload_simulation(self) -> None:
+        """在已经启动的 SUMO 中重新加载仿真 (重新读取 sumo_seed 和 route 文件等设置), 不需要重启进程和重新建立 TraCI 连接.
+        Note: 加载之后所有的订阅都会被清空, 需要重新初始化 builder; output 文件在调用之前已经重命名
+        """
+        self.reset_num += 1 # 重置次数 +1
+        sumo_cmd = self._get_sumo_cmd()
+        self.sumo.load(sumo_cmd[1:]) # load 的参数不包含 sumo binary
+        self.clock.bind(self.sumo) # 读取仿真开始的时间
+        logger.info(f'SIM: Reload Env Label, {self.label}.')
+
     def _close_simulation(self) -> None:
         """关闭仿真
         """
@@ -244,11 +298,29 @@ class BaseSumoEnvironment(ABC):
         if not self.is_libsumo:
             self.traci.switch(self.label)
         self.traci.close()
+        self.clock.invalidate()
         self.sumo = None # 关闭仿真之后 self.sumo 设置为 None
+        if self.is_snapshot_tempfile and os.path.exists(self.snapshot_file):
+            os.remove(self.snapshot_file)
         logger.info(f'SIM: Close Env Label, {self.label}.')
 
+    def _save_state(self) -> None:
+        """将当前的仿真状态保存为快照 (snapshot_file)
+        """
+        self.sumo.simulation.saveState(self.snapshot_file)
+        logger.info(f'SIM: Save State, {self.snapshot_file}, Time {self.sim_step}.')
+
+    def _load_state(self) -> None:
+        """在已经运行的 SUMO 中加载快照, 不需要重新启动仿真. 
+        Note: 加载之后所有的订阅都会被清空; 随机数的状态不会恢复, 即使固定 sumo_seed, 每次加载之后的仿真也是不同的
+        """
+        self.sumo.simulation.loadState(self.snapshot_file)
+        self.clock.update()
+        logger.info(f'SIM: Load State, {self.snapshot_file}, Time {self.sim_step}.')
+
     def __del__(self) -> None:
         self._close_simulation()
+        self._release_label()
     
     def _computer_done(self):
         done = self.sim_step > self.sim_max_time
@@ -256,9 +328,9 @@ class BaseSumoEnvironment(ABC):
     
     @property
     def sim_step(self):
-        """Return current simulation second on SUMO
+        """Return current simulation second on SUMO (由 self.clock 缓存, 每次 simulationStep 之后更新)
         """
-        return self.sumo.simulation.getTime()
+        return self.clock.time
 
     @abstractmethod
     def reset(self) -> None:
@@ -0,0 +1,82 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 15:10:42
+@Description: 惰性 (lazy) 计算的 observation
+- 每一类 object (vehicle, tls, person, ...) 的信息只有在第一次访问的时候才会从 SUMO 获取
+- 同一步中再次访问会直接返回缓存的结果
+- 仿真前进之后 observation 过期, 没有访问过的 object 不能再获取 (否则会得到下一步的信息)
+LastEditTime: 2026-10-18 15:10:42
+'''
+from loguru import logger
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator
+
+from .base_builder import BaseBuilder
+
+
+class LazyObservation(Mapping):
+    """只读的 observation, 使用方式与 dict 相同:
+        obs['tls'] # 只有这里会调用 TrafficLightBuilder.get_objects_infos
+        obs.materialize() # 获取所有的 object, 返回普通的 dict
+    """
+    def __init__(self, builders:Dict[str, BaseBuilder], static_infos:Dict[str, Any]=None) -> None:
+        """
+        Args:
+            builders (Dict[str, BaseBuilder]): object type -> builder, 为 None 的 builder 会被忽略
+            static_infos (Dict[str, Any], optional): 不需要每一步计算的信息, 例如地图信息. Defaults to None.
+        """
+        self._builders = {
+            _object_type: _builder
+            for _object_type, _builder in builders.items()
+            if _builder is not None
+        }
+        self._static_infos = static_infos or {}
+        self._cache: Dict[str, Any] = {}
+        self._is_expired = False
+
+    def __getitem__(self, key:str) -> Any:
+        if key in self._cache:
+            return self._cache[key]
+        if key in self._builders:
+            if self._is_expired:
+                raise RuntimeError(f'SIM: Observation of {key} is expired, it should be accessed before the next step.')
+            self._cache[key] = self._builders[key].get_objects_infos()
+            return self._cache[key]
+        return self._static_infos[key]
+
+    def __contains__(self, key:object) -> bool:
+        return (key in self._builders) or (key in self._static_infos) # 不会触发计算
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._builders
+        yield from self._static_infos
+
+    def __len__(self) -> int:
+        return len(self._builders) + len(self._static_infos)
+
+    def __repr__(self) -> str:
+        _keys = [f'{_key}' if self.is_materialized(_key) else f'{_key} (lazy)' for _key in self]
+        return f'LazyObservation({", ".join(_keys)})'
+
+    def is_materialized(self, key:str) -> bool:
+        """key 对应的信息是否已经获取 (静态信息总是已经获取)
+        """
+        return (key in self._cache) or (key in self._static_infos)
+
+    def materialize(self) -> Dict[str, Any]:
+        """获取所有 object 的信息, 返回普通的 dict (例如用于 render)
+        """
+        return {_key: self[_key] for _key in self}
+
+    def copy(self) -> Dict[str, Any]:
+        """与 dict.copy 相同, 返回浅拷贝的 dict
+        """
+        return self.materialize()
+
+    def expire(self) -> None:
+        """仿真前进之前调用, 之后没有访问过的 object 不能再获取
+        """
+        _lazy_keys = [_key for _key in self._builders if _key not in self._cache]
+        if _lazy_keys:
+            logger.debug(f'SIM: Observation of {_lazy_keys} are not accessed in this step.')
+        self._is_expired = True
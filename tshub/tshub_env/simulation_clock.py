@@ -0,0 +1,41 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 17:52:06
+@Description: 保存当前的仿真时间, 由 env 在每次 simulationStep 之后更新一次
+- 信号灯 (BaseTLS), builder 和 env 都读取同一个 clock, 不需要每次访问都调用 simulation.getTime
+- 没有由 env 更新的 clock (没有缓存的时间) 会直接从 SUMO 获取, 与之前的行为相同
+LastEditTime: 2026-10-18 17:52:06
+'''
+from loguru import logger
+
+
+class SimulationClock:
+    def __init__(self, sumo=None) -> None:
+        self.sumo = sumo
+        self._time: float = None # None 表示没有缓存, 每次都从 SUMO 获取
+
+    def bind(self, sumo) -> float:
+        """仿真 (重新) 开始之后绑定新的连接, 并读取一次当前时间
+        """
+        self.sumo = sumo
+        logger.debug('SIM: Simulation Clock Bind.')
+        return self.update()
+
+    def update(self) -> float:
+        """每次 simulationStep 之后调用, 只在这里调用 simulation.getTime
+        """
+        self._time = self.sumo.simulation.getTime()
+        return self._time
+
+    def invalidate(self) -> None:
+        """清空缓存的时间, 之后每次访问都会从 SUMO 获取 (例如仿真关闭之后)
+        """
+        self._time = None
+
+    @property
+    def time(self) -> float:
+        """Return current simulation second on SUMO
+        """
+        if self._time is None:
+            return self.sumo.simulation.getTime()
+        return self._time
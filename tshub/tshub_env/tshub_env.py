@@ -6,13 +6,18 @@ LastEditTime: 2025-07-09 16:31:06
 '''
 import os
 import sys
+import tempfile
 from loguru import logger
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Dict, List, Any, Literal
 
 from .base_sumo_env import BaseSumoEnvironment
+from .lazy_observation import LazyObservation
 from ..map.map_builder import MapBuilder
 from ..aircraft.aircraft_builder import AircraftBuilder
 from ..traffic_light.traffic_light_builder import TrafficLightBuilder
+from ..traffic_light.tls_topology_cache import TLSTopologyCache
+from ..traffic_light.vehicle_id_table import VehicleIDTable
 from ..vehicle.vehicle_builder import VehicleBuilder
 from ..person.person_builder import PersonBuilder
 from ..visualization.visualize_map import render_map
@@ -24,6 +29,10 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("Please declare the environment variable 'SUMO_HOME'")
 
+# 快照在 warm-up 结束之前的几步保存, 加载之后重新仿真这几步. 
+# 探测器的状态 (例如车辆停车的时间, 用于计算排队长度) 不在快照中, 需要重新测量
+SNAPSHOT_SETTLE_STEPS = 3
+
 
 class TshubEnvironment(BaseSumoEnvironment):
     """
@@ -60,7 +69,15 @@ class TshubEnvironment(BaseSumoEnvironment):
                  tls_state_add: List = None, use_gui: bool = False, is_libsumo: bool = False, 
                  begin_time=0, num_seconds=20000, max_depart_delay=100000, time_to_teleport=-1, 
                  sumo_seed: str = 'random', tripinfo_output_unfinished:bool=True, collision_action:str=None,
-                 remote_port: int = None, num_clients: int = 1
+                 remote_port: int = None, num_clients: int = 1,
+                 is_vehicle_columnar: bool = False, vehicle_subscription_mode: str = 'vehicle',
+                 vehicle_features: List[str] = None, person_features: List[str] = None, tls_features: List[str] = None,
+                 is_lazy_observation: bool = False,
+                 tls_topology_cache_dir: str = None, is_tls_tensor: bool = False, tls_movement_width: int = 12,
+                 tls_vehicle_id_format: str = 'list',
+                 is_snapshot_reset: bool = False, snapshot_warmup_steps: int = 1, snapshot_file: str = None,
+                 reuse_process: bool = False,
+                 is_output_gzip: bool = False, # 只压缩 trip_info, statistic_output, summary 和 queue_output, tls_state_add 中信号灯的 output 不会被压缩
         ) -> None:
         
         super().__init__(sumo_cfg, net_file, route_file, 
@@ -68,7 +85,7 @@ class TshubEnvironment(BaseSumoEnvironment):
                          tls_state_add, use_gui, is_libsumo, 
                          begin_time, num_seconds, max_depart_delay, time_to_teleport, 
                          sumo_seed, tripinfo_output_unfinished, 
-                         collision_action, remote_port, num_clients
+                         collision_action, remote_port, num_clients, reuse_process, is_output_gzip
                         )
 
         self.is_map_builder_initialized = is_map_builder_initialized
@@ -86,6 +103,11 @@ class TshubEnvironment(BaseSumoEnvironment):
         self.tls_ids = tls_ids
         self.tls_action_type = tls_action_type
         self.delta_time = delta_time
+        self.tls_features = tls_features # 信号灯需要的特征, None 表示所有的特征
+        self.is_tls_tensor = is_tls_tensor # 信号灯信息以 NumPy 数组返回
+        self.tls_vehicle_id_format = tls_vehicle_id_format # 探测器中车辆 id 的格式, list, handle (整数, 使用 get_tls_vehicle_id_table 转换) 或是 count (车辆数)
+        self.tls_movement_width = tls_movement_width # 每个路口 movement 特征的长度 (padding), None 表示与路口的 movement 数量相同
+        self.tls_topology_cache = TLSTopologyCache(cache_dir=tls_topology_cache_dir) # 路口拓扑信息在多次 reset 之间共享, 设置文件夹后多个进程也可以共享
         if self.is_traffic_light_builder_initialized is True and not self.tls_ids:
             raise ValueError("Both `map_init` and `tls_ids` need to be set together.")
         if tls_ids is not None:
@@ -98,6 +120,35 @@ class TshubEnvironment(BaseSumoEnvironment):
         # Vehicle Builder Input
         self.vehicle_action_type = vehicle_action_type
         self.hightlight = hightlight
+        self.is_vehicle_columnar = is_vehicle_columnar # 车辆信息以 NumPy 数组 (列式) 返回
+        self.vehicle_subscription_mode = vehicle_subscription_mode # vehicle 或是 context (一次订阅所有车辆)
+        self.vehicle_features = vehicle_features # 车辆只订阅和输出这些特征, None 表示所有的特征
+
+        # Person Builder Input
+        self.person_features = person_features
+
+        # obs 是否惰性计算, 开启之后每一类 object 只有在访问的时候才会从 SUMO 获取
+        self.is_lazy_observation = is_lazy_observation
+
+        # warm-start reset, 第一次 reset 在 warm-up 之后保存快照, 之后的 reset 在同一个 SUMO 中加载快照 (不需要重启仿真)
+        # builder 对象会保留 (路口拓扑, 探测器的 plan, 观测数组, vType 缓存), 但是每个 object (信号灯, 车辆, 行人, aircraft) 会重新创建
+        # Note: 不会重启 SUMO, 因此 trip_info 等输出文件不会按照 reset 分开保存
+        # Note: loadState 不会恢复随机数的状态, 每个 episode 的初始状态相同, 但是之后的仿真是随机的 (即使固定 sumo_seed)
+        self.is_snapshot_reset = is_snapshot_reset
+        self.snapshot_warmup_steps = snapshot_warmup_steps # warm-up 的步数, 最后几步在保存 (加载) 快照之后仿真
+        self.snapshot_settle_steps = min(snapshot_warmup_steps, SNAPSHOT_SETTLE_STEPS)
+        self.snapshot_program_states = None # 保存快照时信号灯的方案
+        if self.is_snapshot_reset:
+            assert snapshot_warmup_steps >= 1, f'snapshot_warmup_steps should be >= 1, now is {snapshot_warmup_steps}.'
+            self.is_snapshot_tempfile = (snapshot_file is None)
+            self.snapshot_file = snapshot_file if snapshot_file is not None else os.path.join(
+                tempfile.gettempdir(), f'tshub_snapshot_{os.getpid()}_{self.label}.xml'
+            )
+
+        # 异步 step (step_async/step_wait), 在后台线程中仿真, 线程在第一次 step_async 的时候创建
+        self.step_executor: ThreadPoolExecutor = None
+        self.step_future: Future = None # 没有完成的 step
+        self.step_window_stats = False # 没有完成的 step 是否统计排队长度
 
         # For SUMI-GUI render
         self.render_count = 0
@@ -112,7 +163,12 @@ class TshubEnvironment(BaseSumoEnvironment):
             self.map_infos = map_builder.get_objects_infos() # Statistic Map Info
 
         vehicle_builder = (
-            VehicleBuilder(sumo=self.sumo, action_type=self.vehicle_action_type, hightlight=self.hightlight)
+            VehicleBuilder(
+                sumo=self.sumo, action_type=self.vehicle_action_type, 
+                hightlight=self.hightlight, is_columnar=self.is_vehicle_columnar,
+                subscription_mode=self.vehicle_subscription_mode,
+                features=self.vehicle_features, clock=self.clock
+            )
             if self.is_vehicle_builder_initialized
             else None
         )
@@ -122,12 +178,17 @@ class TshubEnvironment(BaseSumoEnvironment):
             else None
         )
         tls_builder = (
-            TrafficLightBuilder(sumo=self.sumo, tls_ids=self.tls_ids, action_type=self.tls_action_type, delta_time=self.delta_time)
+            TrafficLightBuilder(
+                sumo=self.sumo, tls_ids=self.tls_ids, action_type=self.tls_action_type, 
+                delta_time=self.delta_time, features=self.tls_features, clock=self.clock,
+                topology_cache=self.tls_topology_cache, is_tensor=self.is_tls_tensor,
+                movement_width=self.tls_movement_width, vehicle_id_format=self.tls_vehicle_id_format
+            )
             if self.is_traffic_light_builder_initialized
             else None
         )
         person_builder = (
-            PersonBuilder(sumo=self.sumo)
+            PersonBuilder(sumo=self.sumo, features=self.person_features, clock=self.clock)
             if self.is_person_builder_initialized
             else None
         )
@@ -139,40 +200,181 @@ class TshubEnvironment(BaseSumoEnvironment):
             'person': person_builder,
         }
 
+    def __resync_builder(self) -> None:
+        """加载快照之后, 重新同步场景内的 builder: 保留 builder 以及其中的缓存, 重新订阅并重新创建场景内的 object
+        """
+        for _object_builder in self.scene_objects.values():
+            if _object_builder is not None:
+                _object_builder.resync()
+
+    def __warmup(self, num_steps:int) -> None:
+        """不创建 builder 直接仿真 num_steps 步 (信号灯使用原始的方案)
+        """
+        for _ in range(num_steps):
+            self.sumo.simulationStep()
+        self.clock.update()
+
     def reset(self) -> Dict[str, Any]:
-        """重置环境, 返回初始的 obs
+        """重置环境, 返回初始的 obs. 
+        开启 is_snapshot_reset 之后, 只有第一次 reset 会启动仿真, 之后的 reset 加载快照并重新同步 builder (重新创建 builder 中的 object)
+        开启 reuse_process 之后, 之后的 reset 在同一个 SUMO 中重新加载仿真 (load), 并重新创建 builder
         """
-        self._close_simulation() # 关闭仿真
-        self._start_simulation() # 开启仿真
-        self.__init_builder() # 初始化场景内的 builder
+        self.__check_no_pending_step('reset')
+        if self.is_snapshot_reset and (self.sumo is not None):
+            self._load_state() # 加载快照 (仿真时间回到 warm-up 结束之前)
+            if self.scene_objects['tls'] is not None:
+                self.scene_objects['tls'].restore_programs(self.snapshot_program_states)
+            self.__warmup(self.snapshot_settle_steps) # 加载快照之后探测器需要重新测量
+            self.__resync_builder()
+        else:
+            if not self.reuse_process: # reuse_process 不关闭 SUMO, 在 _start_simulation 中重新加载仿真
+                self._close_simulation() # 关闭仿真
+            self._start_simulation() # 开启仿真
+            if self.is_snapshot_reset: # 与加载快照相同, 快照在 warm-up 结束之前保存
+                self.__warmup(self.snapshot_warmup_steps - self.snapshot_settle_steps)
+                self._save_state()
+                if self.is_traffic_light_builder_initialized: # 信号灯的方案会被修改, 加载快照之后需要恢复
+                    self.snapshot_program_states = TrafficLightBuilder.get_program_states(self.sumo, self.tls_ids)
+                self.__warmup(self.snapshot_settle_steps)
+            self.__init_builder() # 初始化场景内的 builder
         obs = self.__computer_observation()
 
-        self.obs = obs.copy() # copy obs for render
+        self.obs = obs if self.is_lazy_observation else obs.copy() # copy obs for render
 
         return obs
     
-    def step(self, actions):
-        # apply action
+    def step(self, actions, n_steps:int=1, window_stats:bool=False, until_decision:bool=False):
+        """执行动作, 并仿真 n_steps 步 (frame skip)
+
+        Args:
+            actions (Dict[str, Any]): 每一类 object 的动作, 只在第一步执行
+            n_steps (int, optional): 最多仿真的步数. 中间的仿真步只执行信号灯的 update (黄灯->绿灯) 和新进入路网车辆的初始化 (ego 车辆的控制模式), 
+                只在最后一步计算 obs. 如果中途有信号灯可以做动作, 或者仿真结束, 会提前返回. Defaults to 1.
+            window_stats (bool, optional): 是否统计这几步中每个 movement 排队长度的最大值和平均值, 
+                结果保存在 info['tls_window_stats']. Defaults to False.
+            until_decision (bool, optional): 忽略 n_steps, 一直仿真到下一个有信号灯需要做动作的时间 (或仿真结束) 才返回 obs,
+                中间的仿真步与 n_steps 相同. Defaults to False.
+
+        info['next_decision_time'] 为最早需要有信号灯做动作的时间 (由 TrafficLightBuilder 的 decision_scheduler 给出), 
+        等于 info['step_time'] 表示这一步有信号灯可以做动作.
+        """
+        self.__check_no_pending_step('step')
+        n_steps = self.__apply_actions(actions, n_steps, window_stats, until_decision)
+        num_steps = self.__simulate(n_steps, window_stats)
+        return self.__collect_step(num_steps, window_stats)
+
+    def __apply_actions(self, actions, n_steps:int, window_stats:bool, until_decision:bool) -> float:
+        """执行动作 (只在第一步), 返回最多仿真的步数
+        """
+        assert n_steps >= 1, f'n_steps should be >= 1, now is {n_steps}.'
         for _object_type, _object_action in actions.items():
             if self.scene_objects[_object_type] is not None:
+                if self.is_lazy_observation:
+                    self.obs[_object_type] # 控制之前需要更新 object 的状态 (例如信号灯是否可以做动作)
                 self.scene_objects[_object_type].control_objects(_object_action)
-        
-        self.sumo.simulationStep()
-        logger.info(f'SIM: ==> Simulation Step: {self.sim_step} <==') # 日志中打印当前的仿真时间
+        if self.is_lazy_observation:
+            self.obs.expire() # 仿真前进之后, 上一步没有访问过的 object 不能再获取
 
-        # update env
+        tls_builder = self.scene_objects['tls']
+        if until_decision:
+            assert tls_builder is not None, '仿真到下一个动作时间需要初始化 traffic light builder.'
+            n_steps = float('inf') # 只在有信号灯需要做动作或仿真结束时返回
+        if window_stats:
+            assert tls_builder is not None, '统计排队长度需要初始化 traffic light builder.'
+            tls_builder.reset_window_stats()
+        return n_steps
+
+    def __simulate(self, n_steps:float, window_stats:bool) -> int:
+        """仿真 n_steps 步 (中间的仿真步只执行信号灯的 update 和车辆的初始化), 返回实际仿真的步数. 不会修改上一步的 obs
+        """
+        tls_builder, vehicle_builder = self.scene_objects['tls'], self.scene_objects['vehicle']
+        num_steps = 0
+        while True:
+            self.sumo.simulationStep()
+            self.clock.update() # 每一步只获取一次仿真时间, 所有 builder 和信号灯共享
+            num_steps += 1
+            logger.info(f'SIM: ==> Simulation Step: {self.sim_step} <==') # 日志中打印当前的仿真时间
+            if window_stats:
+                tls_builder.accumulate_window_stats()
+            if (num_steps >= n_steps) or self._computer_done():
+                break
+            if (tls_builder is not None) and tls_builder.update_pending_transitions(self.sim_step):
+                break # 有信号灯可以做动作, 提前返回 obs
+            if vehicle_builder is not None:
+                vehicle_builder.update_departed_objects() # 新进入路网的车辆 (ego 车辆的控制模式) 与每一步仿真时相同
+        return num_steps
+
+    def __collect_step(self, num_steps:int, window_stats:bool):
+        """仿真结束之后计算 obs, reward, info 和 done
+        """
+        tls_builder = self.scene_objects['tls']
         obs = self.__computer_observation()
         reward = self.__computer_reward()
         info = self.__compute_info()
+        info['num_steps'] = num_steps # 实际仿真的步数
+        if tls_builder is not None:
+            info['next_decision_time'] = tls_builder.get_next_decision_time(self.sim_step)
+        if window_stats:
+            info['tls_window_stats'] = tls_builder.get_window_stats()
         done = self._computer_done()
 
-        self.obs = obs.copy() # copy obs for render
+        self.obs = obs if self.is_lazy_observation else obs.copy() # copy obs for render
         
         return obs, reward, info, done
 
+    def step_async(self, actions, n_steps:int=1, window_stats:bool=False, until_decision:bool=False) -> None:
+        """执行动作之后, 在后台线程中仿真 (参数与 step 相同), 不等待仿真完成, 结果通过 step_wait 获得.
+        TraCI 等待 SUMO 仿真的时候会释放 GIL, 主线程可以同时处理上一步的 obs (例如计算 reward, 保存到 replay buffer, 训练).
+
+        Note: 
+        - 后台线程只执行仿真 (simulationStep, 信号灯的 update 以及新车辆的初始化), obs 在 step_wait 中计算, 因此上一步的 obs 在 step_wait 之前不会被修改;
+            惰性的 obs (is_lazy_observation) 在 step_async 之后不能再访问, 需要的 object 在 step_async 之前访问
+        - 在 step_wait 之前不能调用 step, reset 和 render (会抛出 RuntimeError), 也不能访问 self.sumo
+        - libsumo 在调用的时候不会释放 GIL, 没有并行的效果, 多个环境需要并行的时候使用 VectorTshubEnv
+        """
+        self.__check_no_pending_step('step_async')
+        n_steps = self.__apply_actions(actions, n_steps, window_stats, until_decision) # 动作在主线程中执行
+        if self.step_executor is None:
+            if self.is_libsumo:
+                logger.warning('SIM: libsumo holds the GIL, step_async will not overlap with the main thread.')
+            self.step_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'tshub-step-{self.label}')
+        self.step_future = self.step_executor.submit(self.__simulate, n_steps, window_stats)
+        self.step_window_stats = window_stats
+
+    def step_wait(self):
+        """等待 step_async 的仿真完成, 计算并返回 obs, reward, info, done (与 step 相同). 后台线程中的异常在这里抛出
+        """
+        if self.step_future is None:
+            raise RuntimeError('SIM: call step_async before step_wait.')
+        step_future, self.step_future = self.step_future, None
+        num_steps = step_future.result()
+        return self.__collect_step(num_steps, self.step_window_stats)
+
+    def __check_no_pending_step(self, method:str) -> None:
+        """step_async 的仿真没有完成的时候, 不能再使用 SUMO
+        """
+        if self.step_future is not None:
+            raise RuntimeError(f'SIM: step_async is still running, call step_wait before {method}.')
+
+    def _close_simulation(self) -> None:
+        """关闭仿真, 等待没有完成的 step_async, 并关闭后台线程
+        """
+        if getattr(self, 'step_future', None) is not None:
+            self.step_future.exception() # 只等待完成, 异常不再抛出
+            self.step_future = None
+        if getattr(self, 'step_executor', None) is not None:
+            self.step_executor.shutdown(wait=True)
+            self.step_executor = None
+        super()._close_simulation()
+
     def __computer_observation(self) -> Dict[str, Any]:
         """自定义 obs 的计算
         """
+        if self.is_lazy_observation:
+            return LazyObservation(
+                self.scene_objects, 
+                self.map_infos if self.is_map_builder_initialized else None
+            ) # 访问的时候才会计算
         env_state = {
             _object_type: _object_builder.get_objects_infos()
             for _object_type, _object_builder in self.scene_objects.items()
@@ -193,6 +395,18 @@ class TshubEnvironment(BaseSumoEnvironment):
         return {
             'step_time': self.sim_step, # 返回当前仿真的时间
         }
+
+    def get_tls_vehicle_id_table(self) -> VehicleIDTable:
+        """tls_vehicle_id_format='handle' 时, 信号灯观测中车辆 handle 与车辆 id 的对应关系, 例如:
+            table = env.get_tls_vehicle_id_table()
+            table.get_ids(obs['tls']['J1']['last_step_vehicle_id_list'][0]) # 第一个 movement 的车辆 id
+
+        Note: 每次 reset 之后 handle 会重新分配, 需要在 reset 之后重新获取, 上一个 episode 的 handle 不能再使用
+        """
+        tls_builder = getattr(self, 'scene_objects', {}).get('tls', None) # reset 之后才会创建 builder
+        if tls_builder is None:
+            raise ValueError('需要初始化 traffic light builder, 并在 reset 之后获取')
+        return tls_builder.vehicle_id_table
     
     def render(self, mode:str='rgb',
                focus_id:str=None, focus_type:str=None, focus_distance:float=None, 
@@ -207,12 +421,13 @@ class TshubEnvironment(BaseSumoEnvironment):
             focus_distance (float, optional): 追踪覆盖的范围. Defaults to None.
             save_folder (str, optional): 当 mode='sumo_gui' 的时候，图像保存的文件夹。 
         """
+        self.__check_no_pending_step('render')
         if not self.is_map_builder_initialized:
             raise ValueError('需要初始化地图信息')
         
         # Step 1. Filter Object (找出符合要求的 object 坐标)
         obs, x_range, y_range = filter_object(
-            self.obs, 
+            self.obs.materialize() if self.is_lazy_observation else self.obs, 
             focus_id, focus_type, focus_distance
         )
 
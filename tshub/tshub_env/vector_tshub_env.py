@@ -0,0 +1,304 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 21:58:40
+@Description: 在多个进程中同时运行 N 个 TshubEnvironment (每个进程一个 libsumo)
+- 信号灯的观测 (is_tls_tensor=True 的 padding 数组) 和动作保存在共享内存的 NumPy 数组中, 不需要 pickle 嵌套的 dict
+- 进程之间的 Pipe 只发送命令和很小的 info
+- 所有环境同时 step / reset, 某个环境结束之后会自动 reset (auto-reset), 结束时的观测保存在 info['final_observation']
+- 只返回信号灯的观测, 其他 object (车辆, 行人等) 仍然在子进程中仿真, 但不会返回
+LastEditTime: 2026-10-18 21:58:40
+'''
+import os
+import ctypes
+import traceback
+import numpy as np
+import multiprocessing as mp
+from loguru import logger
+from typing import Dict, List, Any, Tuple
+
+from .tshub_env import TshubEnvironment
+from ..traffic_light.traffic_light import TrafficLightInfo
+from ..traffic_light.tls_observation_tensor import TLSObservationTensor
+from ..utils.init_log import set_logger
+
+# 从信号灯 tensor 写入共享内存的观测
+VECTOR_OBSERVATION_KEYS = ('movement_features', 'movement_mask', 'this_phase_index', 'can_perform_action')
+
+
+def _get_arrays(raw_buffers:Dict[str, Any], buffer_specs:Dict[str, Tuple[Tuple[int], Any]], num_envs:int) -> Dict[str, np.ndarray]:
+    """将共享内存转换为 NumPy 数组 (num_envs, ...), 不会复制
+    """
+    return {
+        _name: np.frombuffer(raw_buffers[_name], dtype=_dtype).reshape((num_envs,) + _shape)
+        for _name, (_shape, _dtype) in buffer_specs.items()
+    }
+
+
+def _write_observation(buffers:Dict[str, np.ndarray], index:int, tls_views:Dict[str, np.ndarray], step_time:float) -> None:
+    """将一个环境的信号灯观测写入共享内存的第 index 行
+    """
+    for _key in VECTOR_OBSERVATION_KEYS:
+        buffers[_key][index] = tls_views[_key]
+    buffers['step_time'][index] = step_time
+
+
+def _worker(index:int, env_kwargs:Dict[str, Any],
+            raw_buffers:Dict[str, Any], buffer_specs:Dict[str, Tuple[Tuple[int], Any]], num_envs:int,
+            pipe, log_path:str=None) -> None:
+    """子进程, 接收 reset / step / close 命令, 结果写入共享内存, 通过 pipe 返回 ('ok', info) 或是 ('error', traceback)
+    """
+    logger.remove() # 子进程默认不输出日志 (每一步都会有 INFO 日志)
+    if log_path is not None:
+        set_logger(os.path.join(log_path, f'worker_{index}'), terminal_log_level='WARNING')
+
+    buffers = _get_arrays(raw_buffers, buffer_specs, num_envs)
+    env = None
+    try:
+        env = TshubEnvironment(**env_kwargs)
+        tls_ids = env.tls_ids
+        is_scalar_action = (buffers['actions'].ndim == 2) # 每个信号灯的动作是一个数
+        while True:
+            command, data = pipe.recv()
+            if command == 'reset':
+                obs = env.reset()
+                _write_observation(buffers, index, obs['tls'], env.sim_step)
+                pipe.send(('ok', {'step_time': env.sim_step}))
+            elif command == 'step':
+                _actions = buffers['actions'][index]
+                tls_actions = {
+                    _tls_id: (_actions[_row].item() if is_scalar_action else _actions[_row].tolist())
+                    for _row, _tls_id in enumerate(tls_ids)
+                }
+                obs, reward, info, done = env.step({'tls': tls_actions}, **data)
+                buffers['rewards'][index] = reward
+                buffers['dones'][index] = done
+                if done: # auto-reset, 返回的是新的 episode 的初始观测
+                    info['final_observation'] = {_key: np.copy(obs['tls'][_key]) for _key in VECTOR_OBSERVATION_KEYS}
+                    obs = env.reset()
+                _write_observation(buffers, index, obs['tls'], env.sim_step)
+                pipe.send(('ok', info))
+            elif command == 'close':
+                break
+            else:
+                raise ValueError(f'Unknown command {command}.')
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        pipe.send(('error', traceback.format_exc()))
+    finally:
+        if env is not None:
+            env._close_simulation()
+        pipe.close()
+
+
+class VectorTshubEnv:
+    """同时运行 num_envs 个只控制信号灯的 TshubEnvironment, 每一个环境在单独的进程中 (libsumo).
+
+        vector_env = VectorTshubEnv(num_envs=4, env_kwargs={'sumo_cfg': ..., 'tls_ids': [...], ...})
+        obs = vector_env.reset() # obs['movement_features'].shape = (num_envs, num_tls, width, F)
+        obs, rewards, infos, dones = vector_env.step(actions) # actions.shape = (num_envs, num_tls)
+        vector_env.close()
+
+    返回的观测是共享内存的数组本身 (zero-copy), 下一次 step 时会被原地覆盖, 需要保留的时候需要 copy.
+    使用 spawn 启动子进程时, 脚本需要放在 if __name__ == '__main__' 中.
+    """
+    def __init__(self,
+                 num_envs:int,
+                 env_kwargs:Dict[str, Any],
+                 seeds:List[int]=None,
+                 action_shape:Tuple[int]=(),
+                 action_dtype=np.int64,
+                 context:str='spawn',
+                 log_path:str=None,
+        ) -> None:
+        """
+        Args:
+            num_envs (int): 环境 (进程) 的数量
+            env_kwargs (Dict[str, Any]): TshubEnvironment 的参数, 所有环境相同.
+                会强制使用 is_libsumo=True, is_tls_tensor=True, use_gui=False, is_lazy_observation 默认为 True (只计算信号灯的观测).
+            seeds (List[int], optional): 每个环境的 sumo_seed, None 表示使用 env_kwargs 中的 sumo_seed (整数时第 i 个环境为 sumo_seed+i). Defaults to None.
+            action_shape (Tuple[int], optional): 每个信号灯动作的形状, () 表示一个数 (例如 choose_next_phase),
+                adjust_cycle_duration 为 (绿灯相位数量,). Defaults to ().
+            action_dtype (optional): 动作的类型. Defaults to np.int64.
+            context (str, optional): multiprocessing 启动子进程的方式. Defaults to 'spawn'.
+            log_path (str, optional): 子进程日志的文件夹, None 表示子进程不输出日志. Defaults to None.
+        """
+        assert num_envs >= 1, f'num_envs should be >= 1, now is {num_envs}.'
+        self.num_envs = num_envs
+        self.env_kwargs = self.__check_env_kwargs(env_kwargs)
+        self.tls_ids: List[str] = list(self.env_kwargs['tls_ids'])
+        self.features: Tuple[str] = TLSObservationTensor.select_features(
+            TrafficLightInfo.check_features(self.env_kwargs.get('tls_features', None))
+        )
+        self.movement_width: int = self.env_kwargs.get('tls_movement_width', 12)
+        self.action_shape = tuple(action_shape)
+        seeds = self.__get_seeds(seeds)
+
+        # 共享内存, 不需要连接 SUMO 就可以确定形状
+        num_tls = len(self.tls_ids)
+        self.buffer_specs: Dict[str, Tuple[Tuple[int], Any]] = {
+            'movement_features': ((num_tls, self.movement_width, len(self.features)), np.float32),
+            'movement_mask': ((num_tls, self.movement_width), np.bool_),
+            'this_phase_index': ((num_tls,), np.int64),
+            'can_perform_action': ((num_tls,), np.bool_),
+            'step_time': ((), np.float64),
+            'rewards': ((), np.float64),
+            'dones': ((), np.bool_),
+            'actions': ((num_tls,) + self.action_shape, action_dtype),
+        }
+        ctx = mp.get_context(context)
+        self.raw_buffers = {
+            _name: ctx.RawArray(ctypes.c_uint8, max(1, int(np.prod((num_envs,) + _shape)) * np.dtype(_dtype).itemsize))
+            for _name, (_shape, _dtype) in self.buffer_specs.items()
+        }
+        self.buffers = _get_arrays(self.raw_buffers, self.buffer_specs, num_envs)
+
+        # 启动子进程
+        self.pipes = []
+        self.processes = []
+        for _index in range(num_envs):
+            _env_kwargs = dict(self.env_kwargs, sumo_seed=seeds[_index])
+            _parent_pipe, _child_pipe = ctx.Pipe()
+            _process = ctx.Process(
+                target=_worker,
+                args=(_index, _env_kwargs, self.raw_buffers, self.buffer_specs, num_envs, _child_pipe, log_path),
+                daemon=True,
+            )
+            _process.start()
+            _child_pipe.close()
+            self.pipes.append(_parent_pipe)
+            self.processes.append(_process)
+        self.closed = False
+        self.waiting_step = False # 是否有没有完成的 step_async
+        logger.info(f'SIM: Vector TSHub Env, {num_envs} workers, observation shape {self.buffers["movement_features"].shape}.')
+
+    def __check_env_kwargs(self, env_kwargs:Dict[str, Any]) -> Dict[str, Any]:
+        """子进程中 TshubEnvironment 的参数
+        """
+        env_kwargs = dict(env_kwargs)
+        if not env_kwargs.get('tls_ids', None):
+            raise ValueError('SIM: VectorTshubEnv needs `tls_ids`, the observation is the traffic light tensor.')
+        if env_kwargs.get('is_traffic_light_builder_initialized', True) is not True:
+            raise ValueError('SIM: VectorTshubEnv needs the traffic light builder.')
+        if env_kwargs.get('tls_movement_width', 12) is None:
+            raise ValueError('SIM: VectorTshubEnv needs a fixed `tls_movement_width` to allocate the shared memory.')
+        env_kwargs.update(is_libsumo=True, is_tls_tensor=True, use_gui=False)
+        env_kwargs.setdefault('is_lazy_observation', True)
+        return env_kwargs
+
+    def __get_seeds(self, seeds:List[int]=None) -> List[Any]:
+        """每个环境的 sumo_seed, 避免所有环境完全相同
+        """
+        if seeds is not None:
+            assert len(seeds) == self.num_envs, f'seeds should have {self.num_envs} values, now is {len(seeds)}.'
+            return list(seeds)
+        sumo_seed = self.env_kwargs.get('sumo_seed', 'random')
+        if isinstance(sumo_seed, int):
+            return [sumo_seed + _index for _index in range(self.num_envs)]
+        return [sumo_seed] * self.num_envs
+
+    def __get_observation(self) -> Dict[str, Any]:
+        """共享内存的数组 (num_envs, ...), 不会复制
+        """
+        obs = {
+            'tls_ids': self.tls_ids,
+            'features': self.features,
+            'step_time': self.buffers['step_time'],
+        }
+        obs.update({_key: self.buffers[_key] for _key in VECTOR_OBSERVATION_KEYS})
+        return obs
+
+    def __send(self, command:str, data:Any=None) -> None:
+        """向所有子进程发送命令. 子进程已经退出 (例如 libsumo abort) 时忽略, 在 __receive 中报告错误
+        """
+        for _pipe in self.pipes:
+            try:
+                _pipe.send((command, data))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def __receive(self) -> List[Dict[str, Any]]:
+        """等待所有子进程完成, 子进程出错或是没有返回就退出时, 关闭所有子进程并抛出异常
+        """
+        infos, errors = [], []
+        for _index, _pipe in enumerate(self.pipes):
+            try:
+                _status, _data = _pipe.recv()
+            except (EOFError, ConnectionResetError) as e: # 子进程没有返回结果就退出, 例如 libsumo abort
+                self.processes[_index].join(timeout=1)
+                _status, _data = 'error', f'Worker exited without reply (exit code {self.processes[_index].exitcode}, {e!r}).'
+            if _status == 'error':
+                errors.append(f'Worker {_index}:\n{_data}')
+            infos.append(_data)
+        if errors:
+            self.close()
+            raise RuntimeError('SIM: VectorTshubEnv worker failed.\n' + '\n'.join(errors))
+        return infos
+
+    def reset(self) -> Dict[str, Any]:
+        """重置所有的环境, 返回 (num_envs, ...) 的观测
+        """
+        assert not self.waiting_step, 'step_async is still running, call step_wait before reset.'
+        self.__send('reset')
+        self.__receive()
+        return self.__get_observation()
+
+    def step(self, actions:np.ndarray, n_steps:int=1, until_decision:bool=False):
+        """所有环境同时执行动作, 结束的环境会自动 reset
+
+        Args:
+            actions (np.ndarray): 形状为 (num_envs, num_tls) + action_shape, 按照 tls_ids 的顺序
+            n_steps (int, optional): 与 TshubEnvironment.step 相同. Defaults to 1.
+            until_decision (bool, optional): 与 TshubEnvironment.step 相同, 每个环境分别仿真到自己下一次做动作的时间. Defaults to False.
+
+        Returns:
+            obs, rewards (num_envs,), infos (List[Dict]), dones (num_envs,)
+        """
+        self.step_async(actions, n_steps, until_decision)
+        return self.step_wait()
+
+    def step_async(self, actions:np.ndarray, n_steps:int=1, until_decision:bool=False) -> None:
+        """将动作发送给所有的子进程之后立即返回 (参数与 step 相同), 子进程仿真的同时主进程可以处理上一步的观测, 结果通过 step_wait 获得.
+        Note: 子进程会原地更新共享内存中的观测, 上一步的观测需要在 step_async 之前 copy
+        """
+        assert not self.waiting_step, 'step_async is still running, call step_wait first.'
+        self.buffers['actions'][...] = actions
+        _step_kwargs = {'n_steps': n_steps, 'until_decision': until_decision}
+        self.__send('step', _step_kwargs)
+        self.waiting_step = True
+
+    def step_wait(self):
+        """等待所有子进程完成 step_async, 返回 obs, rewards, infos, dones (与 step 相同)
+        """
+        assert self.waiting_step, 'call step_async before step_wait.'
+        self.waiting_step = False
+        infos = self.__receive()
+        return self.__get_observation(), self.buffers['rewards'], infos, self.buffers['dones']
+
+    def close(self) -> None:
+        """关闭所有子进程 (同时关闭 SUMO)
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for _pipe, _process in zip(self.pipes, self.processes):
+            if _process.is_alive():
+                try:
+                    _pipe.send(('close', None))
+                except (BrokenPipeError, EOFError):
+                    pass
+        for _pipe, _process in zip(self.pipes, self.processes):
+            _process.join(timeout=10)
+            if _process.is_alive():
+                _process.terminate()
+            _pipe.close()
+
+    def __enter__(self) -> 'VectorTshubEnv':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if hasattr(self, 'closed'):
+            self.close()
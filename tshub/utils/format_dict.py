@@ -6,6 +6,7 @@ LastEditTime: 2025-03-21 11:21:05
 '''
 import json
 import numpy as np
+from collections.abc import Mapping
 from loguru import logger
 
 def dict_to_str(my_dict) -> str:
@@ -14,6 +15,8 @@ def dict_to_str(my_dict) -> str:
     def convert_to_serializable(obj):
         if isinstance(obj, np.ndarray):
             return obj.tolist()  # 将ndarray转换为列表
+        if isinstance(obj, Mapping):
+            return dict(obj) # 例如 LazyObservation
         raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
     json_str = json.dumps(my_dict, indent=4, default=convert_to_serializable)
@@ -8,4 +8,6 @@ from .v2x_channel import V2XChannel
 from .v2i_channel import V2IChannel
 from .v2v_channel import V2VChannel
 
-from .v2x_utils.snr_to_packetloss import calculate_outage_probability
\ No newline at end of file
+from .v2x_utils.snr_to_packetloss import calculate_outage_probability
+from .v2x_utils.neighbor_index import NeighborIndex
+from .v2x_utils.link_state_table import LinkStateTable
\ No newline at end of file
@@ -9,6 +9,7 @@ import numpy as np
 from loguru import logger
 from typing import List, Tuple
 from .v2x_channel import V2XChannel
+from .v2x_utils.link_state_table import LinkStateTable
 
 class V2IChannel(V2XChannel):
     """
@@ -19,6 +20,9 @@ class V2IChannel(V2XChannel):
         self.BS_position = BS_position # 基站位置 (2D)
         self.v2i_shadowing = np.random.normal(0, self.shadow_std)
         self.distance = None # 记录 position 和 bs 的距离
+        # 批量计算时每一辆车的距离和 shadowing, (N,)
+        self.distance_matrix = None
+        self.shadowing_matrix = None
 
     def get_channels_with_fastfading(
             self, 
@@ -105,4 +109,162 @@ class V2IChannel(V2XChannel):
         shadowing = shadowing_rho*self.v2i_shadowing + \
             np.sqrt(1 - shadowing_rho**2)*np.random.normal(0, self.shadow_std)
         
-        return shadowing
\ No newline at end of file
+        return shadowing
+
+    # ###########################
+    # 批量计算 (所有车辆一次计算)
+    # ###########################
+    def get_channels_with_fastfading_matrix(
+            self, 
+            previous_positions_obj: np.ndarray, 
+            current_positions_obj: np.ndarray,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算 N 辆车到基站的信道衰减, 返回 (N,) 的数组.
+        每一辆车使用两个随机数 (shadowing 和 noise), 与逐个调用 get_snr 的顺序相同.
+        """
+        free_path_loss = self._get_path_loss_matrix(current_positions_obj)
+        random_normal = np.random.normal(0, 1, size=free_path_loss.shape+(2,)) # 每辆车的 (shadowing, noise)
+
+        shadowing = self._get_shadowing_matrix(
+            previous_positions_obj, current_positions_obj,
+            shadowing_noise=self.shadow_std*random_normal[..., 0],
+            shadowing_state=shadowing_state
+        )
+        noise = random_normal[..., 1]
+        return (free_path_loss + shadowing + noise)
+
+    def get_received_power_matrix(
+            self, 
+            previous_positions_obj: np.ndarray, 
+            current_positions_obj: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算接收端的功率, 返回 (N,) 的数组
+        """
+        channels_with_fastfading = self.get_channels_with_fastfading_matrix(
+            previous_positions_obj, current_positions_obj,
+            shadowing_state=shadowing_state
+        )
+
+        noise_figure = self.noise_figure_ms if is_ms_received else self.noise_figure_bs
+        transmit_power = self.power_ms if is_ms_transmit else self.power_bs
+        return transmit_power - channels_with_fastfading - noise_figure
+
+    def get_snr_matrix(
+            self, 
+            previous_positions_obj: np.ndarray, 
+            current_positions_obj: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算 N 辆车与基站之间的 SNR, 固定随机种子时, 结果与逐个调用 get_snr 相同.
+
+        Args:
+            previous_positions_obj (np.ndarray): (N, 2), 车辆上一时刻的位置
+            current_positions_obj (np.ndarray): (N, 2), 车辆当前的位置
+            is_ms_transmit (bool, optional): 是否是 ms 作为发送. Defaults to True.
+            is_ms_received (bool, optional): 是否是 ms 作为接收. Defaults to True.
+            shadowing_state (np.ndarray, optional): (N,), 每一条 link 上一次的 shadowing (例如 self.shadowing_matrix).
+                为 None 时所有 link 使用 self.v2i_shadowing, 与 get_snr 相同. Defaults to None.
+
+        Returns:
+            np.ndarray: (N,) 的 SNR (dB), 本次每条 link 的 shadowing 保存在 self.shadowing_matrix
+        """
+        link_type = V2XChannel.get_link_type(is_ms_transmit, is_ms_received)
+        received_power = self.get_received_power_matrix(
+            previous_positions_obj, current_positions_obj,
+            is_ms_transmit=is_ms_transmit,
+            is_ms_received=is_ms_received,
+            shadowing_state=shadowing_state,
+        )
+        logger.info(f'SIM: Calculate **{link_type}** SNR Matrix, {received_power.shape}.')
+
+        noise_power_dbm = self.sig2_dB_ms if is_ms_transmit else self.sig2_dB_bs
+        return 10*np.log10(V2XChannel.dbm2w(received_power)/V2XChannel.dbm2w(noise_power_dbm))
+
+    def get_snr_link_table(
+            self,
+            link_table: LinkStateTable,
+            vehicle_ids: List[str],
+            current_positions_obj: np.ndarray,
+            bs_id: str = 'BS',
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+        ) -> np.ndarray:
+        """使用 LinkStateTable 计算每一辆车与基站之间的 SNR, shadowing 与这条 link 上一次的 shadowing 相关.
+        link 的 key 为 (vehicle id, bs_id) (V2I) 或 (bs_id, vehicle id) (I2V), 不需要传入上一时刻的位置.
+
+        Args:
+            link_table (LinkStateTable): 保存每一条 link 的状态
+            vehicle_ids (List[str]): (N,), 车辆的 id
+            current_positions_obj (np.ndarray): (N, 2), 车辆当前的位置
+            bs_id (str, optional): 基站的 id. Defaults to 'BS'.
+
+        Returns:
+            np.ndarray: (N,) 的 SNR (dB)
+        """
+        link_type = V2XChannel.get_link_type(is_ms_transmit, is_ms_received)
+        current_positions_obj = np.asarray(current_positions_obj, dtype=np.float64).reshape(-1, 2)
+        links = [(_id, bs_id) if is_ms_transmit else (bs_id, _id) for _id in vehicle_ids]
+        rows, is_new = link_table.get_rows(links)
+        current_distance = np.linalg.norm(current_positions_obj - np.asarray(self.BS_position, dtype=np.float64)[None, :], axis=-1)
+
+        # 初始化新的 link
+        new_rows = rows[is_new]
+        link_table.distance[new_rows] = current_distance[is_new]
+        link_table.shadowing[new_rows] = np.random.normal(0, self.shadow_std, size=len(new_rows))
+
+        free_path_loss = self._get_path_loss_matrix(current_positions_obj)
+        random_normal = np.random.normal(0, 1, size=free_path_loss.shape+(2,)) # 每辆车的 (shadowing, noise)
+        shadowing_rho = np.exp(-1*(np.abs(link_table.distance[rows] - current_distance) / self.decorrelation_distance))
+        shadowing = shadowing_rho*link_table.shadowing[rows] + \
+            np.sqrt(1 - shadowing_rho**2)*(self.shadow_std*random_normal[..., 0])
+        link_table.distance[rows] = current_distance
+        link_table.shadowing[rows] = shadowing
+
+        channels_with_fastfading = free_path_loss + shadowing + random_normal[..., 1]
+        noise_figure = self.noise_figure_ms if is_ms_received else self.noise_figure_bs
+        transmit_power = self.power_ms if is_ms_transmit else self.power_bs
+        received_power = transmit_power - channels_with_fastfading - noise_figure
+        logger.info(f'SIM: Calculate **{link_type}** SNR Matrix, {received_power.shape}.')
+
+        noise_power_dbm = self.sig2_dB_ms if is_ms_transmit else self.sig2_dB_bs
+        return 10*np.log10(V2XChannel.dbm2w(received_power)/V2XChannel.dbm2w(noise_power_dbm))
+
+    def _get_path_loss_matrix(self, current_positions_obj: np.ndarray) -> np.ndarray:
+        """批量计算到基站的路径损耗, 公式与 _get_path_loss 相同
+        """
+        current_positions_obj = np.asarray(current_positions_obj, dtype=np.float64)
+        self.distance_matrix = np.sqrt(
+            (current_positions_obj[:, 0] - self.BS_position[0])**2 + 
+            (current_positions_obj[:, 1] - self.BS_position[1])**2 + 
+            (self.h_bs - self.h_ms)**2 # 基站高度 - 车辆高度
+        ) # 距离 m
+
+        return 20*np.log10(self.distance_matrix) + 20*np.log10(self.fc*1e9) - 147.5582278139513 - self.antrenna_gain_bs - self.antrenna_gain_ms
+
+    def _get_shadowing_matrix(
+            self, 
+            previous_positions_obj: np.ndarray, 
+            current_positions_obj: np.ndarray,
+            shadowing_noise: np.ndarray,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算每一辆车的 shadowing, 并保存在 self.shadowing_matrix
+        """
+        bs_position = np.asarray(self.BS_position, dtype=np.float64)[None, :]
+        delta_distance = np.abs(
+            V2XChannel.calculate_distance_matrix(previous_positions_obj, bs_position)[:, 0] - \
+            V2XChannel.calculate_distance_matrix(current_positions_obj, bs_position)[:, 0]
+        )
+        previous_shadowing = self.v2i_shadowing if shadowing_state is None else shadowing_state
+
+        shadowing_rho = np.exp(-1*(delta_distance / self.decorrelation_distance))
+        self.shadowing_matrix = shadowing_rho*previous_shadowing + \
+            np.sqrt(1 - shadowing_rho**2)*shadowing_noise
+        
+        return self.shadowing_matrix
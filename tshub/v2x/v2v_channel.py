@@ -10,6 +10,7 @@ from loguru import logger
 from typing import List, Tuple
 
 from .v2x_channel import V2XChannel
+from .v2x_utils.link_state_table import LinkStateTable
 
 class V2VChannel(V2XChannel):
     """
@@ -22,6 +23,9 @@ class V2VChannel(V2XChannel):
         )
         self.v2v_shadowing = np.random.normal(0, self.shadow_std)
         self.distance = None
+        # 批量计算时每一条 link 的距离和 shadowing, (N, M)
+        self.distance_matrix = None
+        self.shadowing_matrix = None
 
     def get_channels_with_fastfading(
             self, 
@@ -161,4 +165,287 @@ class V2VChannel(V2XChannel):
         shadowing = shadowing_rho*self.v2v_shadowing + \
             np.sqrt(1 - shadowing_rho**2)*np.random.normal(0, self.shadow_std)
         
-        return shadowing
\ No newline at end of file
+        return shadowing
+
+    # ###########################
+    # 批量计算 (所有 link 一次计算)
+    # ###########################
+    def get_channels_with_fastfading_matrix(
+            self,
+            # 车辆 A 的位置, (N, 2)
+            previous_positions_A: np.ndarray, 
+            current_positions_A: np.ndarray,
+            # 车辆 B 的位置, (M, 2)
+            previous_positions_B: np.ndarray, 
+            current_positions_B: np.ndarray,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算 A 中每一辆车到 B 中每一辆车的信道衰减, 返回 (N, M) 的矩阵.
+        每一条 link 使用两个随机数 (shadowing 和 noise), 按照 (A_i, B_j) 的顺序生成, 与逐个调用 get_snr 的顺序相同.
+        """
+        return self._get_channels_with_fastfading_array(
+            *V2VChannel._expand_pairs(
+                previous_positions_A, current_positions_A,
+                previous_positions_B, current_positions_B
+            ),
+            shadowing_state=shadowing_state
+        )
+
+    def get_received_power_matrix(
+            self,
+            previous_positions_A: np.ndarray, 
+            current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, 
+            current_positions_B: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算接收端的功率, 返回 (N, M) 的矩阵
+        """
+        return self._get_received_power_array(
+            *V2VChannel._expand_pairs(
+                previous_positions_A, current_positions_A,
+                previous_positions_B, current_positions_B
+            ),
+            is_ms_transmit=is_ms_transmit,
+            is_ms_received=is_ms_received,
+            shadowing_state=shadowing_state
+        )
+
+    def get_snr_matrix(
+            self,
+            previous_positions_A: np.ndarray, 
+            current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, 
+            current_positions_B: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算 A 中每一辆车 (N 辆) 到 B 中每一辆车 (M 辆) 的 SNR, 返回 (N, M) 的矩阵.
+        固定随机种子时, 结果与按照 row-major 的顺序逐个调用 get_snr 相同.
+
+        Args:
+            previous_positions_A (np.ndarray): (N, 2), A 中车辆上一时刻的位置
+            current_positions_A (np.ndarray): (N, 2), A 中车辆当前的位置
+            previous_positions_B (np.ndarray): (M, 2), B 中车辆上一时刻的位置
+            current_positions_B (np.ndarray): (M, 2), B 中车辆当前的位置
+            is_ms_transmit (bool, optional): 是否是 ms 作为发送. Defaults to True.
+            is_ms_received (bool, optional): 是否是 ms 作为接收. Defaults to True.
+            shadowing_state (np.ndarray, optional): (N, M), 每一条 link 上一次的 shadowing (例如 self.shadowing_matrix). 
+                为 None 时所有 link 使用 self.v2v_shadowing, 与 get_snr 相同. Defaults to None.
+
+        Returns:
+            np.ndarray: (N, M) 的 SNR (dB), 本次每条 link 的 shadowing 保存在 self.shadowing_matrix
+        """
+        return self._get_snr_array(
+            *V2VChannel._expand_pairs(
+                previous_positions_A, current_positions_A,
+                previous_positions_B, current_positions_B
+            ),
+            is_ms_transmit=is_ms_transmit,
+            is_ms_received=is_ms_received,
+            shadowing_state=shadowing_state
+        )
+
+    def get_snr_links(
+            self,
+            previous_positions_A: np.ndarray, 
+            current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, 
+            current_positions_B: np.ndarray,
+            links: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """只计算指定 link 的 SNR, 通信范围之外的 link 不需要计算 (links 可以由 NeighborIndex 得到).
+        与 get_snr_matrix 的结果中对应的元素相同 (随机数按照 links 的顺序生成).
+
+        Args:
+            previous_positions_A ~ current_positions_B: 与 get_snr_matrix 相同, (N, 2) 与 (M, 2)
+            links (np.ndarray): (K, 2), 每一行是 (A 中的 index, B 中的 index)
+            shadowing_state (np.ndarray, optional): (K,), 每一条 link 上一次的 shadowing. Defaults to None.
+
+        Returns:
+            np.ndarray: (K,) 的 SNR (dB)
+        """
+        links = np.asarray(links, dtype=np.int64).reshape(-1, 2)
+        index_A, index_B = links[:, 0], links[:, 1]
+        return self._get_snr_array(
+            np.asarray(previous_positions_A, dtype=np.float64)[index_A],
+            np.asarray(current_positions_A, dtype=np.float64)[index_A],
+            np.asarray(previous_positions_B, dtype=np.float64)[index_B],
+            np.asarray(current_positions_B, dtype=np.float64)[index_B],
+            is_ms_transmit=is_ms_transmit,
+            is_ms_received=is_ms_received,
+            shadowing_state=shadowing_state
+        )
+
+    def get_snr_link_table(
+            self,
+            link_table: LinkStateTable,
+            links: List[Tuple[str, str]],
+            current_positions_tx: np.ndarray,
+            current_positions_rx: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+        ) -> np.ndarray:
+        """使用 LinkStateTable 计算每一条 link 的 SNR. 每一条 link 的 shadowing 与这条 link 上一次的 shadowing 相关,
+        delta distance 使用 link_table 中保存的上一次的距离, 因此不需要传入上一时刻的位置. 
+        新的 link 的 shadowing 初始化为 N(0, shadow_std), 所有 link 的状态使用一次 NumPy 赋值更新.
+
+        Args:
+            link_table (LinkStateTable): 保存每一条 link 的状态
+            links (List[Tuple[str, str]]): (K,), 每一条 link 的 (tx id, rx id)
+            current_positions_tx (np.ndarray): (K, 2), 每一条 link 发送端当前的位置
+            current_positions_rx (np.ndarray): (K, 2), 每一条 link 接收端当前的位置
+
+        Returns:
+            np.ndarray: (K,) 的 SNR (dB)
+        """
+        current_positions_tx = np.asarray(current_positions_tx, dtype=np.float64).reshape(-1, 2)
+        current_positions_rx = np.asarray(current_positions_rx, dtype=np.float64).reshape(-1, 2)
+        rows, is_new = link_table.get_rows(links)
+        current_distance = np.linalg.norm(current_positions_tx - current_positions_rx, axis=-1)
+
+        # 初始化新的 link
+        new_rows = rows[is_new]
+        link_table.distance[new_rows] = current_distance[is_new]
+        link_table.shadowing[new_rows] = np.random.normal(0, self.shadow_std, size=len(new_rows))
+
+        free_path_loss = self._get_path_loss_array(current_positions_tx, current_positions_rx)
+        random_normal = np.random.normal(0, 1, size=free_path_loss.shape+(2,)) # 每条 link 的 (shadowing, noise)
+        shadowing = self._correlate_shadowing(
+            delta_distance=np.abs(link_table.distance[rows] - current_distance),
+            shadowing_noise=self.shadow_std*random_normal[..., 0],
+            previous_shadowing=link_table.shadowing[rows]
+        )
+        link_table.distance[rows] = current_distance
+        link_table.shadowing[rows] = shadowing
+
+        channels_with_fastfading = free_path_loss + shadowing + random_normal[..., 1]
+        return self._channels_to_snr(channels_with_fastfading, is_ms_transmit, is_ms_received)
+
+    @staticmethod
+    def _expand_pairs(
+            previous_positions_A: np.ndarray, current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, current_positions_B: np.ndarray,
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """将 A 扩展为 (N, 1, 2), B 扩展为 (1, M, 2), 计算时广播为所有的 (A_i, B_j)
+        """
+        _expand_A = lambda positions: np.asarray(positions, dtype=np.float64)[:, None, :]
+        _expand_B = lambda positions: np.asarray(positions, dtype=np.float64)[None, :, :]
+        return (
+            _expand_A(previous_positions_A), _expand_A(current_positions_A),
+            _expand_B(previous_positions_B), _expand_B(current_positions_B)
+        )
+
+    def _get_snr_array(
+            self,
+            previous_positions_A: np.ndarray, current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, current_positions_B: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """A 与 B 的位置可以广播 (..., 2), 返回广播之后形状的 SNR
+        """
+        channels_with_fastfading = self._get_channels_with_fastfading_array(
+            previous_positions_A, current_positions_A,
+            previous_positions_B, current_positions_B,
+            shadowing_state=shadowing_state
+        )
+        return self._channels_to_snr(channels_with_fastfading, is_ms_transmit, is_ms_received)
+
+    def _get_received_power_array(
+            self,
+            previous_positions_A: np.ndarray, current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, current_positions_B: np.ndarray,
+            is_ms_transmit:bool = True,
+            is_ms_received:bool = True,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        channels_with_fastfading = self._get_channels_with_fastfading_array(
+            previous_positions_A, current_positions_A,
+            previous_positions_B, current_positions_B,
+            shadowing_state=shadowing_state
+        )
+        return self._channels_to_received_power(channels_with_fastfading, is_ms_transmit, is_ms_received)
+
+    def _channels_to_received_power(self, channels_with_fastfading:np.ndarray, is_ms_transmit:bool, is_ms_received:bool) -> np.ndarray:
+        noise_figure = self.noise_figure_ms if is_ms_received else self.noise_figure_bs
+        transmit_power = self.power_ms if is_ms_transmit else self.power_bs
+        return transmit_power - channels_with_fastfading - noise_figure
+
+    def _channels_to_snr(self, channels_with_fastfading:np.ndarray, is_ms_transmit:bool, is_ms_received:bool) -> np.ndarray:
+        link_type = V2XChannel.get_link_type(is_ms_transmit, is_ms_received)
+        received_power = self._channels_to_received_power(channels_with_fastfading, is_ms_transmit, is_ms_received)
+        logger.info(f'SIM: Calculate **{link_type}** SNR Matrix, {received_power.shape}.')
+
+        noise_power_dbm = self.sig2_dB_ms if is_ms_transmit else self.sig2_dB_bs
+        return 10*np.log10(V2XChannel.dbm2w(received_power)/V2XChannel.dbm2w(noise_power_dbm))
+
+    def _get_channels_with_fastfading_array(
+            self,
+            previous_positions_A: np.ndarray, current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, current_positions_B: np.ndarray,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        free_path_loss = self._get_path_loss_array(current_positions_A, current_positions_B)
+        random_normal = np.random.normal(0, 1, size=free_path_loss.shape+(2,)) # 每条 link 的 (shadowing, noise)
+
+        shadowing = self._get_shadowing_array(
+            previous_positions_A, current_positions_A,
+            previous_positions_B, current_positions_B,
+            shadowing_noise=self.shadow_std*random_normal[..., 0],
+            shadowing_state=shadowing_state
+        )
+        noise = random_normal[..., 1]
+        return (free_path_loss + shadowing + noise)
+
+    def _get_path_loss_array(self, positions_A:np.ndarray, positions_B:np.ndarray) -> np.ndarray:
+        """批量计算路径损耗, 公式与 _get_path_loss 相同 (距离小于 100m 为 LOS, 否则为 NLOS)
+        """
+        self.distance_matrix = np.hypot(
+            positions_A[..., 0] - positions_B[..., 0],
+            positions_A[..., 1] - positions_B[..., 1]
+        ) + 0.001 # 每一条 link 的距离
+
+        light_speed = 3e8  # Speed of light in vacuum (m/s)
+        n_los = 3.0  # Path loss exponent for NLOS
+        n_los_factor = 20  # Additional NLOS factor in dB
+
+        log_distance = np.log10(self.distance_matrix)
+        pl_los = 20*log_distance + 20*math.log10(self.fc*1e9) + 20 * math.log10(4*math.pi/light_speed) - 2*self.antrenna_gain_bs
+        pl_nlos = pl_los + n_los_factor + 10*n_los*log_distance
+        return np.where(self.distance_matrix < 100, pl_los, pl_nlos)
+
+    def _get_shadowing_array(
+            self,
+            previous_positions_A: np.ndarray, current_positions_A: np.ndarray,
+            previous_positions_B: np.ndarray, current_positions_B: np.ndarray,
+            shadowing_noise: np.ndarray,
+            shadowing_state: np.ndarray = None,
+        ) -> np.ndarray:
+        """批量计算每一条 link 的 shadowing, 并保存在 self.shadowing_matrix
+
+        Args:
+            shadowing_noise (np.ndarray): 每一条 link 的随机项 (均值为 0, 标准差为 shadow_std)
+            shadowing_state (np.ndarray, optional): 每一条 link 上一次的 shadowing. Defaults to None.
+        """
+        delta_distance = np.abs(
+            np.linalg.norm(previous_positions_A - previous_positions_B, axis=-1) - \
+            np.linalg.norm(current_positions_A - current_positions_B, axis=-1)
+        )
+        previous_shadowing = self.v2v_shadowing if shadowing_state is None else shadowing_state
+        self.shadowing_matrix = self._correlate_shadowing(delta_distance, shadowing_noise, previous_shadowing)
+        return self.shadowing_matrix
+
+    def _correlate_shadowing(self, delta_distance:np.ndarray, shadowing_noise:np.ndarray, previous_shadowing:np.ndarray) -> np.ndarray:
+        """相关的 shadowing (AR(1)): S_2 = rho * S_1 + sqrt(1 - rho^2) * sigma * Z, rho = exp(-|delta d| / d_corr)
+        """
+        shadowing_rho = np.exp(-1*(delta_distance / self.decorrelation_distance))
+        return shadowing_rho*previous_shadowing + \
+            np.sqrt(1 - shadowing_rho**2)*shadowing_noise
@@ -56,4 +56,33 @@ class V2XChannel(ABC):
         Returns:
         float: The Euclidean distance between the two points.
         """
-        return np.linalg.norm(np.array(coord1) - np.array(coord2))
\ No newline at end of file
+        return np.linalg.norm(np.array(coord1) - np.array(coord2))
+
+    @staticmethod
+    def calculate_distance_matrix(coords1, coords2) -> np.ndarray:
+        """
+        Calculate the pairwise Euclidean distances between two groups of points.
+
+        Parameters:
+        coords1 (array-like): (N, D) coordinates of the first group of points.
+        coords2 (array-like): (M, D) coordinates of the second group of points.
+
+        Returns:
+        np.ndarray: (N, M) distances, element (i, j) is the distance between coords1[i] and coords2[j].
+        """
+        coords1 = np.asarray(coords1, dtype=np.float64)
+        coords2 = np.asarray(coords2, dtype=np.float64)
+        return np.linalg.norm(coords1[:, None, :] - coords2[None, :, :], axis=-1)
+
+    @staticmethod
+    def get_link_type(is_ms_transmit:bool, is_ms_received:bool) -> str:
+        """根据发送端和接收端的类型, 返回通信的类型 (V2V, V2I, I2V)
+        """
+        if is_ms_transmit and is_ms_received:
+            return 'V2V'
+        elif is_ms_transmit and not is_ms_received:
+            return 'V2I'
+        elif not is_ms_transmit and is_ms_received:
+            return 'I2V'
+        else:
+            raise ValueError("Invalid combination of transmission and reception for SNR calculation.")
\ No newline at end of file
@@ -0,0 +1,117 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 16:48:15
+@Description: 保存每一条 link (tx, rx) 的状态, 用于计算在时间上相关的 shadowing
+- 每一条 link 占用数组中的一行 (row), 保存上一次的距离和 shadowing
+- 不需要每次传入上一时刻的位置, 使用上一次保存的距离计算 delta distance
+- 发送端或接收端离开仿真之后, 对应的 link 会被删除, row 会被回收
+LastEditTime: 2026-10-18 16:48:15
+'''
+import heapq
+import numpy as np
+from loguru import logger
+from collections import defaultdict
+from typing import Dict, List, Tuple, Set, Iterable
+
+
+class LinkStateTable:
+    def __init__(self, capacity:int=1024) -> None:
+        self.capacity = capacity # 当前数组的大小, 不够的时候自动扩容
+        self.num_rows = 0 # 已经使用过的最大 row
+        self.id2row: Dict[Tuple[str, str], int] = {} # (tx, rx) -> row
+        self.free_rows: List[int] = [] # 空闲的 row (小根堆)
+        self.endpoint2rows: Dict[str, Set[int]] = defaultdict(set) # tx 或 rx -> 包含这个物体的 link 的 row
+
+        self.links: List[Tuple[str, str]] = [None] * capacity # row -> (tx, rx)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.distance = np.zeros(capacity, dtype=np.float64) # 上一次 tx 与 rx 之间的距离
+        self.shadowing = np.zeros(capacity, dtype=np.float64) # 上一次的 shadowing
+
+    def __len__(self) -> int:
+        return len(self.id2row)
+
+    def __contains__(self, link:Tuple[str, str]) -> bool:
+        return link in self.id2row
+
+    def _grow(self) -> None:
+        """容量不够的时候, 将所有数组扩大一倍
+        """
+        new_capacity = self.capacity * 2
+        logger.debug(f'SIM: Link State Table Grow {self.capacity} -> {new_capacity}.')
+        pad = new_capacity - self.capacity
+        self.links.extend([None] * pad)
+        self.valid = np.concatenate([self.valid, np.zeros(pad, dtype=bool)])
+        self.distance = np.concatenate([self.distance, np.zeros(pad, dtype=np.float64)])
+        self.shadowing = np.concatenate([self.shadowing, np.zeros(pad, dtype=np.float64)])
+        self.capacity = new_capacity
+
+    def _add(self, link:Tuple[str, str]) -> int:
+        if self.free_rows:
+            row = heapq.heappop(self.free_rows)
+        else:
+            if self.num_rows == self.capacity:
+                self._grow()
+            row = self.num_rows
+            self.num_rows += 1
+        self.id2row[link] = row
+        self.links[row] = link
+        self.valid[row] = True
+        for _endpoint in link:
+            self.endpoint2rows[_endpoint].add(row)
+        return row
+
+    def _remove_row(self, row:int) -> None:
+        link = self.links[row]
+        del self.id2row[link]
+        self.links[row] = None
+        self.valid[row] = False
+        self.distance[row] = 0
+        self.shadowing[row] = 0
+        heapq.heappush(self.free_rows, row)
+
+    def get_rows(self, links:Iterable[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """返回每一条 link 所在的 row, 新的 link 会分配新的 row
+
+        Args:
+            links (Iterable[Tuple[str, str]]): 每一条 link 的 (tx, rx)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (rows, is_new), 新的 link 需要初始化 distance 和 shadowing
+        """
+        rows, is_new = [], []
+        for _link in links:
+            _row = self.id2row.get(_link, None)
+            is_new.append(_row is None)
+            rows.append(self._add(_link) if _row is None else _row)
+        return np.asarray(rows, dtype=np.int64), np.asarray(is_new, dtype=bool)
+
+    def remove_endpoints(self, endpoint_ids:Iterable[str]) -> int:
+        """删除包含这些物体 (作为 tx 或 rx) 的所有 link
+
+        Returns:
+            int: 删除的 link 的数量
+        """
+        num_removed = 0
+        for _endpoint in endpoint_ids:
+            for _row in self.endpoint2rows.pop(_endpoint, ()):
+                if not self.valid[_row]: # 已经通过另一端删除
+                    continue
+                _other = [_id for _id in self.links[_row] if _id != _endpoint]
+                for _other_id in _other: # 另一端不再记录这条 link
+                    self.endpoint2rows[_other_id].discard(_row)
+                self._remove_row(_row)
+                num_removed += 1
+        return num_removed
+
+    def evict(self, active_ids:Iterable[str]) -> int:
+        """删除发送端或接收端已经离开仿真的 link (例如 active_ids 为当前路网中所有车辆和 RSU 的 id)
+
+        Returns:
+            int: 删除的 link 的数量
+        """
+        active_ids = set(active_ids)
+        departed_ids = [_id for _id in self.endpoint2rows if _id not in active_ids]
+        num_removed = self.remove_endpoints(departed_ids)
+        if num_removed:
+            logger.debug(f'SIM: Link State Table Evict {num_removed} links, {len(self)} links left.')
+        return num_removed
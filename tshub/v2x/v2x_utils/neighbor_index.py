@@ -0,0 +1,92 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 16:02:37
+@Description: 车辆 (或 RSU, 飞行器) 的空间索引, 用于查找通信范围内的邻居
+- 使用 KD-Tree 保存所有物体的 2D 位置, 每一步使用车辆的位置重新构建 (O(N logN))
+- 查找通信范围内的 link, 范围之外的 link 不需要计算 path loss, V2V 从 O(N^2) 减少为 O(N·k)
+LastEditTime: 2026-10-18 16:02:37
+'''
+import numpy as np
+from loguru import logger
+from scipy.spatial import cKDTree
+from typing import Dict, List, Any, Iterable
+
+
+class NeighborIndex:
+    def __init__(self, ids:Iterable[str]=None, positions:np.ndarray=None) -> None:
+        self.ids: List[str] = []
+        self.id2index: Dict[str, int] = {}
+        self.positions = np.zeros((0, 2), dtype=np.float64)
+        self.tree: cKDTree = None
+        if ids is not None:
+            self.update(ids, positions)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, object_id:str) -> bool:
+        return object_id in self.id2index
+
+    def update(self, ids:Iterable[str], positions:np.ndarray) -> None:
+        """使用物体最新的位置重新构建索引
+
+        Args:
+            ids (Iterable[str]): 物体的 id
+            positions (np.ndarray): (N, 2) 或 (N, 3) 的位置, 只使用 (x, y). 没有物体的时候可以为 None 或空数组
+        """
+        self.ids = list(ids)
+        self.id2index = {_id: _index for _index, _id in enumerate(self.ids)}
+        if len(self.ids) == 0: # 没有物体的时候 reshape(0, -1) 无法推断列数
+            self.positions = np.zeros((0, 2), dtype=np.float64)
+        else:
+            self.positions = np.asarray(positions, dtype=np.float64).reshape(len(self.ids), -1)[:, :2]
+        self.tree = cKDTree(self.positions) if len(self.ids) > 0 else None
+        logger.debug(f'SIM: Neighbor Index, {len(self.ids)} objects.')
+
+    def update_from_vehicle_infos(self, vehicle_infos:Dict[str, Any]) -> None:
+        """使用 VehicleBuilder.get_objects_infos 的结果更新索引, 支持 dict 和列式 (columnar) 两种格式
+        """
+        if isinstance(vehicle_infos.get('valid', None), np.ndarray): # 列式存储, 只使用有车辆的 row
+            rows = np.flatnonzero(vehicle_infos['valid'])
+            ids = [vehicle_infos['ids'][_row] for _row in rows]
+            positions = vehicle_infos['position'][rows]
+        else:
+            ids = list(vehicle_infos.keys())
+            positions = [_vehicle_info['position'] for _vehicle_info in vehicle_infos.values()]
+        self.update(ids, np.asarray(positions, dtype=np.float64).reshape(len(ids), 2))
+
+    def query_radius_indices(self, position:Iterable[float], radius:float) -> np.ndarray:
+        """返回与 position 距离不超过 radius 的物体的 index (从小到大排序)
+        """
+        if self.tree is None:
+            return np.zeros(0, dtype=np.int64)
+        indices = self.tree.query_ball_point(np.asarray(position, dtype=np.float64)[:2], r=radius)
+        return np.sort(np.asarray(indices, dtype=np.int64))
+
+    def query_radius(self, position:Iterable[float], radius:float) -> List[str]:
+        """返回与 position 距离不超过 radius 的物体的 id (例如基站或飞行器覆盖范围内的车辆)
+        """
+        return [self.ids[_index] for _index in self.query_radius_indices(position, radius)]
+
+    def query_pairs(self, radius:float) -> np.ndarray:
+        """返回索引内距离不超过 radius 的所有物体对 (例如 V2V 的 link)
+
+        Returns:
+            np.ndarray: (K, 2), 每一行是 (i, j), 且 i < j, 按照 (i, j) 排序
+        """
+        if self.tree is None:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = self.tree.query_pairs(r=radius, output_type='ndarray').astype(np.int64)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def query_links(self, other:'NeighborIndex', radius:float) -> np.ndarray:
+        """返回本索引与另一个索引之间, 距离不超过 radius 的所有 link (例如车辆与 RSU)
+
+        Returns:
+            np.ndarray: (K, 2), 每一行是 (本索引中的 index, other 中的 index), 按照 (i, j) 排序
+        """
+        if (self.tree is None) or (other.tree is None):
+            return np.zeros((0, 2), dtype=np.int64)
+        neighbors = self.tree.query_ball_tree(other.tree, r=radius)
+        links = [(_i, _j) for _i, _js in enumerate(neighbors) for _j in sorted(_js)]
+        return np.asarray(links, dtype=np.int64).reshape(-1, 2)
@@ -11,15 +11,15 @@ def calculate_outage_probability(snr_db, bandwidth_hz=30e3, target_rate_bps=20e3
     Calculate the outage probability in a Rayleigh fading channel.
 
     Parameters:
-    snr_db (float): The signal-to-noise ratio in decibels (dB).
+    snr_db (float or array-like): The signal-to-noise ratio in decibels (dB), 可以是 SNR 矩阵.
     bandwidth_hz (float): The channel bandwidth in Hertz (default is 30kHz).
     target_rate_bps (float): The target rate in bits per second (default is 20kb/s).
 
     Returns:
-    float: The calculated outage probability.
+    float or np.ndarray: The calculated outage probability, 与 snr_db 的形状相同.
     """
     # Convert SNR from dB to linear scale
-    snr_linear = 10 ** (snr_db / 10)
+    snr_linear = 10 ** (np.asarray(snr_db, dtype=np.float64) / 10)
     
     # Calculate the threshold u based on the target rate and SNR
     u_threshold = (2 ** (target_rate_bps / bandwidth_hz) - 1) / snr_linear
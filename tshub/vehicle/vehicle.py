@@ -17,6 +17,46 @@ from .vehicle_type import (
     LaneWithContinuousSpeedAction,
 )
 
+# 每一个特征对应的订阅变量 (顺序与订阅时的顺序一致)
+VEHICLE_FEATURE_VARIABLES = {
+    'vehicle_type': traci.constants.VAR_TYPE,
+    'position': traci.constants.VAR_POSITION, 'speed': traci.constants.VAR_SPEED,
+    'road_id': traci.constants.VAR_ROAD_ID, 'lane_id': traci.constants.VAR_LANE_ID,
+    'edges': traci.constants.VAR_EDGES, 'lane_index': traci.constants.VAR_LANE_INDEX,
+    'lane_position': traci.constants.VAR_LANEPOSITION,
+    'waiting_time': traci.constants.VAR_WAITING_TIME, 'next_tls': traci.constants.VAR_NEXT_TLS,
+    'accumulated_waiting_time': traci.constants.VAR_ACCUMULATED_WAITING_TIME, 
+    'distance': traci.constants.VAR_DISTANCE, 'heading': traci.constants.VAR_ANGLE,
+    'co2_emission': traci.constants.VAR_CO2EMISSION, 'fuel_consumption': traci.constants.VAR_FUELCONSUMPTION,
+    'speed_without_traci': traci.constants.VAR_SPEED_WITHOUT_TRACI,
+}
+# 每一辆车需要订阅的信息 (所有的特征)
+VEHICLE_SUBSCRIPTION_VARIABLES = list(VEHICLE_FEATURE_VARIABLES.values())
+# 车辆控制时需要使用的特征, 即使没有选择也需要订阅
+VEHICLE_CONTROL_FEATURES = ('speed', 'lane_index', 'road_id')
+# 订阅结果中每一个特征对应的 index
+VEHICLE_FEATURE_INDEX = {
+    'position': 66,
+    'speed': 64,
+    'road_id': 80,
+    'lane_id': 81,
+    'lane_index': 82,
+    'lane_position': 86,
+    'edges': 84,
+    'waiting_time': 122,
+    'next_tls': 112,
+    'accumulated_waiting_time': 135,
+    'distance': 132,
+    'heading': 67,
+    'co2_emission': 96,
+    'fuel_consumption': 101,
+    'speed_without_traci': 177,
+    'leader': 104,
+    'vehicle_type': 79,
+    'length': 68,
+    'width': 77,
+}
+
 @dataclass
 class VehicleInfo:
     """
@@ -44,6 +84,8 @@ class VehicleInfo:
     leader: Tuple[str, float] # 车辆的前车信息, (vehicle_id, distance)
     next_tls: List[str]  # The IDs of the next traffic lights the vehicle will encounter
     sumo: traci.connection.Connection
+    subscription_mode: str = 'vehicle' # vehicle: 每辆车单独订阅; context: 所有车辆通过 simulation context 一起订阅
+    features: Tuple[str] = None # 需要输出的特征, None 表示输出所有的特征
 
     def __post_init__(self) -> None:
         _action = vehicle_action_type(self.action_type)
@@ -54,23 +96,11 @@ class VehicleInfo:
         elif _action == vehicle_action_type.LaneWithContinuousSpeed:
             self.vehicle_action = LaneWithContinuousSpeedAction(id=self.id, vehicle_type=self.vehicle_type, sumo=self.sumo)
 
-        # 订阅车辆
-        self.sumo.vehicle.subscribe(
-                self.id,
-                [
-                    traci.constants.VAR_TYPE,
-                    traci.constants.VAR_POSITION, traci.constants.VAR_SPEED,
-                    traci.constants.VAR_ROAD_ID, traci.constants.VAR_LANE_ID,
-                    traci.constants.VAR_EDGES, traci.constants.VAR_LANE_INDEX,
-                    traci.constants.VAR_LANEPOSITION,
-                    traci.constants.VAR_WAITING_TIME, traci.constants.VAR_NEXT_TLS,
-                    traci.constants.VAR_ACCUMULATED_WAITING_TIME, 
-                    traci.constants.VAR_DISTANCE, traci.constants.VAR_ANGLE,
-                    traci.constants.VAR_CO2EMISSION, traci.constants.VAR_FUELCONSUMPTION,
-                    traci.constants.VAR_SPEED_WITHOUT_TRACI
-                ]
-            )
-        self.sumo.vehicle.subscribeLeader(self.id, dist=0) # vehicle id together with the distance
+        # 订阅车辆, context 模式下由 VehicleBuilder 统一订阅所有车辆, 这里只需要订阅前车
+        if self.subscription_mode == 'vehicle':
+            self.sumo.vehicle.subscribe(self.id, VehicleInfo.get_subscription_variables(self.features))
+        if (self.features is None) or ('leader' in self.features):
+            self.sumo.vehicle.subscribeLeader(self.id, dist=0) # vehicle id together with the distance
 
     @classmethod
     def create_vehicle(cls, id: str, action_type:str, vehicle_type:str,
@@ -83,9 +113,11 @@ class VehicleInfo:
                        co2_emission: float, fuel_consumption: float,
                        distance:float, speed_without_traci: float,
                        leader: Tuple[str, float],
-                       next_tls: List[str]
+                       next_tls: List[str],
+                       subscription_mode: str = 'vehicle',
+                       features: Tuple[str] = None
                     ):
-        logger.info(f'SIM: Init Vehicle: {vehicle_type}: {id}')
+        logger.info('SIM: Init Vehicle: {}: {}', vehicle_type, id)
         return cls(id=id, action_type=action_type, vehicle_type=vehicle_type,
                    length=length, width=width, heading=heading,
                    sumo=sumo, position=position, speed=speed,   
@@ -95,7 +127,8 @@ class VehicleInfo:
                    co2_emission=co2_emission, fuel_consumption=fuel_consumption,
                    speed_without_traci=speed_without_traci,
                    distance=distance, leader=leader,
-                   next_tls=next_tls
+                   next_tls=next_tls, subscription_mode=subscription_mode,
+                   features=features
         )
 
     @staticmethod
@@ -107,53 +140,53 @@ class VehicleInfo:
         Returns:
             The index of the feature.
         """
-        feature_mapping = {
-            'position': 66,
-            'speed': 64,
-            'road_id': 80,
-            'lane_id': 81,
-            'lane_index': 82,
-            'lane_position': 86,
-            'edges': 84,
-            'waiting_time': 122,
-            'next_tls': 112,
-            'accumulated_waiting_time': 135,
-            'distance': 132,
-            'heading': 67,
-            'co2_emission': 96,
-            'fuel_consumption': 101,
-            'speed_without_traci': 177,
-            'leader': 104,
-            'vehicle_type': 79,
-        }
-        return feature_mapping.get(feature, -1)
+        return VEHICLE_FEATURE_INDEX.get(feature, -1)
     
+    @staticmethod
+    def get_subscription_variables(features:Tuple[str]=None, extra_features:Tuple[str]=()) -> List[int]:
+        """根据选择的特征, 得到需要订阅的变量. 控制车辆需要的特征总是会被订阅.
+
+        Args:
+            features (Tuple[str], optional): 选择的特征, None 表示所有的特征. Defaults to None.
+            extra_features (Tuple[str], optional): 额外需要订阅的特征. Defaults to ().
+        """
+        if features is None:
+            return VEHICLE_SUBSCRIPTION_VARIABLES
+        required_features = set(features) | set(VEHICLE_CONTROL_FEATURES) | set(extra_features)
+        return [
+            _variable for _feature, _variable in VEHICLE_FEATURE_VARIABLES.items()
+            if _feature in required_features
+        ]
+
+    @staticmethod
+    def check_features(features:List[str]=None) -> Tuple[str]:
+        """检查选择的特征是否都是 VehicleInfo 的特征
+        """
+        if features is None:
+            return None
+        unknown_features = [_feature for _feature in features if _feature not in VEHICLE_FEATURES]
+        if unknown_features:
+            raise ValueError(f'Unknown vehicle features {unknown_features}, should be in {VEHICLE_FEATURES}.')
+        return tuple(features)
+
     def update_features(self, vehicle_info:Dict[int, Any]) -> None:
-        self.position=vehicle_info.get(VehicleInfo.get_feature_index('position'), None)
-        self.heading=vehicle_info.get(VehicleInfo.get_feature_index('heading'), None)
-        self.speed=vehicle_info.get(VehicleInfo.get_feature_index('speed'), None)
-        self.road_id=vehicle_info.get(VehicleInfo.get_feature_index('road_id'), None)
-        self.lane_id=vehicle_info.get(VehicleInfo.get_feature_index('lane_id'), None)
-        self.lane_position=vehicle_info.get(VehicleInfo.get_feature_index('lane_position'), None)
-        self.lane_index=vehicle_info.get(VehicleInfo.get_feature_index('lane_index'), None)
-        self.edges=vehicle_info.get(VehicleInfo.get_feature_index('edges'), None)
-        self.waiting_time=vehicle_info.get(VehicleInfo.get_feature_index('waiting_time'), None)
-        self.accumulated_waiting_time=vehicle_info.get(VehicleInfo.get_feature_index('accumulated_waiting_time'), None)
-        self.distance=vehicle_info.get(VehicleInfo.get_feature_index('distance'), None)
-        self.leader=vehicle_info.get(VehicleInfo.get_feature_index('leader'), None)
-        self.next_tls=vehicle_info.get(VehicleInfo.get_feature_index('next_tls'), None)
-        self.co2_emission=vehicle_info.get(VehicleInfo.get_feature_index('co2_emission'), None)
-        self.fuel_consumption=vehicle_info.get(VehicleInfo.get_feature_index('fuel_consumption'), None)
-        self.speed_without_traci=vehicle_info.get(VehicleInfo.get_feature_index('speed_without_traci'), None)
-        self.vehicle_type=vehicle_info.get(VehicleInfo.get_feature_index('vehicle_type'), None)
-        
+        """只更新订阅结果中包含的特征 (没有被选择的特征不会被订阅)
+        """
+        for _index, _value in vehicle_info.items():
+            setattr(self, VEHICLE_INDEX_FEATURE[_index], _value)
         
-    def get_features(self):
+    def get_features(self, features:Tuple[str]=None):
+        """返回车辆的特征, features 为 None 时返回初始化时选择的特征
+        """
+        features = features or self.features
+        if features is not None:
+            return {_feature: getattr(self, _feature) for _feature in features}
+
         output_dict = {}
         for field in fields(self):
             field_name = field.name
             field_value = getattr(self, field_name)
-            if field_name != 'sumo':
+            if field_name not in ('sumo', 'subscription_mode', 'features'):
                 output_dict[field_name] = field_value
         return output_dict
 
@@ -167,4 +200,13 @@ class VehicleInfo:
             current_speed=current_speed, 
             current_lane_index=current_lane_index, 
             current_road_id=current_road_id
-        )
\ No newline at end of file
+        )
+
+
+# VehicleInfo 可以输出的所有特征
+VEHICLE_FEATURES = tuple(
+    _field.name for _field in fields(VehicleInfo)
+    if _field.name not in ('sumo', 'subscription_mode', 'features')
+)
+# 订阅结果的 index -> 特征的名称
+VEHICLE_INDEX_FEATURE = {_index: _feature for _feature, _index in VEHICLE_FEATURE_INDEX.items()}
@@ -4,11 +4,15 @@
 @Description: 初始化一个场景内所有的车辆
 @LastEditTime: 2024-08-11 19:26:13
 '''
+import traci
 from loguru import logger
-from typing import Dict, Any
+from typing import Dict, Any, List, Set, Tuple
 
-from .vehicle import VehicleInfo
+from .vehicle import VehicleInfo, VEHICLE_CONTROL_FEATURES
+from .vehicle_state_store import VehicleStateStore
+from .vehicle_type_cache import VehicleTypeCache
 from ..tshub_env.base_builder import BaseBuilder
+from ..tshub_env.simulation_clock import SimulationClock
 from ..utils.format_dict import dict_to_str
 
 class VehicleBuilder(BaseBuilder):
@@ -16,29 +20,119 @@ class VehicleBuilder(BaseBuilder):
     Provides methods to retrieve information and control all vehicles in the scene.
     """
 
-    def __init__(self, sumo, action_type, hightlight:bool=False) -> None:
+    def __init__(self, sumo, action_type, hightlight:bool=False, 
+                 is_columnar:bool=False, subscription_mode:str='vehicle',
+                 features:List[str]=None, clock:SimulationClock=None) -> None:
         self.sumo = sumo  # sumo connection
         self.action_type = action_type # lane, lane_continuous_speed
         self.vehicles: Dict[str, VehicleInfo] = {}
         self.controled_vehicles = [] # 被控制过的车辆
         self.hightlight = hightlight
+        self.vtype_cache = VehicleTypeCache(sumo) # vType 的静态属性 (长度, 宽度), 每次 reset 重新创建
+        self.clock = clock if clock is not None else SimulationClock(sumo) # 与 env 共享的仿真时间
 
-    def create_objects(self, vehicle_id: str) -> None:
+        # 记录上一次更新车辆的时间, 用于判断是否可以直接使用 getDepartedIDList 和 teleport 的列表
+        self._delta_t = self.sumo.simulation.getDeltaT()
+        self._last_sync_time = None
+
+        # 选择需要的特征, 只订阅和输出这些特征 (控制车辆需要的特征总是会被订阅), None 表示所有的特征
+        self.features = VehicleInfo.check_features(features)
+        self.stored_features = self.__get_stored_features()
+
+        # 列式存储, 开启之后 get_objects_infos 返回 NumPy 数组, 而不是每一辆车的 dict
+        self.is_columnar = is_columnar
+        self.state_store = VehicleStateStore(features=self.stored_features) if self.is_columnar else None
+        self._unstored_vehicle_ids = set() # 多步仿真的中间步新增的车辆, 还没有写入 state store
+        self._stale_vehicle_ids = set() # 多步仿真的中间步删除的车辆, 还没有从 state store 中删除
+
+        # 订阅方式, vehicle: 每辆车单独订阅; context: 通过 simulation context 一次订阅所有车辆
+        assert subscription_mode in ['vehicle', 'context'], \
+            f"subscription_mode should be in [vehicle, context]. Now is {subscription_mode}."
+        self.subscription_mode = subscription_mode
+        if self.subscription_mode == 'context':
+            self.subscribe_vehicles()
+
+    def resync(self) -> None:
+        """加载快照之后, 路网中的车辆都是重新创建的 (没有订阅), 清空之后在下一次更新时通过 getIDList 重新添加.
+        vType 的缓存仍然有效, 不需要重新获取
+        """
+        self.vehicles = {}
+        self.controled_vehicles = []
+        if self.is_columnar:
+            self.state_store = VehicleStateStore(features=self.stored_features)
+        self._unstored_vehicle_ids, self._stale_vehicle_ids = set(), set()
+        self._last_sync_time = None # 下一次更新与 getIDList 比较
+        if self.subscription_mode == 'context':
+            self.subscribe_vehicles()
+
+    def __get_stored_features(self) -> Tuple[str]:
+        """需要在本地保存的特征, 包含选择的特征和控制车辆需要的特征
+        """
+        if self.features is None:
+            return None
+        return self.features + tuple(
+            _feature for _feature in VEHICLE_CONTROL_FEATURES 
+            if _feature not in self.features
+        )
+
+    def subscribe_vehicles(self) -> None:
+        """使用 simulation context 订阅路网中所有的车辆, 每一步的结果随 simulationStep 一起返回.
+        Note: context 订阅不支持带参数的 VAR_LEADER, 因此前车信息仍然在每辆车初始化时单独订阅.
+        """
+        self.sumo.simulation.subscribeContext(
+            '', traci.constants.CMD_GET_VEHICLE_VARIABLE, 0,
+            VehicleInfo.get_subscription_variables(self.features, extra_features=('vehicle_type',)) # 新车辆需要 vType
+        )
+        # libsumo 重启之后, 在第一次 simulationStep 之前仍然会返回上一次仿真的 context 结果
+        self._context_subscribe_time = self.clock.time
+
+    def __get_initial_vehicle_info(self, vehicle_id: str) -> Dict[int, Any]:
+        """新车辆的订阅结果要下一步才会返回, 因此需要单独从 SUMO 获得车辆的初始信息 (长度和宽度来自 vType 缓存).
+        只获取需要保存的特征, vType 用于查询缓存, 总是需要获取.
+        """
+        initial_getters = {
+            'heading': self.sumo.vehicle.getAngle,
+            'position': self.sumo.vehicle.getPosition,
+            'speed': self.sumo.vehicle.getSpeed,
+            'road_id': self.sumo.vehicle.getRoadID,
+            'lane_id': self.sumo.vehicle.getLaneID,
+            'lane_position': self.sumo.vehicle.getLanePosition,
+            'lane_index': self.sumo.vehicle.getLaneIndex,
+        }
+        vehicle_info = {
+            VehicleInfo.get_feature_index('vehicle_type'): self.sumo.vehicle.getTypeID(vehicle_id)
+        }
+        for _feature, _getter in initial_getters.items():
+            if (self.stored_features is None) or (_feature in self.stored_features):
+                vehicle_info[VehicleInfo.get_feature_index(_feature)] = _getter(vehicle_id)
+        return vehicle_info
+
+    def create_objects(self, vehicle_id: str, vehicle_info: Dict[int, Any] = None, is_stored: bool = True) -> None:
         """初始化车辆
+
+        Args:
+            vehicle_id (str): 车辆的 id
+            vehicle_info (Dict[int, Any], optional): context 订阅得到的车辆信息. 为 None 时从 SUMO 单独获取.
+            is_stored (bool, optional): 列式存储时是否立即写入 state store, 为 False 时在下一次 update_objects_state 时写入. Defaults to True.
         """
-        vehicle_info = VehicleInfo.create_vehicle(
+        if vehicle_info is None:
+            vehicle_info = self.__get_initial_vehicle_info(vehicle_id)
+        _get_feature = lambda feature: vehicle_info.get(VehicleInfo.get_feature_index(feature), None)
+        vtype_attributes = self.vtype_cache.get(_get_feature('vehicle_type'))
+
+        vehicle = VehicleInfo.create_vehicle(
             id=vehicle_id,
-            vehicle_type=self.sumo.vehicle.getTypeID(vehicle_id),
+            vehicle_type=_get_feature('vehicle_type'),
             action_type=self.action_type,
-            width=self.sumo.vehicle.getWidth(vehicle_id),
-            length=self.sumo.vehicle.getLength(vehicle_id),
-            heading=self.sumo.vehicle.getAngle(vehicle_id),
-            position=self.sumo.vehicle.getPosition(vehicle_id),
-            speed=self.sumo.vehicle.getSpeed(vehicle_id),
-            road_id=self.sumo.vehicle.getRoadID(vehicle_id),
-            lane_id=self.sumo.vehicle.getLaneID(vehicle_id),
-            lane_position=self.sumo.vehicle.getLanePosition(vehicle_id),
-            lane_index=self.sumo.vehicle.getLaneIndex(vehicle_id),
+            width=vtype_attributes['width'],
+            length=vtype_attributes['length'],
+            heading=_get_feature('heading'),
+            position=_get_feature('position'),
+            speed=_get_feature('speed'),
+            road_id=_get_feature('road_id'),
+            lane_id=_get_feature('lane_id'),
+            lane_position=_get_feature('lane_position'),
+            lane_index=_get_feature('lane_index'),
             edges=[],
             waiting_time=0,
             accumulated_waiting_time=0, # 累积等待时间
@@ -48,19 +142,34 @@ class VehicleBuilder(BaseBuilder):
             speed_without_traci=0,
             leader=(), # 前车信息
             next_tls=[],
-            sumo=self.sumo
+            sumo=self.sumo,
+            subscription_mode=self.subscription_mode,
+            features=self.features
         )
-        self.vehicles[vehicle_id] = vehicle_info
+        self.vehicles[vehicle_id] = vehicle
+        if self.is_columnar:
+            if is_stored:
+                self.state_store.add(vehicle_id, vehicle.get_features(self.stored_features))
+            else:
+                self._unstored_vehicle_ids.add(vehicle_id)
 
-    def __delete_vehicle(self, vehicle_id: str) -> None:
+    def __delete_vehicle(self, vehicle_id: str, is_stored: bool = True) -> None:
         """删除指定 id 的车辆
 
         Args:
             vehicle_id (str): vehicle id
+            is_stored (bool, optional): 列式存储时是否立即从 state store 中删除, 为 False 时在下一次 update_objects_state 时删除. Defaults to True.
         """
         if vehicle_id in self.vehicles:
-            logger.info(f"SIM: Delete Vehicle with ID {vehicle_id}.")
+            logger.info("SIM: Delete Vehicle with ID {}.", vehicle_id)
             del self.vehicles[vehicle_id] # 离开环境后自动 unsubscribe
+            if self.is_columnar:
+                if vehicle_id in self._unstored_vehicle_ids: # 还没有写入 state store
+                    self._unstored_vehicle_ids.discard(vehicle_id)
+                elif is_stored:
+                    self.state_store.remove(vehicle_id)
+                else:
+                    self._stale_vehicle_ids.add(vehicle_id)
         else:
             logger.warning(f"SIM: Vehicle with ID {vehicle_id} does not exist.")
 
@@ -73,28 +182,106 @@ class VehicleBuilder(BaseBuilder):
         """
         self.vehicles[vehicle_id].update_features(vehicle_info)
 
+    def __get_departed_vehicles(self) -> Tuple[List[str], Set[str]]:
+        """获得上一次更新之后进入路网的车辆 (包括 teleport 结束的车辆), 以及不在路网中但是仍然有订阅结果的车辆.
+        teleport 中的车辆不在 getIDList 中, 但是订阅结果仍然存在 (teleport 之前的信息), 需要单独删除.
+        如果上一步刚刚更新过, 直接使用 getDepartedIDList 和 teleport 的列表 (只和变化的车辆数量有关);
+        否则 (例如跳过了若干步没有更新), 需要和 getIDList 进行比较.
+        """
+        current_time = self.clock.time
+        if (self._last_sync_time is not None) and (current_time - self._last_sync_time <= self._delta_t + 1e-6):
+            ending_teleport_ids = self.sumo.simulation.getEndingTeleportIDList()
+            departed_vehicle_ids = list(self.sumo.simulation.getDepartedIDList()) + list(ending_teleport_ids)
+            # 同一步开始和结束 teleport 的车辆仍然在路网中
+            absent_vehicle_ids = set(self.sumo.simulation.getStartingTeleportIDList()).difference(ending_teleport_ids)
+        else:
+            vehicle_ids = set(self.sumo.vehicle.getIDList())
+            departed_vehicle_ids = [
+                _vehicle_id for _vehicle_id in vehicle_ids
+                if _vehicle_id not in self.vehicles
+            ]
+            absent_vehicle_ids = {
+                _vehicle_id for _vehicle_id in self.vehicles
+                if _vehicle_id not in vehicle_ids
+            }
+        self._last_sync_time = current_time
+        return departed_vehicle_ids, absent_vehicle_ids
+
     def update_objects_state(self) -> None:
         """更新场景中所有车辆信息, 包含三个部分:
         1. 对于之前就在环境中的车辆，更新这些车辆的信息；
-        2. 对于离开环境的车辆，将其从 self.vehicles 中删除；
-        3. 对于新进入环境的车辆，将其添加在 self.vehicles；
+        2. 对于离开环境的车辆 (不在订阅结果中, 或是开始 teleport)，将其从 self.vehicles 中删除；
+        3. 对于新进入环境的车辆 (包括 teleport 结束的车辆)，将其添加在 self.vehicles；
+        这里只使用 dict 进行查找, 每一步的开销与车辆数量是线性的, 与新增/离开的车辆数量有关.
         """
-        subscription_results = self.sumo.vehicle.getAllSubscriptionResults()
-        vehicle_ids = self.sumo.vehicle.getIDList()
+        if self.is_columnar:
+            self.__sync_state_store()
+        if self.subscription_mode == 'context':
+            # 所有车辆的信息在一次 context 订阅中返回, 前车信息来自每辆车的 subscribeLeader
+            subscription_results = self.sumo.simulation.getContextSubscriptionResults('') or {}
+            if self._context_subscribe_time is not None: # 订阅之后还没有进行仿真, 结果是无效的
+                if self.clock.time == self._context_subscribe_time:
+                    subscription_results = {}
+                else:
+                    self._context_subscribe_time = None
+            leader_results = self.sumo.vehicle.getAllSubscriptionResults()
+            for vehicle_id, leader_info in leader_results.items():
+                if vehicle_id in subscription_results:
+                    subscription_results[vehicle_id].update(leader_info)
+            # context 订阅的结果包含路网中所有的车辆
+            departed_vehicle_ids = [
+                _vehicle_id for _vehicle_id in subscription_results
+                if _vehicle_id not in self.vehicles
+            ]
+            absent_vehicle_ids = set() # context 订阅的结果不包含 teleport 中的车辆
+        else:
+            # 车辆离开路网之后, SUMO 会自动取消订阅, 因此订阅结果中只有仍在路网中的车辆
+            subscription_results = self.sumo.vehicle.getAllSubscriptionResults()
+            departed_vehicle_ids, absent_vehicle_ids = self.__get_departed_vehicles()
         
-        # 更新已存在的车辆信息
-        for vehicle_id in vehicle_ids:
-            if vehicle_id in self.vehicles:
-                vehicle_info = subscription_results[vehicle_id]
+        # 更新已存在的车辆信息, 删除离开环境的车辆
+        existing_vehicles = {} # 列式存储时, 已存在车辆的信息最后一次性写入
+        for vehicle_id in list(self.vehicles.keys()):
+            vehicle_info = subscription_results.get(vehicle_id, None)
+            if (vehicle_info is None) or (vehicle_id in absent_vehicle_ids):
+                self.__delete_vehicle(vehicle_id)
+            elif self.is_columnar:
+                existing_vehicles[vehicle_id] = vehicle_info
+            else:
                 self.__update_existing_vehicle(vehicle_id, vehicle_info)
+        if self.is_columnar:
+            self.state_store.update(existing_vehicles)
+
+        # 添加新进入环境的车辆
+        for vehicle_id in departed_vehicle_ids:
+            if vehicle_id in self.vehicles:
+                continue
+            if self.subscription_mode == 'context':
+                self.create_objects(vehicle_id, subscription_results[vehicle_id])
             else:
                 self.create_objects(vehicle_id)
 
-        # 删除离开环境的车辆
-        for vehicle_id in list(self.vehicles.keys()):
-            if vehicle_id not in vehicle_ids:
-                self.__delete_vehicle(vehicle_id)
+    def update_departed_objects(self) -> None:
+        """多步仿真 (frame skip) 中不计算 obs 的仿真步, 只初始化新进入路网的车辆 (例如 ego 车辆的控制模式), 并删除离开路网的车辆.
+        不更新已存在车辆的信息, 与每一步调用 update_objects_state 时车辆的控制模式相同.
+        列式存储时不修改 state store (上一步 obs 中的数组, step_async 时可能正在被主线程使用), 在下一次 update_objects_state 时写入.
+        """
+        departed_vehicle_ids, absent_vehicle_ids = self.__get_departed_vehicles()
+        for vehicle_id in list(self.sumo.simulation.getArrivedIDList()) + list(absent_vehicle_ids):
+            if vehicle_id in self.vehicles:
+                self.__delete_vehicle(vehicle_id, is_stored=False)
+        for vehicle_id in departed_vehicle_ids:
+            if vehicle_id not in self.vehicles:
+                self.create_objects(vehicle_id, is_stored=False)
 
+    def __sync_state_store(self) -> None:
+        """将 update_departed_objects 中新增和删除的车辆写入 state store (先删除, 同一辆车可能 teleport 之后重新添加)
+        """
+        for vehicle_id in self._stale_vehicle_ids:
+            self.state_store.remove(vehicle_id)
+        for vehicle_id in self._unstored_vehicle_ids:
+            self.state_store.add(vehicle_id, self.vehicles[vehicle_id].get_features(self.stored_features))
+        self._stale_vehicle_ids, self._unstored_vehicle_ids = set(), set()
 
     def get_objects_infos(self):
         """
@@ -102,6 +289,9 @@ class VehicleBuilder(BaseBuilder):
         Returns a dictionary where the keys are vehicle IDs and the values are the vehicle data.
         """
         self.update_objects_state() # 更新场景内的车辆信息
+        if self.is_columnar:
+            return self.state_store.get_views()
+
         vehicle_features = {}
         for vehicle_id, vehicle_info in self.vehicles.items():
             vehicle_features[vehicle_id] = vehicle_info.get_features()
@@ -117,10 +307,22 @@ class VehicleBuilder(BaseBuilder):
         """
         for vehicle_id, action in actions.items():
             self._log_vehicle_info(vehicle_id, **action)
+            if self.is_columnar: # 列式存储时, 控制需要的状态从 state store 中获得
+                self.__sync_control_state(vehicle_id)
             self.vehicles[vehicle_id].control_vehicle(action)
             if self.hightlight and (vehicle_id not in self.controled_vehicles):
                 self.sumo.vehicle.highlight(vehicle_id, color=(255, 0, 0, 255), size=-1, alphaMax=-1)
                 self.controled_vehicles.append(vehicle_id)
 
+    def __sync_control_state(self, vehicle_id:str) -> None:
+        """列式存储时不会更新 VehicleInfo, 控制之前将需要的状态写回 VehicleInfo
+        """
+        row = self.state_store.id2row[vehicle_id]
+        vehicle_info = self.vehicles[vehicle_id]
+        vehicle_info.speed = self.state_store.arrays['speed'][row].item()
+        vehicle_info.lane_index = self.state_store.arrays['lane_index'][row].item()
+        vehicle_info.road_id = self.state_store.objects['road_id'][row]
+
     def _log_vehicle_info(self, vehicle_id, *args, **kwargs) -> None:
-        logger.debug(f'SIM: {vehicle_id:<20} \n{dict_to_str(kwargs)}')
\ No newline at end of file
+        # 只有输出 DEBUG 日志的时候才会调用 dict_to_str
+        logger.opt(lazy=True).debug('SIM: {:<20} \n{}', lambda: vehicle_id, lambda: dict_to_str(kwargs))
\ No newline at end of file
@@ -0,0 +1,185 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 10:12:36
+@Description: 列式 (columnar) 存储场景内所有车辆的状态
+- 每一个数值特征是一个 NumPy 数组, 每一辆车占用其中的一行 (row)
+- 使用 id2row 记录车辆 id 与 row 的对应关系
+- 车辆离开路网之后, 对应的 row 会被回收, 之后新进入的车辆优先使用空闲的 row
+LastEditTime: 2026-10-18 10:12:36
+'''
+import heapq
+import numpy as np
+from loguru import logger
+from typing import Dict, Any, List, Tuple
+
+from .vehicle import VehicleInfo
+
+
+class VehicleStateStore:
+    """使用 NumPy 数组保存所有车辆的状态, 避免每一步为每一辆车重新构造 dict.
+
+    get_views 返回的是数组的切片 (zero-copy view), 下一次更新时会被原地覆盖,
+    如果需要保留某一步的结果, 需要自行 copy.
+    """
+    # 数值特征 (订阅结果中的 key 与 VehicleInfo.get_feature_index 一致)
+    VECTOR_FEATURES = ('position',) # (x, y)
+    FLOAT_FEATURES = (
+        'heading', 'speed', 'lane_position',
+        'waiting_time', 'accumulated_waiting_time', 'distance',
+        'co2_emission', 'fuel_consumption', 'speed_without_traci',
+    )
+    INT_FEATURES = ('lane_index',)
+    # 字符串等不定长的特征, 使用 list 保存
+    OBJECT_FEATURES = ('vehicle_type', 'road_id', 'lane_id', 'edges', 'leader', 'next_tls')
+    # 车辆进入路网之后不会改变的特征, 只在初始化的时候写入
+    STATIC_FEATURES = ('length', 'width')
+
+    def __init__(self, capacity:int=256, features:Tuple[str]=None) -> None:
+        """
+        Args:
+            capacity (int, optional): 初始的容量. Defaults to 256.
+            features (Tuple[str], optional): 需要保存的特征, None 表示保存所有的特征. Defaults to None.
+        """
+        _selected = lambda _features: tuple(
+            _feature for _feature in _features 
+            if (features is None) or (_feature in features)
+        )
+        self.vector_features = _selected(self.VECTOR_FEATURES)
+        self.numeric_features = _selected(self.FLOAT_FEATURES + self.INT_FEATURES) # 每一步需要更新的数值特征
+        self.capacity = capacity # 当前数组的大小, 不够的时候自动扩容
+        self.num_rows = 0 # 已经使用过的最大 row, views 只返回 [:num_rows]
+        self.id2row: Dict[str, int] = {} # vehicle id -> row
+        self.free_rows: List[int] = [] # 空闲的 row (小根堆, 优先复用较小的 row)
+
+        self.ids: List[str] = [None] * capacity # row -> vehicle id
+        self.valid = np.zeros(capacity, dtype=bool) # 该 row 是否有车辆
+        self.arrays: Dict[str, np.ndarray] = {}
+        for _feature in self.vector_features:
+            self.arrays[_feature] = np.zeros((capacity, 2), dtype=np.float64)
+        for _feature in _selected(self.FLOAT_FEATURES + self.STATIC_FEATURES):
+            self.arrays[_feature] = np.zeros(capacity, dtype=np.float64)
+        for _feature in _selected(self.INT_FEATURES):
+            self.arrays[_feature] = np.zeros(capacity, dtype=np.int64)
+        self.objects: Dict[str, List[Any]] = {
+            _feature: [None] * capacity for _feature in _selected(self.OBJECT_FEATURES)
+        }
+
+        # 订阅结果中每个特征对应的 key
+        self._feature_keys = {
+            _feature: VehicleInfo.get_feature_index(_feature)
+            for _feature in self.vector_features + self.numeric_features + tuple(self.objects)
+        }
+
+    def __len__(self) -> int:
+        return len(self.id2row)
+
+    def __contains__(self, vehicle_id:str) -> bool:
+        return vehicle_id in self.id2row
+
+    def _grow(self) -> None:
+        """容量不够的时候, 将所有数组扩大一倍
+        """
+        new_capacity = self.capacity * 2
+        logger.debug(f'SIM: Vehicle State Store Grow {self.capacity} -> {new_capacity}.')
+        pad = new_capacity - self.capacity
+        self.ids.extend([None] * pad)
+        self.valid = np.concatenate([self.valid, np.zeros(pad, dtype=bool)])
+        for _feature, _array in self.arrays.items():
+            self.arrays[_feature] = np.concatenate([_array, np.zeros((pad,)+_array.shape[1:], dtype=_array.dtype)])
+        for _values in self.objects.values():
+            _values.extend([None] * pad)
+        self.capacity = new_capacity
+
+    def add(self, vehicle_id:str, features:Dict[str, Any]) -> int:
+        """为新的车辆分配一个 row, 并写入初始的特征
+
+        Args:
+            vehicle_id (str): 车辆 id
+            features (Dict[str, Any]): 车辆的初始特征, 与 VehicleInfo.get_features 的格式相同
+
+        Returns:
+            int: 车辆所在的 row
+        """
+        if self.free_rows:
+            row = heapq.heappop(self.free_rows)
+        else:
+            if self.num_rows == self.capacity:
+                self._grow()
+            row = self.num_rows
+            self.num_rows += 1
+
+        self.id2row[vehicle_id] = row
+        self.ids[row] = vehicle_id
+        self.valid[row] = True
+        for _feature, _array in self.arrays.items():
+            _array[row] = features[_feature]
+        for _feature, _values in self.objects.items():
+            _values[row] = features[_feature]
+        return row
+
+    def remove(self, vehicle_id:str) -> None:
+        """车辆离开路网, 回收对应的 row
+        """
+        row = self.id2row.pop(vehicle_id)
+        self.ids[row] = None
+        self.valid[row] = False
+        for _array in self.arrays.values():
+            _array[row] = 0
+        for _values in self.objects.values():
+            _values[row] = None
+        heapq.heappush(self.free_rows, row)
+
+    def update(self, vehicle_infos:Dict[str, Dict[int, Any]]) -> None:
+        """使用订阅的结果批量更新车辆的状态. 每个特征只进行一次 NumPy 赋值.
+
+        Args:
+            vehicle_infos (Dict[str, Dict[int, Any]]): vehicle id -> 订阅结果
+        """
+        if not vehicle_infos:
+            return
+
+        rows = [self.id2row[_vehicle_id] for _vehicle_id in vehicle_infos]
+        infos = list(vehicle_infos.values())
+        keys = self._feature_keys
+
+        for _feature in self.vector_features + self.numeric_features:
+            _key = keys[_feature]
+            self.arrays[_feature][rows] = [_info[_key] for _info in infos]
+        for _feature, _values in self.objects.items():
+            _key = keys[_feature]
+            for _row, _info in zip(rows, infos):
+                _values[_row] = _info.get(_key, None)
+
+    def get_row(self, vehicle_id:str) -> Dict[str, Any]:
+        """返回一辆车的特征 (与 VehicleInfo.get_features 相同的 key), 用于控制或是调试
+        """
+        row = self.id2row[vehicle_id]
+        features = {'id': vehicle_id}
+        for _feature, _array in self.arrays.items():
+            features[_feature] = tuple(_array[row].tolist()) if _array.ndim > 1 else _array[row].item()
+        for _feature, _values in self.objects.items():
+            features[_feature] = _values[row]
+        return features
+
+    def get_views(self) -> Dict[str, Any]:
+        """返回所有车辆的状态, 数值特征为数组的 view (不会进行复制)
+            {
+                'ids': ['veh_1', None, 'veh_3', ...], # row -> vehicle id, None 表示空闲的 row
+                'id2row': {'veh_1': 0, 'veh_3': 2, ...},
+                'valid': array([True, False, True, ...]),
+                'position': array([[x, y], ...]),
+                'speed': array([...]),
+                ...
+            }
+        """
+        n = self.num_rows
+        views = {
+            'ids': self.ids[:n],
+            'id2row': self.id2row,
+            'valid': self.valid[:n],
+        }
+        for _feature, _array in self.arrays.items():
+            views[_feature] = _array[:n]
+        for _feature, _values in self.objects.items():
+            views[_feature] = _values[:n]
+        return views
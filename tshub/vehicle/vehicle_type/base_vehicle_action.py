@@ -31,12 +31,12 @@ class VehicleAction(ABC):
     def change_lane(self, lane_change:int, 
                     current_lane:int, current_edge:str) -> None:
         if current_edge.startswith(":"):
-            logger.info(f'SIM: {self.veh_id} in connection edge {current_edge}.')
+            logger.info('SIM: {} in connection edge {}.', self.veh_id, current_edge)
         else:
             target_lane = current_lane + lane_change
             lane_number = self.sumo.edge.getLaneNumber(current_edge) # 获得 edge 的 lane 的个数
             if target_lane >= 0 and target_lane < lane_number:
                 self.sumo.vehicle.changeLane(self.veh_id, target_lane, duration=1)
             else:
-                logger.info(f'SIM: Target Lane is: {target_lane}; Exceed to Lanes in this Edge: {lane_number}; Keep Current Lane: {current_lane}.')
+                logger.info('SIM: Target Lane is: {}; Exceed to Lanes in this Edge: {}; Keep Current Lane: {}.', target_lane, lane_number, current_lane)
                 self.sumo.vehicle.changeLane(self.veh_id, current_lane, duration=1)
\ No newline at end of file
@@ -26,11 +26,11 @@ class SpeedAction(VehicleAction):
         # Speed control logic
         if action == SpeedActionType.accelerate:
             new_speed = current_speed + acceleration_rate
-            logger.info(f'SIM: 车辆 {self.veh_id} 加速到 {new_speed}.')
+            logger.info('SIM: 车辆 {} 加速到 {}.', self.veh_id, new_speed)
             self.sumo.vehicle.setSpeed(self.veh_id, new_speed)
         elif action == SpeedActionType.decelerate:
             new_speed = max(1, current_speed - acceleration_rate)  # Prevent negative speed
-            logger.info(f'SIM: 车辆 {self.veh_id} 减速到 {new_speed}.')
+            logger.info('SIM: 车辆 {} 减速到 {}.', self.veh_id, new_speed)
             self.sumo.vehicle.setSpeed(self.veh_id, new_speed)
         elif action == SpeedActionType.maintain_speed:
             # No change to the vehicle's speed
@@ -0,0 +1,43 @@
+'''
+@Author: WANG Maonan
+@Date: 2026-10-18 11:05:20
+@Description: 缓存每一种 vType 的静态属性
+- 车辆的长度, 宽度在进入路网之后不会改变, 并且由 vType 决定
+- 新的车辆只需要知道 vType, 就可以从缓存中得到这些属性, 不需要每辆车都查询 SUMO
+LastEditTime: 2026-10-18 11:05:20
+'''
+from loguru import logger
+from typing import Dict
+
+
+class VehicleTypeCache:
+    def __init__(self, sumo) -> None:
+        self.sumo = sumo
+        self.vtype_attributes: Dict[str, Dict[str, float]] = {} # vtype id -> {'length':..., 'width':...}
+        self.build()
+
+    def build(self) -> None:
+        """从 SUMO 中读取所有的 vType 的属性
+        """
+        for _vtype_id in self.sumo.vehicletype.getIDList():
+            self.__load_vtype(_vtype_id)
+        logger.info(f'SIM: Vehicle Type Cache, {len(self.vtype_attributes)} vTypes.')
+
+    def __load_vtype(self, vtype_id:str) -> Dict[str, float]:
+        self.vtype_attributes[vtype_id] = {
+            'length': self.sumo.vehicletype.getLength(vtype_id),
+            'width': self.sumo.vehicletype.getWidth(vtype_id),
+        }
+        return self.vtype_attributes[vtype_id]
+
+    def get(self, vtype_id:str) -> Dict[str, float]:
+        """返回 vType 的属性, 仿真过程中新加入的 vType 在第一次使用时读取
+        """
+        if vtype_id in self.vtype_attributes:
+            return self.vtype_attributes[vtype_id]
+        return self.__load_vtype(vtype_id)
+
+    def clear(self) -> None:
+        """清空缓存 (例如重新加载了路网或 route 文件)
+        """
+        self.vtype_attributes.clear()